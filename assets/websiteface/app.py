@@ -1,6 +1,27 @@
 import os
-import shutil
-from flask import Flask, render_template, url_for
+import sys
+import json
+import re
+import base64
+import threading
+from datetime import date, datetime
+import cv2
+import numpy as np
+from flask import (Flask, Response, render_template, url_for, request, jsonify, send_from_directory, abort,
+                   stream_with_context)
+
+# Shard layout helpers shared with the recognizer
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from storage import IMAGE_EXTENSIONS
+from crop_index import CropIndex
+from thumbnails import ThumbnailCache
+from rollups import KEY_COLUMNS, query_rollups
+from export import CROP_CATEGORIES, CROP_FIELDS, EVENT_FIELDS, FORMATS, export_crops, export_events, stream_rows
+from face_search import FaceIndex, encode_image
+
+# Images shown per page (and the /api/faces page size limit)
+PAGE_SIZE = 28
+MAX_PAGE_SIZE = 200
 
 app = Flask(__name__)
 
@@ -13,56 +34,393 @@ SOURCE_FOLDERS = {
     'outsiders': r'C:\Users\aammu\Documents\Final year project\facerecognition\detected_faces\outsiders'
 }
 
-def sync_images(source_folder, static_subfolder):
-    """Copy images from source to static folder"""
-    static_path = os.path.join('static', static_subfolder)
-    os.makedirs(static_path, exist_ok=True)
-    
-    # Copy all images
-    for file in os.listdir(source_folder):
-        if file.endswith(('.jpg', '.jpeg', '.png')):
-            src = os.path.join(source_folder, file)
-            dst = os.path.join(static_path, file)
-            if not os.path.exists(dst) or os.path.getmtime(src) > os.path.getmtime(dst):
-                shutil.copy2(src, dst)
+# Entry-event log and per-meal rollups written by the recognizer
+EVENTS_DB = r'C:\Users\aammu\Documents\Final year project\facerecognition\events.db'
+
+# Outsider cluster index written by the recognizer (src/clusters.py)
+CLUSTER_INDEX = os.path.join(SOURCE_FOLDERS['outsiders'], 'clusters.json')
+
+# Reverse face search over the crops' sidecar encodings (src/face_search.py)
+DETECTED_FACES_ROOT = os.path.dirname(SOURCE_FOLDERS['outsiders'])
+face_index = None
+face_index_lock = threading.Lock()
+
+# Crops are indexed in the background and served straight from DETECTED_FACES_ROOT
+INDEX_STATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crop_index.json')
+crop_index = None
+crop_index_lock = threading.Lock()
+cluster_cache = {'mtime': None, 'cards': None}
+
+# Grid tiles use small thumbnails with content-hashed (cache-forever) names
+THUMBNAIL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thumbnail_cache')
+THUMBNAIL_NAME = re.compile(r'^[0-9a-f]{20}\.jpg$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600   # crops and thumbnails are never rewritten
+thumbnails = None
+
+# Live push: seconds between index scans, and between keep-alives on idle streams
+LIVE_INTERVAL = 1.0
+KEEPALIVE_INTERVAL = 15.0
+
+def get_crop_index():
+    """Start the background crop indexer (and thumbnail workers) on first use"""
+    global crop_index, thumbnails
+    with crop_index_lock:
+        if crop_index is None:
+            thumbnails = ThumbnailCache(DETECTED_FACES_ROOT, THUMBNAIL_DIR)
+            thumbnails.executor.submit(thumbnails.prune)
+            crop_index = CropIndex(DETECTED_FACES_ROOT, categories=tuple(SOURCE_FOLDERS), state_path=INDEX_STATE,
+                                   interval=LIVE_INTERVAL)
+            crop_index.add_listener(thumbnails.prefetch)
+            crop_index.start()
+    return crop_index
+
+def get_face_index():
+    """The shared face index (built once), refreshed with any new sidecar encodings"""
+    global face_index
+    with face_index_lock:
+        if face_index is None:
+            face_index = FaceIndex(DETECTED_FACES_ROOT)
+    face_index.refresh()
+    return face_index
+
+@app.template_global()
+def thumbnail_url(path):
+    """Thumbnail URL for a crop (the full crop until its thumbnail has been rendered in the background)"""
+    get_crop_index()
+    name = thumbnails.lookup(path)
+    if name is None:
+        return url_for('serve_crop', path=path)
+    return url_for('serve_thumbnail', name=name)
+
+def load_outsider_cards():
+    """One (last seen, latest crop, sighting count, cluster id) per outsider cluster, newest first; re-read only when clusters.json changes"""
+    if not os.path.exists(CLUSTER_INDEX):
+        return None
+    mtime = os.path.getmtime(CLUSTER_INDEX)
+    if cluster_cache['mtime'] != mtime:
+        with open(CLUSTER_INDEX, 'r', encoding='utf-8') as f:
+            clusters = json.load(f).get('clusters', {})
+        
+        cards = []
+        for cluster_id, info in clusters.items():
+            if info.get('crops'):
+                cards.append((info['last_seen'], relative_path('outsiders', info['crops'][-1]['path']), info['count'],
+                              cluster_id))
+        cards.sort(key=lambda card: (card[0], card[3]), reverse=True)
+        cluster_cache.update(mtime=mtime, cards=cards)
+    return cluster_cache['cards']
+
+def page_outsider_cards(limit, before=None):
+    """
+    One page of outsider cluster cards, newest first, or None without a cluster index
+
+    before is a (last seen, cluster id) cursor. Returns (faces with
+    'count', cursor for the next page or None).
+    """
+    cards = load_outsider_cards()
+    if cards is None:
+        return None
+    i = 0
+    if before is not None:
+        while i < len(cards) and (cards[i][0], cards[i][3]) >= tuple(before):
+            i += 1
+    faces = []
+    while i < len(cards) and len(faces) < limit:
+        last_seen, path, count, cluster_id = cards[i]
+        i += 1
+        if os.path.exists(os.path.join(DETECTED_FACES_ROOT, path)):
+            faces.append(dict(face_record({'path': path, 'time': last_seen, 'cluster': cluster_id}), count=count))
+    cursor = (cards[i - 1][0], cards[i - 1][3]) if faces and i < len(cards) else None
+    return faces, cursor
+
+def relative_path(category, crop_path):
+    """Recognizer-relative crop path -> path under DETECTED_FACES_ROOT (<category>/<date>/<hour>/<file>)"""
+    parts = crop_path.replace('\\', '/').split('/')
+    if len(parts) >= 3 and len(parts[-3]) == 10 and parts[-2].isdigit():
+        return '/'.join([category] + parts[-3:])
+    return f"{category}/{parts[-1]}"
 
 @app.after_request
 def add_header(response):
-    """Add headers to prevent caching"""
+    """
+    Caching policy: crops and thumbnails never change, so they are cached
+    for a year; ETag'd API responses are revalidated (304 when unchanged);
+    pages are never cached
+    """
+    if 'immutable' in response.headers.get('Cache-Control', ''):
+        return response
+    if response.headers.get('ETag'):
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     return response
 
+@app.route('/crops/<path:path>')
+def serve_crop(path):
+    """A saved crop, read straight from the recognizer's folders"""
+    if path.split('/', 1)[0] not in CROP_CATEGORIES or not path.lower().endswith(IMAGE_EXTENSIONS):
+        abort(404)
+    response = send_from_directory(DETECTED_FACES_ROOT, path, max_age=IMMUTABLE_MAX_AGE)
+    response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return response
+
+@app.route('/thumbs/<name>')
+def serve_thumbnail(name):
+    """A rendered thumbnail; its name is a content hash, so it can be cached forever"""
+    if not THUMBNAIL_NAME.match(name):
+        abort(404)
+    response = send_from_directory(THUMBNAIL_DIR, f"{name[:2]}/{name}", max_age=IMMUTABLE_MAX_AGE)
+    response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return response
+
+def render_grid(category, title):
+    """Grid page: the first page of crops; the browser fetches the rest from /api/faces as it scrolls"""
+    crops, cursor = get_crop_index().page(category, PAGE_SIZE)
+    return render_template('display.html', faces=[face_record(crop) for crop in crops],
+                          next_cursor=encode_cursor(cursor) if cursor else None,
+                          page_url=url_for('api_faces', category=category),
+                          clustered=False,
+                          folder=category,
+                          title=title)
+
 @app.route('/')
 def display_college_non_mess():
-    sync_images(SOURCE_FOLDERS['college_non_mess'], 'college_non_mess')
+    return render_grid('college_non_mess', 'College Non-Mess Members')
+
+@app.route('/outsiders')
+def display_outsiders():
+    # One card per unknown person when the recognizer has clustered them
+    page = page_outsider_cards(PAGE_SIZE)
+    if page is not None:
+        faces, cursor = page
+        return render_template('display.html', faces=faces,
+                              next_cursor=encode_cursor(cursor) if cursor else None,
+                              page_url=url_for('api_outsider_clusters', limit=PAGE_SIZE),
+                              clustered=True,
+                              folder='outsiders',
+                              title='Outsiders')
     
-    static_folder = 'static/college_non_mess'
-    images = [f for f in os.listdir(static_folder) 
-              if f.endswith(('.jpg', '.jpeg', '.png'))]
+    return render_grid('outsiders', 'Outsiders')
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip('=')
+
+def decode_cursor(text, types=(float, str)):
+    """Opaque page cursor -> (time, path), or other types; ValueError if malformed"""
+    try:
+        first, second = json.loads(base64.urlsafe_b64decode(text + '=' * (-len(text) % 4)))
+        return types[0](first), types[1](second)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {text}") from e
+
+def parse_since(text):
+    """Unix time or ISO date/time -> unix time"""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+def face_record(crop):
+    """Public JSON fields of an indexed crop"""
+    return {
+        'path': crop['path'],
+        'time': crop['time'],
+        'camera': crop.get('camera'),
+        'cluster': crop.get('cluster'),
+        'roll_no': crop.get('roll_no'),
+        'thumbnail': thumbnail_url(crop['path']),
+        'url': url_for('serve_crop', path=crop['path']),
+    }
+
+@app.route('/api/faces')
+def api_faces():
+    """
+    Saved crops of ?category=, newest first, one page at a time
     
-    images.sort(key=lambda x: os.path.getmtime(
-        os.path.join(static_folder, x)), reverse=True)
+    ?since= (unix time or ISO date) stops at older crops; ?limit= sets the
+    page size; ?cursor= is the 'next' value of the previous page. Pages
+    carry an ETag, so polling an unchanged page costs a 304.
+    """
+    category = request.args.get('category', 'outsiders')
+    if category not in SOURCE_FOLDERS:
+        return jsonify({'error': f"Unknown category '{category}'. Choose from: {', '.join(SOURCE_FOLDERS)}"}), 400
+    limit = max(1, min(request.args.get('limit', PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    try:
+        before = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        since = parse_since(request.args['since']) if request.args.get('since') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return render_template('display.html', images=images, 
-                          folder='college_non_mess',
-                          title='College Non-Mess Members')
+    crops, cursor = get_crop_index().page(category, limit, before, since)
+    response = jsonify({
+        'faces': [face_record(crop) for crop in crops],
+        'next': encode_cursor(cursor) if cursor else None,
+    })
+    response.add_etag()
+    return response.make_conditional(request)
 
-@app.route('/outsiders')
-def display_outsiders():
-    sync_images(SOURCE_FOLDERS['outsiders'], 'outsiders')
+@app.route('/api/outsider-clusters')
+def api_outsider_clusters():
+    """One card per outsider cluster, most recently seen first; ?cursor= and ?limit= as for /api/faces"""
+    limit = max(1, min(request.args.get('limit', PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    try:
+        before = decode_cursor(request.args['cursor'], (str, str)) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    page = page_outsider_cards(limit, before)
+    faces, cursor = page if page is not None else ([], None)
+    response = jsonify({'faces': faces, 'next': encode_cursor(cursor) if cursor else None})
+    response.add_etag()
+    return response.make_conditional(request)
+
+def crop_event(crop):
+    """Server-sent event announcing one newly indexed crop"""
+    return f"id: {get_crop_index().epoch}-{crop['seq']}\nevent: crop\ndata: {json.dumps(face_record(crop))}\n\n"
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    Server-Sent Events: one 'crop' event per newly saved crop of ?category=
+    
+    The index scan is shared by all viewers; each stream just waits for
+    it. Event ids are '<epoch>-<sequence>', so a browser reconnecting with
+    a Last-Event-ID from this run resumes where it stopped. An id from
+    before a dashboard restart can't be resumed (sequences start again),
+    so that browser gets a 'reset' event and reloads the page.
+    """
+    category = request.args.get('category', 'outsiders')
+    if category not in SOURCE_FOLDERS:
+        abort(404)
+    index = get_crop_index()
+    last_id = request.headers.get('Last-Event-ID')
+    epoch, _, sequence = (last_id or '').partition('-')
+    reset = last_id is not None and not (epoch == index.epoch and sequence.isdigit() and
+                                         int(sequence) <= index.sequence)
+    after = int(sequence) if last_id is not None and not reset else index.sequence
+    
+    def events(after):
+        yield "retry: 3000\n\n"
+        if reset:
+            yield f"id: {index.epoch}-{after}\nevent: reset\ndata: {{}}\n\n"
+            return
+        while True:
+            crops, after = index.wait_for_crops(after, KEEPALIVE_INTERVAL)
+            sent = False
+            for crop in crops:
+                if crop['category'] == category:
+                    yield crop_event(crop)
+                    sent = True
+            if not sent:
+                yield ": keep-alive\n\n"
     
-    static_folder = 'static/outsiders'
-    images = [f for f in os.listdir(static_folder) 
-              if f.endswith(('.jpg', '.jpeg', '.png'))]
+    return Response(stream_with_context(events(after)), mimetype='text/event-stream',
+                    headers={'X-Accel-Buffering': 'no'})
+
+@app.route('/api/rollups')
+def api_rollups():
+    """
+    Per-meal counts from the pre-aggregated rollups
+    
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD&group=meal,category plus optional
+    filters on any rollup column (meal=lunch, category=outsider, ...)
+    """
+    date_from = request.args.get('from', date.today().isoformat())
+    date_to = request.args.get('to', date_from)
+    group = request.args.get('group', 'date,meal,category')
+    group_by = [column for column in group.split(',') if column]
+    filters = {column: request.args[column] for column in KEY_COLUMNS if column in request.args}
+    
+    if not os.path.exists(EVENTS_DB):
+        return jsonify([])
+    try:
+        return jsonify(query_rollups(EVENTS_DB, date_from, date_to, group_by, **filters))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/search', methods=['GET', 'POST'])
+def api_search():
+    """
+    Saved crops of the same face, closest first
+    
+    POST an image as 'image', or GET ?crop=<category>/<date>/<hour>/<file>
+    for a crop already on the dashboard. Optional tolerance, limit, category.
+    """
+    index = get_face_index()
     
-    images.sort(key=lambda x: os.path.getmtime(
-        os.path.join(static_folder, x)), reverse=True)
+    encoding = None
+    if 'image' in request.files:
+        data = np.frombuffer(request.files['image'].read(), np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if image is None:
+            return jsonify({'error': 'Could not read image'}), 400
+        encoding = encode_image(image)
+    elif request.args.get('crop'):
+        encoding = index.encoding_for(os.path.join(DETECTED_FACES_ROOT, request.args['crop']))
+    else:
+        return jsonify({'error': "Send an 'image' file or a ?crop= path"}), 400
+    if encoding is None:
+        return jsonify({'error': 'No face found'}), 404
     
-    return render_template('display.html', images=images, 
-                          folder='outsiders',
-                          title='Outsiders')
+    results = index.search(encoding,
+                           tolerance=request.args.get('tolerance', 0.5, type=float),
+                           limit=request.args.get('limit', 50, type=int),
+                           category=request.args.get('category'))
+    for result in results:
+        result['path'] = os.path.relpath(result['path'], DETECTED_FACES_ROOT).replace('\\', '/')
+    return jsonify(results)
+
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def export_response(kind, rows, fields, fmt, date_from, date_to):
+    """Chunked download streamed from a row generator"""
+    filename = f"{kind}_{date_from}_{date_to or date_from}.{fmt}"
+    return Response(stream_with_context(stream_rows(rows, fields, fmt)),
+                    mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def export_args():
+    """(from, to, format) of an export request; ValueError on bad input"""
+    date_from = request.args.get('from', date.today().isoformat())
+    date_to = request.args.get('to') or date_from
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    date.fromisoformat(date_from)
+    date.fromisoformat(date_to)
+    return date_from, date_to, fmt
+
+@app.route('/api/export/events')
+def api_export_events():
+    """
+    Entry events for billing reconciliation, streamed as CSV or NDJSON
+    
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD&format=csv|ndjson plus optional
+    category= and roll_no= filters
+    """
+    try:
+        date_from, date_to, fmt = export_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not os.path.exists(EVENTS_DB):
+        return jsonify({'error': 'No event log yet'}), 404
+    rows = export_events(EVENTS_DB, date_from, date_to,
+                         category=request.args.get('category'), roll_no=request.args.get('roll_no'))
+    return export_response('events', rows, EVENT_FIELDS, fmt, date_from, date_to)
+
+@app.route('/api/export/crops')
+def api_export_crops():
+    """Saved-crop metadata (?from, ?to, ?format, optional ?category=) streamed from the shard manifests"""
+    try:
+        date_from, date_to, fmt = export_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    category = request.args.get('category')
+    if category is not None and category not in CROP_CATEGORIES:
+        return jsonify({'error': f"Unknown category '{category}'. Choose from: {', '.join(CROP_CATEGORIES)}"}), 400
+    rows = export_crops(DETECTED_FACES_ROOT, date_from, date_to, (category,) if category else CROP_CATEGORIES)
+    return export_response('crops', rows, CROP_FIELDS, fmt, date_from, date_to)
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
@@ -3,15 +3,39 @@ import cv2
 import pickle
 import numpy as np
 import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import functools
 from pathlib import Path
 from datetime import datetime
+from diagnostics import LogPipeline, get_logger
+from crop_writer import CropWriter
+from dedup import SaveDeduplicator
+from clusters import OutsiderClusters
+from storage import ShardedCropStore
+from events import EventLog
+from reentry import MealAdmissions
+from rollups import MealRollups
+from clips import ClipRecorder, ClipWriter
+from multicam import CameraState, MultiCameraRecognizer, open_results
+from workers import LatestFrameWorker
+from scheduler import MealScheduler, load_schedule
+from profiles import PROFILES, get_profile, locate_faces, encode_faces, detect_and_encode
+from sources import open_source
+
+log = get_logger('recognizer')
 
 class StudentDatabase:
     """Manages college and mess student enrollment"""
     
-    def __init__(self, college_db='college_students.pkl', mess_db='mess_students.pkl'):
+    def __init__(self, college_db='college_students.pkl', mess_db='mess_students.pkl',
+                 enroll_profile='enroll'):
         self.college_db_file = college_db
         self.mess_db_file = mess_db
+        self.enroll_profile = get_profile(enroll_profile)
         self.college_students = {}
         self.mess_students = {}
         self.load_databases()
@@ -73,7 +97,8 @@ class StudentDatabase:
         """
         # Load and encode the face
         image = face_recognition.load_image_file(image_path)
-        face_encodings = face_recognition.face_encodings(image)
+        face_locations = locate_faces(image, self.enroll_profile)
+        face_encodings = encode_faces(image, face_locations, self.enroll_profile)
         
         if len(face_encodings) == 0:
             print(f"ERROR: No face detected in {image_path}")
@@ -117,68 +142,179 @@ class StudentDatabase:
 class EnhancedFaceRecognitionSystem:
     """Three-tier face recognition: Mess / College / Outsider"""
     
-    def __init__(self, database):
+    def __init__(self, database, profile='balanced', crop_format='jpg', crop_quality=90, crop_queue=64,
+                 save_cooldown=300.0, retention_days=90, max_crop_bytes=None, events_db='data/events.db',
+                 meal_windows=None, clip_seconds=5.0, clip_post_seconds=3.0):
         self.database = database
         self.encodings = database.get_all_encodings()
         
+        # Detection/encoding profile (see profiles.PROFILES)
+        self.profile = get_profile(profile)
+        
         # Colors for three categories (BGR format)
         self.MESS_COLOR = (0, 255, 0)           # Green
         self.COLLEGE_COLOR = (0, 165, 255)      # Orange
         self.OUTSIDER_COLOR = (0, 0, 255)       # Red
+        self.REENTRY_COLOR = (255, 0, 255)      # Magenta (mess student, second entry this meal)
         
         # Recognition parameters
         self.tolerance = 0.5
         
-        # Track saved faces to avoid duplicates
-        self.saved_faces = set()
+        # Per-camera state for the single-camera loop: saved-face dedup,
+        # overlay sprites/results, input scale and reusable frame buffers
+        # (multi-camera runs create one CameraState per camera)
+        self.camera = CameraState('cam0')
+        
+        # Crops are encoded/written off the frame loop (drop-oldest when backed up)
+        self.crop_writer = CropWriter(crop_format, crop_quality, crop_queue)
+        
+        # Crops go to date/hour shards; the janitor enforces age/size limits
+        self.crop_store = ShardedCropStore(max_age_days=retention_days, max_bytes=max_crop_bytes).start_janitor()
+        
+        # Save each person at most once per cooldown (shared by all cameras)
+        self.dedup = SaveDeduplicator(cooldown=save_cooldown)
+        
+        # Groups outsider crops by person (persistent cluster ids; merged and saved in the background)
+        self.outsider_clusters = OutsiderClusters().start()
+        
+        # Every decision goes to the SQLite entry-event log (batched, background thread)
+        self.event_log = EventLog(events_db) if events_db else None
+        
+        # Mess students admitted in the current meal (restored from the event log)
+        self.admissions = MealAdmissions(meal_windows)
+        restored = self.admissions.rebuild(events_db)
+        if restored:
+            print(f"✓ Restored {len(self.admissions.admitted)} admissions for the current meal from {restored} events")
+        
+        # Per-meal arrival counters, kept next to the event log
+        self.rollups = MealRollups(events_db) if events_db else None
+        
+        # Pre-event clips: each camera keeps the last clip_seconds as JPEGs
+        self.clip_seconds = clip_seconds
+        self.clip_post_seconds = clip_post_seconds
+        self.clip_writer = ClipWriter() if clip_seconds else None
+        self.attach_clips(self.camera)
+        
+        # Optional scheduler.MealScheduler adjusting rate/profile by meal window
+        self.scheduler = None
     
-    def recognize_faces(self, frame):
-        """Detect and classify faces into three categories"""
+    def recognize_faces(self, frame, evidence=None):
+        """
+        Detect and classify faces into three categories
+        
+        evidence: optional capture.EvidenceFrame giving access to the
+        full-resolution frame behind a reduced one, used for crops
+        """
         if frame is None or frame.size == 0:
             return frame
         
-        # Resize for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        rgb_small_frame = np.ascontiguousarray(rgb_small_frame)
+        face_data = self.analyze_frame(frame, evidence)
+        
+        # Draw on a pooled copy so the capture frame stays clean for crops
+        processed_frame = self.draw_labels(self.camera.buffer_pool.display_copy(frame), face_data)
+        return processed_frame
+    
+    def analyze_frame(self, frame, evidence=None, camera=None):
+        """Detect, classify and save faces; returns face_data without drawing"""
+        camera = camera or self.camera
+        
+        # Resize + convert into pooled buffers for faster processing
+        scale = min(1.0, self.profile['scale'] / camera.input_scale)
+        rgb_small_frame = camera.buffer_pool.prepare_rgb(frame, scale)
         
         try:
-            face_locations = face_recognition.face_locations(rgb_small_frame, model='hog')
-            face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+            face_locations, face_encodings = detect_and_encode(rgb_small_frame, self.profile)
         except Exception as e:
-            print(f"Error during face detection: {e}")
-            return frame
+            log.error("Error during face detection: %s", e,
+                      extra={'event': 'detection_error', 'camera': camera.camera_id})
+            return []
         
+        return self.classify_detections(frame, face_locations, face_encodings, scale, evidence, camera)
+    
+    def attach_clips(self, camera):
+        """Give a camera its pre-event clip ring (if clips are enabled)"""
+        if self.clip_writer is not None:
+            camera.clips = ClipRecorder(camera.camera_id, self.clip_writer,
+                                        pre_seconds=self.clip_seconds, post_seconds=self.clip_post_seconds)
+    
+    def classify_detections(self, frame, face_locations, face_encodings, scale, evidence=None, camera=None):
+        """Classify detected faces against the gallery and save crops; returns face_data"""
+        camera = camera or self.camera
         face_data = []
+        now = time.time()
         
         for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            # Scale back up
-            top *= 2
-            right *= 2
-            bottom *= 2
-            left *= 2
+            # Scale back up to input frame resolution
+            top = int(top / scale)
+            right = int(right / scale)
+            bottom = int(bottom / scale)
+            left = int(left / scale)
+            
+            category, name, roll_no, distance = self.match_face(face_encoding)
             
-            category, name, roll_no = self.classify_face(face_encoding)
+            # Flag a mess student entering a second time in the same meal
+            entry = 0
+            arrived = False
+            if category == 'mess':
+                entry, arrived = self.admissions.admit(roll_no, now)
+                if entry > 1 and arrived:
+                    log.warning("⚠ Re-entry: %s (%s) entry #%d this meal on %s", name, roll_no, entry, camera.camera_id,
+                                extra={'event': 'reentry', 'roll_no': roll_no, 'entry': entry,
+                                       'camera': camera.camera_id})
             
-            # Save face if outsider or college non-mess
+            # Save face if outsider or college non-mess, once per person per cooldown
+            # (roll_no for college students, encoding similarity for outsiders)
+            cluster_id = None
             if category in ['outsider', 'college']:
-                self.save_detected_face(frame, (left, top, right, bottom), category)
+                arrived = self.dedup.should_save(roll_no if category == 'college' else None, face_encoding)
+                if arrived:
+                    cluster_id = self.save_detected_face(frame, (left, top, right, bottom), category, evidence, camera,
+                                                         encoding=face_encoding, roll_no=roll_no)
+                    # Keep the seconds before and after an outsider shows up
+                    if category == 'outsider' and camera.clips is not None:
+                        camera.clips.trigger(cluster_id or 'outsider')
+            
+            if arrived and self.rollups is not None:
+                self.rollups.add(
+                    now, self.admissions.meal_at(now), camera.camera_id,
+                    'reentry' if entry > 1 else category,
+                    self.database.college_students.get(roll_no, {}).get('department')
+                )
+            
+            if self.event_log is not None:
+                self.event_log.log(
+                    camera.camera_id, category,
+                    roll_no=roll_no if category != 'outsider' else None,
+                    name=name, distance=distance,
+                    box=(left, top, right, bottom), cluster=cluster_id, timestamp=now
+                )
             
             face_data.append({
                 'box': (left, top, right, bottom),
                 'name': name,
                 'roll_no': roll_no,
-                'category': category
+                'category': category,
+                'cluster': cluster_id,
+                'entry': entry
             })
         
-        processed_frame = self.draw_labels(frame, face_data)
-        return processed_frame
+        return face_data
     
     def classify_face(self, face_encoding):
         """
         Classify face into three categories
         Returns: (category, name, roll_no)
         """
+        return self.match_face(face_encoding)[:3]
+    
+    def match_face(self, face_encoding):
+        """
+        classify_face plus the gallery distance behind the decision
+        Returns: (category, name, roll_no, distance); for outsiders the
+        distance to the closest enrolled face (None if the gallery is empty)
+        """
+        closest = None
+        
         # First check mess database
         mess_encodings, mess_roll_nos = self.encodings['mess']
         
@@ -187,13 +323,15 @@ class EnhancedFaceRecognitionSystem:
                 mess_encodings, face_encoding, tolerance=self.tolerance
             )
             face_distances = face_recognition.face_distance(mess_encodings, face_encoding)
+            if len(face_distances) > 0:
+                closest = float(np.min(face_distances))
             
             if len(face_distances) > 0 and True in matches:
                 best_match_idx = np.argmin(face_distances)
                 if matches[best_match_idx]:
                     roll_no = mess_roll_nos[best_match_idx]
                     student = self.database.mess_students[roll_no]
-                    return ('mess', student['name'], roll_no)
+                    return ('mess', student['name'], roll_no, float(face_distances[best_match_idx]))
         
         # Check college database
         college_encodings, college_roll_nos = self.encodings['college']
@@ -203,27 +341,33 @@ class EnhancedFaceRecognitionSystem:
                 college_encodings, face_encoding, tolerance=self.tolerance
             )
             face_distances = face_recognition.face_distance(college_encodings, face_encoding)
+            if len(face_distances) > 0:
+                closest = min(float(np.min(face_distances)), closest if closest is not None else np.inf)
             
             if len(face_distances) > 0 and True in matches:
                 best_match_idx = np.argmin(face_distances)
                 if matches[best_match_idx]:
                     roll_no = college_roll_nos[best_match_idx]
                     student = self.database.college_students[roll_no]
-                    return ('college', student['name'], roll_no)
+                    return ('college', student['name'], roll_no, float(face_distances[best_match_idx]))
         
         # Not found in any database
-        return ('outsider', 'Outsider', 'UNKNOWN')
+        return ('outsider', 'Outsider', 'UNKNOWN', closest)
     
-    def save_detected_face(self, frame, box, category):
-        """Save detected face to appropriate folder with padding"""
+    def save_detected_face(self, frame, box, category, evidence=None, camera=None, encoding=None, roll_no=None):
+        """
+        Save detected face to appropriate folder with padding
+        Returns the outsider cluster id for saved outsider crops, else None
+        """
+        camera = camera or self.camera
         left, top, right, bottom = box
     
-        # Create unique identifier for this face position
-        face_id = f"{left}_{top}_{right}_{bottom}"
-    
-    # Avoid saving the same face multiple times in same session
-        if face_id in self.saved_faces:
-            return
+    # Crop from the full-resolution frame when recognition ran on a reduced one
+        if evidence is not None:
+            full_frame = evidence.frame()
+            if full_frame is not None:
+                frame = full_frame
+                left, top, right, bottom = (int(v * evidence.scale) for v in box)
     
     # Add padding around the face (adjustable)
         padding_percent = 0.4  # 40% padding (increase for more zoom out)
@@ -254,25 +398,55 @@ class EnhancedFaceRecognitionSystem:
     # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     
+        cluster_id = None
         if category == 'outsider':
-            filename = f"data/detected_faces/outsiders/outsider_{timestamp}.jpg"
+            # Tag the crop with the outsider's cluster so sightings group per person
+            if encoding is not None:
+                cluster_id = self.outsider_clusters.assign(encoding)
+                filename = self.crop_store.path_for('outsiders', f"outsider_{cluster_id}_{timestamp}")
+            else:
+                filename = self.crop_store.path_for('outsiders', f"outsider_{timestamp}")
         else:  # college non-mess
-            filename = f"data/detected_faces/college_non_mess/student_{timestamp}.jpg"
-    
-    # Save the face with padding
-        cv2.imwrite(filename, face_crop)
-        self.saved_faces.add(face_id)
-        print(f"📸 Saved {category} face: {filename}")
+            filename = self.crop_store.path_for('college_non_mess', f"student_{timestamp}")
+    
+    # Queue the face with padding for the background writer
+    # Once written, the crop's encoding and context go to the shard's sidecar/manifest
+        on_written = functools.partial(
+            self.crop_store.record,
+            encoding=encoding,
+            camera=camera.camera_id,
+            time=round(time.time(), 3),
+            box=[int(v) for v in box],
+            cluster=cluster_id,
+            roll_no=roll_no if category == 'college' else None
+        )
+        filename = self.crop_writer.submit(filename, face_crop, on_written=on_written)
+        if cluster_id is not None:
+            self.outsider_clusters.add_crop(cluster_id, filename)
+            info = self.outsider_clusters.info(cluster_id)
+            sightings = info['count'] if info else 1
+            log.info("📸 Saved %s face (%s, sighting %d): %s", category, cluster_id, sightings, filename,
+                     extra={'event': 'face_saved', 'category': category, 'camera': camera.camera_id,
+                            'cluster': cluster_id, 'sightings': sightings, 'path': filename})
+        else:
+            log.info("📸 Saved %s face: %s", category, filename,
+                     extra={'event': 'face_saved', 'category': category, 'camera': camera.camera_id,
+                            'roll_no': roll_no, 'path': filename})
+        return cluster_id
 
     
-    def draw_labels(self, frame, face_data):
-        """Draw colored boxes and labels based on category"""
+    def face_labels(self, face_data):
+        """Box, color and label texts for each face, based on category"""
+        labels = []
         for face in face_data:
-            left, top, right, bottom = face['box']
             category = face['category']
             
             # Select color based on category
-            if category == 'mess':
+            if category == 'mess' and face.get('entry', 0) > 1:
+                color = self.REENTRY_COLOR
+                label_top = face['name']
+                label_bottom = f"{face['roll_no']} (RE-ENTRY)"
+            elif category == 'mess':
                 color = self.MESS_COLOR
                 label_top = face['name']
                 label_bottom = face['roll_no']
@@ -285,56 +459,216 @@ class EnhancedFaceRecognitionSystem:
                 label_top = "OUTSIDER"
                 label_bottom = "NOT AUTHORIZED"
             
-            # Draw rectangle
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+            labels.append((face['box'], color, label_top, label_bottom))
+        
+        return labels
+    
+    def draw_labels(self, frame, face_data):
+        """Draw colored boxes and labels based on category"""
+        for box, color, label_top, label_bottom in self.face_labels(face_data):
+            self.camera.overlay.draw_face(frame, box, color, label_top, label_bottom)
+        
+        return frame
+    
+    def process_for_overlay(self, frame, evidence=None):
+        """Worker-thread entry point: analyze a frame and publish its labels"""
+        face_data = self.analyze_frame(frame, evidence)
+        self.camera.overlay.update_results(self.face_labels(face_data))
+    
+    def dual_resolution_reduction(self):
+        """Largest decode reduction that still gives detection the profile's scale"""
+        for reduction in (8, 4, 2):
+            if self.profile['scale'] * reduction <= 1.0:
+                return reduction
+        return 1
+    
+    def open_frame_source(self, source=0, dual_resolution=False, stand_in=None, realtime=False):
+        """Open a frame source (see sources.open_source) and match the camera's input scale to it"""
+        reduction = self.dual_resolution_reduction() if dual_resolution else None
+        frame_source = open_source(source, reduction=reduction, stand_in=stand_in, realtime=realtime)
+        
+        # Only webcams support dual-resolution capture
+        evidence_reduction = getattr(frame_source, 'reduction', None)
+        self.camera.input_scale = 1.0 / evidence_reduction if evidence_reduction else 1.0
+        return frame_source
+    
+    def result_record(self, source_name, frame_number, face_data, latency_ms):
+        """Structured record of one recognised frame"""
+        return {
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'source': source_name,
+            'frame': frame_number,
+            'latency_ms': round(latency_ms, 2),
+            'faces': [
+                {
+                    'box': [int(v) for v in face['box']],
+                    'category': face['category'],
+                    'name': face['name'],
+                    'roll_no': face['roll_no'],
+                    'cluster': face.get('cluster'),
+                    'entry': face.get('entry', 0)
+                }
+                for face in face_data
+            ]
+        }
+    
+    def shutdown(self):
+        """Flush background writers and report their counters"""
+        if self.camera.clips is not None:
+            self.camera.clips.stop()
+        if self.clip_writer is not None:
+            self.clip_writer.stop()
+            if self.clip_writer.written or self.clip_writer.dropped:
+                print(f"Clips: {self.clip_writer.written} written, {self.clip_writer.dropped} dropped", file=sys.stderr)
+        self.crop_writer.stop()
+        self.crop_store.stop()
+        self.outsider_clusters.stop()
+        stats = self.crop_writer.stats()
+        print(f"Crop writer: {stats['written']} written, {stats['dropped']} dropped, "
+              f"{stats['failed']} failed, max queue {stats['max_queue_depth']}, "
+              f"{stats['avg_write_latency_ms']:.1f} ms avg write latency", file=sys.stderr)
+        if self.rollups is not None:
+            self.rollups.stop()
+        if self.event_log is not None:
+            self.event_log.stop()
+            stats = self.event_log.stats()
+            print(f"Event log: {stats['written']} events in {stats['batches']} batches, "
+                  f"{stats['dropped']} dropped, slowest batch {stats['max_batch_ms']:.1f} ms", file=sys.stderr)
+    
+    def apply_schedule(self):
+        """Pick up scheduler mode changes; returns the new settings or None"""
+        if self.scheduler is None:
+            return None
+        settings = self.scheduler.update()
+        if settings is not None:
+            self.profile = get_profile(settings['profile'])
+        return settings
+    
+    def iter_results(self, frame_source, max_frames=None):
+        """
+        Recognise every frame from an open frame source, yielding result records
+        
+        No windows are opened, so this works on headless servers, against
+        recorded footage and from scripts/tests.
+        """
+        frame_count = 0
+        
+        while max_frames is None or frame_count < max_frames:
+            loop_started = time.monotonic()
+            self.apply_schedule()
+            
+            ret, frame = frame_source.read()
+            if not ret:
+                break
+            if self.camera.clips is not None:
+                self.camera.clips.push(frame)
             
-            # Draw top label (name)
-            name_bg_height = 30
-            cv2.rectangle(
-                frame,
-                (left, top - name_bg_height),
-                (right, top),
-                color,
-                cv2.FILLED
-            )
-            cv2.putText(
-                frame,
-                label_top,
-                (left + 6, top - 10),
-                cv2.FONT_HERSHEY_DUPLEX,
-                0.6,
-                (255, 255, 255),
-                1
-            )
+            if self.scheduler is not None:
+                self.scheduler.count_frame()
+                if not self.scheduler.should_detect():
+                    self.scheduler.throttle(loop_started)
+                    continue
+                self.scheduler.mark_detected()
             
-            # Draw bottom label (roll number / status)
-            roll_bg_height = 30
-            cv2.rectangle(
-                frame,
-                (left, bottom),
-                (right, bottom + roll_bg_height),
-                color,
-                cv2.FILLED
-            )
-            cv2.putText(
-                frame,
-                label_bottom,
-                (left + 6, bottom + 20),
-                cv2.FONT_HERSHEY_DUPLEX,
-                0.5,
-                (255, 255, 255),
-                1
-            )
+            frame_count += 1
+            start = time.perf_counter()
+            face_data = self.analyze_frame(frame, frame_source.last_evidence())
+            latency_ms = (time.perf_counter() - start) * 1000
+            
+            yield self.result_record(frame_source.name, frame_count, face_data, latency_ms)
+            
+            if self.scheduler is not None:
+                self.scheduler.throttle(loop_started)
+    
+    def run_headless(self, frame_source, results_path='-', max_frames=None):
+        """Recognise without a display, writing one JSON record per frame"""
+        output, close_output = open_results(results_path)
+        summary = {'frames': 0, 'faces': 0, 'mess': 0, 'college': 0, 'outsider': 0, 'latency_ms': 0.0}
         
-        return frame
+        try:
+            for record in self.iter_results(frame_source, max_frames):
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                
+                summary['frames'] += 1
+                summary['faces'] += len(record['faces'])
+                summary['latency_ms'] += record['latency_ms']
+                for face in record['faces']:
+                    summary[face['category']] += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if close_output:
+                output.close()
+            if self.scheduler is not None:
+                self.scheduler.stop()
+        
+        if summary['frames']:
+            summary['latency_ms'] /= summary['frames']
+        return summary
+    
+    def start_multi_camera(self, sources, workers=2, dual_resolution=False, headless=False,
+                           results_path='-', duration=None, stand_in=None, realtime=False):
+        """
+        Recognise several cameras in this process
+        
+        All cameras share this system's gallery and one pool of
+        detection/encoding worker processes (see multicam.MultiCameraRecognizer).
+        """
+        reduction = self.dual_resolution_reduction() if dual_resolution else None
+        frame_sources = [
+            open_source(source, reduction=reduction, stand_in=stand_in, realtime=realtime)
+            for source in sources
+        ]
+        
+        for source, frame_source in zip(sources, frame_sources):
+            if not frame_source.isOpened():
+                print(f"ERROR: Could not open frame source {source}")
+                for opened in frame_sources:
+                    opened.release()
+                return
+        
+        print(f"✓ Cameras: {', '.join(f.name for f in frame_sources)}")
+        print(f"✓ Shared workers: {workers}")
+        
+        recognizer = MultiCameraRecognizer(self, frame_sources, workers=workers, scheduler=self.scheduler)
+        camera_stats = recognizer.run(headless=headless, results_path=results_path, duration=duration)
+        self.shutdown()
+        return camera_stats
     
-    def start_recognition(self):
-        """Start real-time recognition system"""
+    def start_recognition(self, source=0, dual_resolution=False, decoupled=True, headless=False,
+                          results_path='-', max_frames=None, stand_in=None, realtime=False):
+        """
+        Start real-time recognition system
+        
+        source: webcam index, video file, image directory or stream URL
+        dual_resolution: recognise on a reduced stream and keep full
+        resolution frames only for outsider/non-mess evidence crops
+        decoupled: recognise in a background thread and redraw the latest
+        results on every captured frame, instead of one frame at a time
+        headless: no window; write JSON records to results_path instead
+        """
+        video_capture = self.open_frame_source(source, dual_resolution, stand_in, realtime)
+        
+        if not video_capture.isOpened():
+            print(f"ERROR: Could not open frame source {source}")
+            return
+        
+        if headless:
+            summary = self.run_headless(video_capture, results_path, max_frames)
+            video_capture.release()
+            self.shutdown()
+            print(f"Headless run finished: {summary['frames']} frames, {summary['faces']} faces "
+                  f"(mess {summary['mess']}, college {summary['college']}, outsider {summary['outsider']}), "
+                  f"{summary['latency_ms']:.1f} ms/frame", file=sys.stderr)
+            return summary
+        
         print("\n" + "="*60)
         print("MESS FACE RECOGNITION SYSTEM - THREE-TIER CLASSIFICATION")
         print("="*60)
         print(f"✓ Mess Students: {len(self.encodings['mess'][0])}")
         print(f"✓ College Students: {len(self.encodings['college'][0])}")
+        print(f"✓ Profile: {self.profile['name']}")
         print("\nColor Legend:")
         print("  🟢 GREEN  = Mess Student (Authorized)")
         print("  🟠 ORANGE = College Student (No Mess)")
@@ -342,55 +676,180 @@ class EnhancedFaceRecognitionSystem:
         print("\nPress 'q' to quit")
         print("="*60 + "\n")
         
-        video_capture = cv2.VideoCapture(0)
-        
-        if not video_capture.isOpened():
-            print("ERROR: Could not open webcam")
-            return
-        
-        video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        camera_stats = video_capture.stats()
+        print(f"✓ Source: {video_capture.name}")
+        if 'resolution' in camera_stats:
+            print(f"✓ Camera: {camera_stats['resolution'][0]}x{camera_stats['resolution'][1]} {camera_stats['fourcc']}")
+        if self.camera.input_scale != 1.0:
+            print(f"✓ Dual resolution: recognising at {self.camera.input_scale:g}x size")
         
         frame_count = 0
+        worker = LatestFrameWorker(self.process_for_overlay).start() if decoupled else None
+        
+        if self.scheduler is not None:
+            print("Scheduler keys: 'm' = force meal mode, 'w' = force watch mode, 'a' = back to timetable")
         
         while True:
+            loop_started = time.monotonic()
+            self.apply_schedule()
+            
             ret, frame = video_capture.read()
             
             if not ret:
-                print("Failed to grab frame")
+                log.warning("Failed to grab frame", extra={'event': 'capture_failed', 'camera': self.camera.camera_id})
                 break
             
             frame_count += 1
-            processed_frame = self.recognize_faces(frame)
+            evidence = video_capture.last_evidence()
+            if self.camera.clips is not None:
+                self.camera.clips.push(frame)
             
-            # Display stats
-            info_text = f"Mess: {len(self.encodings['mess'][0])} | College: {len(self.encodings['college'][0])} | Press 'q' to quit"
-            cv2.putText(
-                processed_frame,
-                info_text,
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                (255, 255, 255),
-                2
-            )
+            # Display stats (banner sprite is re-rendered only when the text changes)
+            info_text = f"Mess: {len(self.encodings['mess'][0])} | College: {len(self.encodings['college'][0])} | {getattr(video_capture, 'fps', 0):.0f} fps | Press 'q' to quit"
+            if self.scheduler is not None:
+                info_text += f" | {self.scheduler.settings()['mode']} mode"
+            
+            detect_due = self.scheduler is None or self.scheduler.should_detect()
+            
+            if worker is not None:
+                if detect_due and worker.offer(frame, evidence) and self.scheduler is not None:
+                    self.scheduler.mark_detected()
+                processed_frame = self.camera.overlay.render(frame, info_text)
+            else:
+                if detect_due:
+                    processed_frame = self.recognize_faces(frame, evidence)
+                    if self.scheduler is not None:
+                        self.scheduler.mark_detected()
+                else:
+                    processed_frame = self.camera.buffer_pool.display_copy(frame)
+                self.camera.overlay.draw_banner(processed_frame, info_text)
             
             cv2.imshow('Mess Recognition System - 3-Tier Classification', processed_frame)
             
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
-        
+            if self.scheduler is not None:
+                if key == ord('m'):
+                    self.scheduler.override('meal')
+                elif key == ord('w'):
+                    self.scheduler.override('watch')
+                elif key == ord('a'):
+                    self.scheduler.override(None)
+                self.scheduler.count_frame()
+                self.scheduler.throttle(loop_started)
+        
+        if worker is not None:
+            worker.stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
         video_capture.release()
         cv2.destroyAllWindows()
+        camera_stats = video_capture.stats()
         print(f"\nSystem stopped. Processed {frame_count} frames")
-        print(f"Saved faces: {len(self.saved_faces)}")
+        if worker is not None:
+            print(f"Recognised {worker.processed} frames in the background")
+        if 'frame_delay_ms' in camera_stats:
+            print(f"Camera: {camera_stats['fps']:.1f} fps delivered, "
+                  f"{camera_stats['frame_delay_ms']:.0f} ms frame delay ({camera_stats['delay_source']}), "
+                  f"{camera_stats['frames_dropped']} stale frames skipped")
+        print(f"Saved faces: {self.dedup.saved} ({self.dedup.suppressed} repeat sightings skipped)")
+        self.shutdown()
+
+
+def parse_args():
+    """Command line options for the recognizer"""
+    parser = argparse.ArgumentParser(description="Mess face recognition system")
+    parser.add_argument('--source', nargs='+', default=['0'],
+                        help="Webcam index, video file, image directory or stream URL "
+                             "(several sources run as one multi-camera process)")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Detection/encoding worker processes shared by all cameras")
+    parser.add_argument('--duration', type=float, default=None,
+                        help="Multi-camera: stop after this many seconds")
+    parser.add_argument('--stand-in', default=None,
+                        help="Local video file played in real time in place of a stream URL")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Pace video files at their own frame rate, skipping frames like a live feed")
+    parser.add_argument('--headless', action='store_true',
+                        help="No window; write one JSON record per frame")
+    parser.add_argument('--results', default='-',
+                        help="Headless results file (JSON lines, '-' for stdout)")
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help="Stop after this many frames")
+    parser.add_argument('--schedule', action='store_true',
+                        help="Ramp capture rate, detection cadence, workers and profile by meal window")
+    parser.add_argument('--schedule-file', default=None,
+                        help="JSON file with meal windows/modes (implies --schedule)")
+    parser.add_argument('--mode', choices=['meal', 'watch'], default=None,
+                        help="Force a scheduler mode instead of following the timetable (implies --schedule)")
+    parser.add_argument('--profile', default='balanced', choices=sorted(PROFILES),
+                        help="Detection/encoding profile for the gate loop")
+    parser.add_argument('--dual-resolution', action='store_true',
+                        help="Recognise on a reduced stream, crop evidence at full resolution")
+    parser.add_argument('--lockstep', action='store_true',
+                        help="Recognise every displayed frame instead of in the background")
+    parser.add_argument('--crop-format', default='jpg', choices=['jpg', 'webp', 'png'],
+                        help="Encoding for saved outsider/non-mess crops")
+    parser.add_argument('--crop-quality', type=int, default=90,
+                        help="JPEG/WebP quality for saved crops")
+    parser.add_argument('--crop-queue', type=int, default=64,
+                        help="Crops waiting to be written before the oldest is dropped")
+    parser.add_argument('--save-cooldown', type=float, default=300.0,
+                        help="Seconds before the same student/outsider is saved again")
+    parser.add_argument('--retention-days', type=float, default=90,
+                        help="Delete saved crops older than this many days (0 keeps them forever)")
+    parser.add_argument('--max-crop-gb', type=float, default=None,
+                        help="Cap on saved crops per category; oldest hours are deleted first")
+    parser.add_argument('--events-db', default='data/events.db',
+                        help="SQLite entry-event log ('' to disable)")
+    parser.add_argument('--clip-seconds', type=float, default=5.0,
+                        help="Seconds of video kept before an outsider event (0 disables clips)")
+    parser.add_argument('--clip-post-seconds', type=float, default=3.0,
+                        help="Seconds of video recorded after an outsider event")
+    parser.add_argument('--enroll-profile', default='enroll', choices=sorted(PROFILES),
+                        help="Detection/encoding profile for enrollment photos")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Minimum level for recognizer diagnostics")
+    parser.add_argument('--log-file', default='data/logs/recognizer.jsonl',
+                        help="JSON-lines diagnostics log ('' to disable)")
+    parser.add_argument('--log-json', action='store_true',
+                        help="Print diagnostics to the console as JSON instead of plain text")
+    return parser.parse_args()
 
 
 def main():
-    """Main enrollment and recognition function"""
-    
+    """Parse options and run with diagnostics written off the frame path"""
+    args = parse_args()
+    
+    # Headless results on stdout: the records are the only thing written there,
+    # diagnostics and every other message go to stderr
+    results_on_stdout = args.headless and args.results == '-'
+    logs = LogPipeline(
+        level=args.log_level,
+        json_path=args.log_file or None,
+        json_console=args.log_json,
+        stream=sys.stderr if results_on_stdout else sys.stdout
+    )
+    try:
+        if results_on_stdout:
+            results = sys.stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                run(args, results)
+        else:
+            run(args)
+    finally:
+        logs.stop()
+        stats = logs.stats()
+        if stats['dropped'] or stats['suppressed']:
+            print(f"Diagnostics: {stats['suppressed']} rate-limited, {stats['dropped']} dropped", file=sys.stderr)
+
+
+def run(args, results=None):
+    """Main enrollment and recognition function (results: open stream for headless records)"""
+    results_path = results if results is not None else args.results
     # Initialize database
-    db = StudentDatabase()
+    db = StudentDatabase(enroll_profile=args.enroll_profile)
     
     print("\n" + "="*60)
     print("ENROLLMENT MODE")
@@ -460,8 +919,49 @@ def main():
     print("STARTING RECOGNITION SYSTEM")
     print("="*60)
     
-    recognition_system = EnhancedFaceRecognitionSystem(db)
-    recognition_system.start_recognition()
+    schedule = load_schedule(args.schedule_file) if args.schedule_file else {}
+    recognition_system = EnhancedFaceRecognitionSystem(
+        db,
+        profile=args.profile,
+        crop_format=args.crop_format,
+        crop_quality=args.crop_quality,
+        crop_queue=args.crop_queue,
+        save_cooldown=args.save_cooldown,
+        retention_days=args.retention_days,
+        max_crop_bytes=int(args.max_crop_gb * 1e9) if args.max_crop_gb else None,
+        events_db=args.events_db,
+        meal_windows=schedule.get('windows'),
+        clip_seconds=args.clip_seconds,
+        clip_post_seconds=args.clip_post_seconds
+    )
+    
+    if args.schedule or args.schedule_file or args.mode:
+        recognition_system.scheduler = MealScheduler(**schedule)
+        if args.mode:
+            recognition_system.scheduler.override(args.mode)
+    if len(args.source) > 1:
+        recognition_system.start_multi_camera(
+            args.source,
+            workers=args.workers,
+            dual_resolution=args.dual_resolution,
+            headless=args.headless,
+            results_path=results_path,
+            duration=args.duration,
+            stand_in=args.stand_in,
+            realtime=args.realtime
+        )
+        return
+    
+    recognition_system.start_recognition(
+        source=args.source[0],
+        dual_resolution=args.dual_resolution,
+        decoupled=not args.lockstep,
+        headless=args.headless,
+        results_path=results_path,
+        max_frames=args.max_frames,
+        stand_in=args.stand_in,
+        realtime=args.realtime
+    )
 
 
 if __name__ == "__main__":
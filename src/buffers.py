@@ -0,0 +1,52 @@
+"""Preallocated frame buffers for the recognition hot path"""
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    """
+    Named, reusable image buffers
+
+    A buffer is allocated the first time a name is requested and reused
+    for as long as the requested shape/dtype stays the same (i.e. until
+    the camera resolution changes). Buffers are overwritten on the next
+    frame, so callers must not keep references across frames. Each
+    thread that processes frames needs its own pool.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Return the buffer for name, (re)allocating only on shape change"""
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buffer
+            self.allocations += 1
+        return buffer
+
+    def prepare_rgb(self, frame, scale):
+        """
+        Resize a BGR frame by scale and convert it to RGB without allocating
+
+        The result is C-contiguous, as face_recognition/dlib requires.
+        """
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            small_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            small_frame = self.get('small', (small_size[1], small_size[0], 3))
+            cv2.resize(frame, small_size, dst=small_frame, interpolation=cv2.INTER_LINEAR)
+        else:
+            small_frame = frame
+
+        rgb_frame = self.get('rgb', small_frame.shape)
+        cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+        return rgb_frame
+
+    def display_copy(self, frame):
+        """Copy frame into the display buffer so overlays leave the capture frame untouched"""
+        display_frame = self.get('display', frame.shape, frame.dtype)
+        np.copyto(display_frame, frame)
+        return display_frame
@@ -0,0 +1,277 @@
+"""Low-latency webcam capture"""
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+
+def fourcc_to_str(value):
+    """Decode a CAP_PROP_FOURCC value into its four-letter code"""
+    value = int(value)
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+class LowLatencyCapture:
+    """
+    Webcam wrapper tuned for latency instead of smoothness
+
+    - Requests MJPG, so USB webcams can deliver 1280x720 at full frame
+      rate instead of the 5-10 fps they manage with raw YUYV
+    - Shrinks the driver queue (CAP_PROP_BUFFERSIZE) where supported
+    - On read(), grab()s past frames that were already queued and only
+      retrieve()s (decodes) the newest one
+    - Tracks delivered fps and the delay between exposure and delivery
+
+    read()/isOpened()/release() mirror cv2.VideoCapture so it can be
+    used as a drop-in replacement.
+    """
+
+    def __init__(self, index=0, width=1280, height=720, fps=30, fourcc='MJPG',
+                 buffer_size=1, max_drain=4):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.requested_fps = fps
+        self.requested_fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.max_drain = max_drain
+
+        # Stats
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.fps = 0.0
+        self.frame_delay_ms = 0.0
+        self.delay_source = 'estimate'
+        self.last_frame_time = None
+
+        self.cap = self.open()
+
+    def open(self):
+        """Open the camera and negotiate format, size, rate and buffering"""
+        cap = cv2.VideoCapture(self.index)
+        if not cap.isOpened():
+            return cap
+
+        # FOURCC has to be set before the resolution on most backends
+        if self.requested_fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.requested_fourcc))
+        if self.width and self.height:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.requested_fps:
+            cap.set(cv2.CAP_PROP_FPS, self.requested_fps)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        self.fourcc = fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or self.width
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or self.height
+        self.camera_fps = cap.get(cv2.CAP_PROP_FPS) or self.requested_fps or 30
+        return cap
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def grab_latest(self):
+        """
+        grab() until a fresh frame arrives, skipping queued stale ones
+
+        A grab that returns in well under one frame interval was served
+        from the driver queue, so the frame is older than it looks.
+        Returns (grabbed, seconds the final grab blocked).
+        """
+        frame_interval = 1.0 / self.camera_fps
+
+        start = time.perf_counter()
+        grabbed = self.cap.grab()
+        waited = time.perf_counter() - start
+
+        drained = 0
+        while grabbed and waited < frame_interval / 2 and drained < self.max_drain:
+            start = time.perf_counter()
+            grabbed = self.cap.grab()
+            waited = time.perf_counter() - start
+            drained += 1
+
+        self.frames_dropped += drained
+        return grabbed, waited
+
+    def read(self):
+        """Return (ret, frame) for the newest available frame"""
+        if not self.isOpened():
+            return False, None
+
+        grabbed, waited = self.grab_latest()
+        if not grabbed:
+            return False, None
+
+        ret, frame = self.cap.retrieve()
+        if not ret:
+            return False, None
+
+        self.update_stats(waited)
+        return True, frame
+
+    def update_stats(self, waited):
+        """Update delivered fps and exposure-to-delivery delay"""
+        now = time.monotonic()
+        if self.last_frame_time is not None:
+            elapsed = now - self.last_frame_time
+            if elapsed > 0:
+                instant_fps = 1.0 / elapsed
+                self.fps = instant_fps if self.fps == 0 else 0.9 * self.fps + 0.1 * instant_fps
+        self.last_frame_time = now
+        self.frames_delivered += 1
+
+        # V4L2 reports the buffer timestamp on the monotonic clock; other
+        # backends report stream position or nothing, so fall back to an
+        # estimate of half an exposure interval plus time spent decoding
+        timestamp_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        delay_ms = now * 1000 - timestamp_ms
+        if timestamp_ms > 0 and 0 <= delay_ms < 2000:
+            self.delay_source = 'timestamp'
+        else:
+            self.delay_source = 'estimate'
+            delay_ms = 500.0 / self.camera_fps + max(0.0, (1.0 / self.camera_fps - waited) * 1000)
+        self.frame_delay_ms = delay_ms if self.frame_delay_ms == 0 else 0.9 * self.frame_delay_ms + 0.1 * delay_ms
+
+    def stats(self):
+        """Capture statistics for display/logging"""
+        return {
+            'fourcc': getattr(self, 'fourcc', ''),
+            'resolution': (self.width, self.height),
+            'fps': self.fps,
+            'frame_delay_ms': self.frame_delay_ms,
+            'delay_source': self.delay_source,
+            'frames_delivered': self.frames_delivered,
+            'frames_dropped': self.frames_dropped,
+        }
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+# imdecode flags that let libjpeg scale during decode (DCT scaling),
+# much cheaper than decoding full size and resizing afterwards
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class EvidenceFrame:
+    """Lazy handle to the full-resolution frame behind a low-resolution one"""
+
+    def __init__(self, capture, frame_id, scale):
+        self.capture = capture
+        self.frame_id = frame_id
+        self.scale = scale  # full-resolution pixels per low-resolution pixel
+
+    def frame(self):
+        """Full-resolution BGR frame, or None if it has left the ring"""
+        return self.capture.full_frame(self.frame_id)
+
+
+class DualResolutionCapture(LowLatencyCapture):
+    """
+    Capture at full resolution, hand recognition a reduced stream
+
+    When the backend passes MJPG through untouched (CAP_PROP_CONVERT_RGB=0),
+    each frame is decoded once at 1/reduction size using libjpeg's scaled
+    decode, and the compressed bytes are kept in a short ring. A full-size
+    decode only happens when an evidence crop is requested via
+    full_frame(). Backends that always deliver decoded BGR fall back to
+    resizing, with the decoded full frames kept in the ring instead.
+    """
+
+    def __init__(self, index=0, width=1280, height=720, reduction=2, ring_size=30,
+                 decoded_ring_size=8, **kwargs):
+        if reduction not in REDUCED_DECODE_FLAGS:
+            raise ValueError(f"reduction must be one of {sorted(REDUCED_DECODE_FLAGS)}")
+        self.reduction = reduction
+        self.ring = deque(maxlen=ring_size)
+        self.decoded_ring_size = decoded_ring_size
+        self.frame_id = 0
+        self.raw_mjpeg = None  # decided on the first frame
+        self.decoded_cache = (None, None)
+        self.low_frame = None
+        super().__init__(index, width=width, height=height, **kwargs)
+
+    def open(self):
+        cap = super().open()
+        if cap.isOpened() and self.fourcc == 'MJPG':
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        return cap
+
+    @staticmethod
+    def is_encoded(frame):
+        return frame.ndim == 1 or frame.shape[0] == 1
+
+    def read(self):
+        """Return (ret, low_resolution_frame); see last_evidence() for crops"""
+        if not self.isOpened():
+            return False, None
+
+        grabbed, waited = self.grab_latest()
+        if not grabbed:
+            return False, None
+
+        ret, frame = self.cap.retrieve()
+        if not ret or frame is None:
+            return False, None
+
+        if self.raw_mjpeg is None:
+            self.raw_mjpeg = self.is_encoded(frame)
+            if not self.raw_mjpeg and (frame.ndim != 3 or frame.shape[2] != 3):
+                # Backend handed us raw YUV instead - reopen with conversion on
+                self.cap.release()
+                self.cap = LowLatencyCapture.open(self)
+                ret, frame = self.cap.read()
+                if not ret:
+                    return False, None
+
+            if not self.raw_mjpeg:
+                # Decoded frames are ~30x larger than JPEG bytes; keep fewer
+                self.ring = deque(self.ring, maxlen=min(self.ring.maxlen, self.decoded_ring_size))
+
+        self.frame_id += 1
+        if self.raw_mjpeg:
+            payload = frame.reshape(-1)
+            low_frame = cv2.imdecode(payload, REDUCED_DECODE_FLAGS[self.reduction])
+            if low_frame is None:
+                return False, None
+        else:
+            payload = frame
+            if self.reduction == 1:
+                low_frame = frame
+            else:
+                height, width = frame.shape[:2]
+                low_size = (width // self.reduction, height // self.reduction)
+                if self.low_frame is None or self.low_frame.shape[:2] != (low_size[1], low_size[0]):
+                    self.low_frame = np.empty((low_size[1], low_size[0], 3), dtype=np.uint8)
+                cv2.resize(frame, low_size, dst=self.low_frame, interpolation=cv2.INTER_AREA)
+                low_frame = self.low_frame
+
+        self.ring.append((self.frame_id, payload))
+        self.update_stats(waited)
+        return True, low_frame
+
+    def last_evidence(self):
+        """EvidenceFrame for the frame most recently returned by read()"""
+        return EvidenceFrame(self, self.frame_id, self.reduction)
+
+    def full_frame(self, frame_id):
+        """Decode (once) and return the full-resolution frame for frame_id"""
+        cached_id, cached_frame = self.decoded_cache
+        if cached_id == frame_id:
+            return cached_frame
+
+        # Snapshot: the capture thread keeps appending while workers read
+        for ring_id, payload in list(self.ring):
+            if ring_id == frame_id:
+                full = cv2.imdecode(payload, cv2.IMREAD_COLOR) if self.raw_mjpeg else payload
+                self.decoded_cache = (frame_id, full)
+                return full
+        return None
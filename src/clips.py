@@ -0,0 +1,199 @@
+"""Pre-event video clips from an in-memory ring of JPEG frames"""
+import os
+import time
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+import cv2
+import numpy as np
+
+from workers import LatestFrameWorker
+from diagnostics import get_logger
+
+log = get_logger('clips')
+
+
+def unused_path(path):
+    """path, or path with _2, _3, ... before the extension if a file is already there"""
+    base, extension = os.path.splitext(path)
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = f"{base}_{number}{extension}"
+    return path
+
+
+class ClipWriter:
+    """
+    Writes finished clips (lists of JPEG frames) to MJPG .avi files
+    on a background thread
+
+    At most max_pending clips wait to be written; further clips are
+    dropped and counted rather than growing memory.
+    """
+
+    def __init__(self, max_pending=4):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self.run, name='clip-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, path, frames):
+        """Queue frames [(unix time, jpeg bytes), ...] for writing to path"""
+        try:
+            self.queue.put_nowait((path, frames))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self.write(*item)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                log.error("Error writing clip %s: %s", item[0], e, extra={'event': 'clip_error', 'path': item[0]})
+
+    def write(self, path, frames):
+        first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else 10.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path[:-4] + '.part.avi'
+        writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+        try:
+            for _, data in frames:
+                frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if frame.shape[:2] != (height, width):
+                    frame = cv2.resize(frame, (width, height))
+                writer.write(frame)
+        finally:
+            writer.release()
+        path = unused_path(path)
+        os.replace(temp_path, path)
+        log.info("🎬 Saved clip: %s (%d frames, %.1f s)", path, len(frames), duration,
+                 extra={'event': 'clip_saved', 'path': path, 'frames': len(frames), 'duration': round(duration, 2)})
+
+    def stop(self, timeout=30.0):
+        """Write queued clips and stop"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+class ClipRecorder:
+    """
+    Last pre_seconds of one camera, kept as JPEG bytes
+
+    push() offers frames (at most fps per second) to an encoder thread and
+    never waits for it: if the encoder is still busy the frame is skipped.
+    The ring is bounded by age and by max_bytes, so memory stays fixed.
+
+    trigger() starts a clip from the current ring (pre-roll); frames keep
+    being added until post_seconds after the last trigger (capped at
+    max_clip_seconds), then the clip goes to the ClipWriter.
+    """
+
+    def __init__(self, camera_id, writer, directory='data/clips', pre_seconds=5.0, post_seconds=3.0,
+                 fps=10, quality=70, max_bytes=16 * 1024 * 1024, max_clip_seconds=30.0):
+        self.camera_id = camera_id
+        self.writer = writer
+        self.directory = directory
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.min_interval = 1.0 / fps
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.max_bytes = max_bytes
+        self.max_clip_seconds = max_clip_seconds
+
+        self.lock = threading.Lock()
+        self.ring = deque()         # (unix time, jpeg bytes), oldest first
+        self.ring_bytes = 0
+        self.active = None          # clip being collected
+        self.last_offer = 0.0
+        self.skipped = 0
+        self.clips = 0
+
+        self.encoder = LatestFrameWorker(self.encode, name=f"clip-encoder-{camera_id}").start()
+
+    def push(self, frame):
+        """Offer a captured frame (cheap; never blocks on encoding)"""
+        now = time.monotonic()
+        if now - self.last_offer < self.min_interval:
+            return
+        if self.encoder.offer(frame, time.time()):
+            self.last_offer = now
+        else:
+            self.skipped += 1
+
+    def encode(self, frame, timestamp):
+        ok, jpeg = cv2.imencode('.jpg', frame, self.params)
+        if not ok:
+            return
+        data = jpeg.tobytes()
+
+        with self.lock:
+            self.ring.append((timestamp, data))
+            self.ring_bytes += len(data)
+            while self.ring and (timestamp - self.ring[0][0] > self.pre_seconds or self.ring_bytes > self.max_bytes):
+                _, old = self.ring.popleft()
+                self.ring_bytes -= len(old)
+
+            if self.active is not None:
+                self.active['frames'].append((timestamp, data))
+                if timestamp >= self.active['until']:
+                    self.finish()
+
+    def trigger(self, label='event'):
+        """Start (or extend) a clip around now; returns its path"""
+        now = time.time()
+        with self.lock:
+            if self.active is not None:
+                self.active['until'] = min(now + self.post_seconds,
+                                           self.active['started'] + self.max_clip_seconds)
+                return self.active['path']
+
+            stamp = datetime.fromtimestamp(now)
+            path = os.path.join(self.directory, stamp.strftime('%Y-%m-%d'),
+                                f"{self.camera_id}_{label}_{stamp.strftime('%H%M%S')}{stamp.microsecond // 1000:03d}.avi")
+            self.active = {
+                'path': path,
+                'started': now,
+                'until': now + self.post_seconds,
+                'frames': list(self.ring),
+            }
+            return path
+
+    def finish(self):
+        """Hand the active clip to the writer (caller holds the lock)"""
+        clip, self.active = self.active, None
+        if clip['frames']:
+            if self.writer.submit(clip['path'], clip['frames']):
+                self.clips += 1
+
+    def stop(self):
+        """Stop encoding and write any clip still collecting post-roll"""
+        self.encoder.stop()
+        with self.lock:
+            if self.active is not None:
+                self.finish()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'ring_frames': len(self.ring),
+                'ring_bytes': self.ring_bytes,
+                'clips': self.clips,
+                'skipped': self.skipped,
+            }
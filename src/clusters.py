@@ -0,0 +1,254 @@
+"""Online clustering of outsider sightings"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+import numpy as np
+
+from diagnostics import get_logger
+
+log = get_logger('clusters')
+
+ENCODING_SIZE = 128
+
+
+def cluster_number(cluster_id):
+    """'O00042' -> 42 (ids outgrow their zero padding, so compare them as numbers)"""
+    return int(cluster_id[1:])
+
+
+class OutsiderClusters:
+    """
+    Incremental index grouping outsider encodings by person
+
+    Each saved outsider crop is assigned to the nearest cluster centroid
+    (within tolerance) or starts a new cluster. Centroids are running
+    means, so two clusters of the same person can drift together. After
+    start(), a background thread merges clusters closer than
+    merge_tolerance and writes the index to path every maintain_interval
+    seconds, so the recognition loop never waits for either.
+
+    Cluster ids ('O00001', ...) are never reused. A merged-away id is kept
+    as an alias of the surviving cluster, so ids already written into
+    crop filenames keep resolving. Memory is bounded by max_clusters (the
+    least recently seen cluster is forgotten first) and max_aliases (the
+    oldest aliases are dropped first).
+    """
+
+    def __init__(self, path='data/detected_faces/outsiders/clusters.json', tolerance=0.5,
+                 merge_tolerance=0.4, max_clusters=1000, max_crops=20, maintain_interval=300.0,
+                 max_aliases=10000):
+        self.path = path
+        self.tolerance = tolerance
+        self.merge_tolerance = merge_tolerance
+        self.max_clusters = max_clusters
+        self.max_crops = max_crops
+        self.maintain_interval = maintain_interval
+        self.max_aliases = max_aliases
+
+        self.lock = threading.RLock()
+        self.ids = []                      # row -> cluster id
+        self.centroids = np.zeros((max_clusters + 1, ENCODING_SIZE))
+        self.clusters = {}                 # cluster id -> info dict
+        self.aliases = {}                  # merged id -> surviving id
+        self.next_id = 1
+        self.last_maintained = time.monotonic()
+        self.dirty = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.next_id = data.get('next_id', 1)
+        self.aliases = data.get('aliases', {})
+        self.trim_aliases()
+        clusters = sorted(data.get('clusters', {}).items(), key=lambda item: item[1]['last_seen'])
+        for cluster_id, info in clusters[-self.max_clusters:]:
+            centroid = info.pop('centroid')
+            self.add_row(cluster_id, np.asarray(centroid, dtype=np.float64), info)
+
+    def save(self):
+        """Write the index atomically"""
+        with self.lock:
+            clusters = {}
+            for row, cluster_id in enumerate(self.ids):
+                info = dict(self.clusters[cluster_id])
+                info['centroid'] = [round(float(v), 5) for v in self.centroids[row]]
+                clusters[cluster_id] = info
+            data = {'next_id': self.next_id, 'aliases': self.aliases, 'clusters': clusters}
+            self.dirty = False
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def add_row(self, cluster_id, centroid, info):
+        self.centroids[len(self.ids)] = centroid
+        self.ids.append(cluster_id)
+        self.clusters[cluster_id] = info
+
+    def remove_row(self, row):
+        """Drop a cluster (swap-with-last keeps the centroid matrix dense)"""
+        cluster_id = self.ids[row]
+        last = len(self.ids) - 1
+        self.centroids[row] = self.centroids[last]
+        self.ids[row] = self.ids[last]
+        self.ids.pop()
+        return self.clusters.pop(cluster_id)
+
+    def resolve(self, cluster_id):
+        """Follow aliases of merged clusters to the surviving id"""
+        with self.lock:
+            while cluster_id in self.aliases:
+                cluster_id = self.aliases[cluster_id]
+            return cluster_id
+
+    def assign(self, encoding):
+        """Cluster id for an outsider encoding (a new cluster if nobody is close)"""
+        encoding = np.asarray(encoding, dtype=np.float64)
+        now = datetime.now().isoformat(timespec='seconds')
+
+        with self.lock:
+            count = len(self.ids)
+            if count:
+                distances = np.linalg.norm(self.centroids[:count] - encoding, axis=1)
+                row = int(np.argmin(distances))
+                if distances[row] <= self.tolerance:
+                    cluster_id = self.ids[row]
+                    info = self.clusters[cluster_id]
+                    info['count'] += 1
+                    info['last_seen'] = now
+                    self.centroids[row] += (encoding - self.centroids[row]) / info['count']
+                    self.dirty = True
+                    return cluster_id
+
+            if count >= self.max_clusters:
+                self.forget_oldest()
+
+            cluster_id = f"O{self.next_id:05d}"
+            self.next_id += 1
+            self.add_row(cluster_id, encoding, {'count': 1, 'first_seen': now, 'last_seen': now, 'crops': []})
+            self.dirty = True
+            return cluster_id
+
+    def add_crop(self, cluster_id, path):
+        with self.lock:
+            info = self.clusters.get(self.resolve(cluster_id))
+            if info is not None:
+                info['crops'].append({'path': path, 'saved': datetime.now().isoformat(timespec='seconds')})
+                del info['crops'][:-self.max_crops]
+                self.dirty = True
+
+    def trim_aliases(self):
+        """Drop the oldest aliases beyond max_aliases (dicts keep insertion order)"""
+        for old in list(self.aliases)[:max(0, len(self.aliases) - self.max_aliases)]:
+            del self.aliases[old]
+
+    def forget_oldest(self):
+        row = min(range(len(self.ids)), key=lambda r: self.clusters[self.ids[r]]['last_seen'])
+        cluster_id = self.ids[row]
+        self.remove_row(row)
+        self.aliases = {old: new for old, new in self.aliases.items() if new != cluster_id}
+
+    def merge(self):
+        """
+        Merge clusters whose centroids are within merge_tolerance; returns merges done
+
+        The lock is released between merges, so assign() waits for at most
+        one distance pass rather than the whole merge run.
+        """
+        merged = 0
+        while self.merge_closest():
+            merged += 1
+        return merged
+
+    def merge_closest(self):
+        """Merge the closest pair of clusters if within merge_tolerance; returns True if merged"""
+        with self.lock:
+            count = len(self.ids)
+            if count < 2:
+                return False
+            centroids = self.centroids[:count]
+            squared = (centroids ** 2).sum(axis=1)
+            distances = squared[:, None] + squared[None, :] - 2 * centroids @ centroids.T
+            np.fill_diagonal(distances, np.inf)
+            a, b = np.unravel_index(np.argmin(distances), distances.shape)
+            if distances[a, b] > self.merge_tolerance ** 2:
+                return False
+
+            # Keep the older id (lower number); fold the other into it
+            if cluster_number(self.ids[b]) < cluster_number(self.ids[a]):
+                a, b = b, a
+            keep_id, drop_id = self.ids[a], self.ids[b]
+            keep, drop = self.clusters[keep_id], self.clusters[drop_id]
+            total = keep['count'] + drop['count']
+            self.centroids[a] = (self.centroids[a] * keep['count'] + self.centroids[b] * drop['count']) / total
+            keep['count'] = total
+            keep['first_seen'] = min(keep['first_seen'], drop['first_seen'])
+            keep['last_seen'] = max(keep['last_seen'], drop['last_seen'])
+            keep['crops'] = sorted(keep['crops'] + drop['crops'], key=lambda crop: crop['saved'])[-self.max_crops:]
+
+            self.remove_row(b)
+            self.aliases[drop_id] = keep_id
+            for old, new in self.aliases.items():
+                if new == drop_id:
+                    self.aliases[old] = keep_id
+            self.trim_aliases()
+            self.dirty = True
+            return True
+
+    def maintain(self, force=False):
+        """Merge + save if maintain_interval has passed (or force)"""
+        if not force and time.monotonic() - self.last_maintained < self.maintain_interval:
+            return
+        self.last_maintained = time.monotonic()
+        merged = self.merge()
+        if merged:
+            log.info("🧩 Merged %d outsider clusters (%d remain)", merged, len(self.ids),
+                     extra={'event': 'clusters_merged', 'merged': merged, 'clusters': len(self.ids)})
+        if self.dirty and self.path:
+            self.save()
+
+    def run(self):
+        while not self.stop_event.wait(self.maintain_interval):
+            try:
+                self.maintain(force=True)
+            except Exception as e:
+                log.error("Error maintaining outsider clusters: %s", e, extra={'event': 'clusters_error'})
+
+    def start(self):
+        """Merge and save on a daemon thread every maintain_interval seconds; returns self"""
+        self.thread = threading.Thread(target=self.run, name='outsider-clusters', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the maintenance thread and save a final merged index"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.maintain(force=True)
+
+    def info(self, cluster_id):
+        with self.lock:
+            info = self.clusters.get(self.resolve(cluster_id))
+            return dict(info) if info is not None else None
+
+    def summary(self):
+        """One entry per known outsider, most recently seen first"""
+        with self.lock:
+            cards = [
+                {'cluster': cluster_id, 'count': info['count'], 'last_seen': info['last_seen'],
+                 'crop': info['crops'][-1]['path'] if info['crops'] else None}
+                for cluster_id, info in self.clusters.items()
+            ]
+        return sorted(cards, key=lambda card: card['last_seen'], reverse=True)
@@ -0,0 +1,323 @@
+"""
+Incremental index of saved crops for the dashboard
+
+A background thread follows each shard's manifest.jsonl from a byte
+cursor, so a scan reads only the lines appended since the last one
+instead of stat-ing every crop ever saved. Only the cursors are
+persisted; on restart the index is rebuilt from the manifests up to
+them, and scanning picks up where the last run stopped.
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from datetime import datetime
+
+from storage import IMAGE_EXTENSIONS, MANIFEST, list_shards
+from diagnostics import get_logger
+
+log = get_logger('crop_index')
+
+CATEGORIES = ('college_non_mess', 'outsiders')
+OPEN_SHARDS = 2     # only the newest shards of a category can still grow
+
+
+def entry_time(entry, shard_key):
+    """Unix time a crop was saved (manifest 'time', then 'saved', then its shard hour)"""
+    if entry.get('time'):
+        return float(entry['time'])
+    for value, pattern in ((entry.get('saved'), None), (shard_key, '%Y-%m-%d/%H')):
+        try:
+            parsed = datetime.fromisoformat(value) if pattern is None else datetime.strptime(value, pattern)
+            return parsed.timestamp()
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+
+class CropIndex:
+    """
+    Sorted in-memory list of crops per category, updated incrementally
+
+    Items are (time, path relative to root, metadata) in ascending order.
+    Shards removed by the retention janitor are dropped from the index.
+    Single crops moved away (e.g. by reidentify.py) are dropped when
+    their tombstone is read: the newest shards are followed every scan,
+    the rest every sweep_interval seconds. A page still skips crops it
+    finds missing in between. Crops saved before sharding (flat files in
+    the category folder) are rescanned only when the folder changes.
+    Listeners are called after each scan with the crops it added, and
+    wait_for_crops() lets live views block until new crops arrive.
+    """
+
+    def __init__(self, root, categories=CATEGORIES, state_path=None, interval=2.0, save_interval=30.0,
+                 max_recent=1000, sweep_interval=60.0):
+        self.root = root
+        self.categories = categories
+        self.state_path = state_path
+        self.interval = interval
+        self.save_interval = save_interval
+        self.sweep_interval = sweep_interval
+
+        self.lock = threading.Lock()
+        self.items = {category: [] for category in categories}
+        self.cursors = {category: {} for category in categories}   # shard 'YYYY-MM-DD/HH' -> manifest offset
+        self.legacy_mtime = {category: None for category in categories}
+        self.dirty = False
+        self.last_saved = time.monotonic()
+        self.last_sweep = None      # the first scan reads every known shard
+        self.added = []             # crops added during the current scan
+        self.listeners = []
+        self.changed = threading.Condition()
+        self.sequence = 0           # crops announced so far
+        self.epoch = f"{time.time_ns():x}"   # tells this run's sequence numbers from a previous run's
+        self.recent = deque(maxlen=max_recent)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    def load(self):
+        """Rebuild the index from the manifests up to the saved cursors (crops are not announced)"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable crop index %s: %s", self.state_path, e,
+                        extra={'event': 'crop_index_error', 'path': self.state_path})
+            return
+        for category in self.categories:
+            saved = state.get('categories', {}).get(category)
+            if not saved:
+                continue
+            for shard, offset in saved['cursors'].items():
+                entries, read_to = self.read_new_lines(category, shard, 0, end=offset)
+                with self.lock:
+                    self.apply(category, shard, entries)
+                self.cursors[category][shard] = read_to
+        self.added = []
+
+    def save(self):
+        """Write the cursors atomically (temp file + rename)"""
+        with self.lock:
+            state = {'categories': {
+                category: {'cursors': dict(self.cursors[category])}
+                for category in self.categories
+            }}
+            self.dirty = False
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+        self.last_saved = time.monotonic()
+
+    def add_listener(self, callback):
+        """callback(crops) after every scan that added crops (oldest first, with 'category')"""
+        self.listeners.append(callback)
+
+    def add(self, category, item):
+        self.added.append(dict(item[2], path=item[1], time=item[0], category=category))
+        items = self.items[category]
+        if not items or item[:2] > items[-1][:2]:
+            items.append(item)      # the usual case: crops arrive in time order
+        else:
+            bisect.insort(items, item, key=lambda i: i[:2])
+
+    def read_new_lines(self, category, shard_key, offset, end=None):
+        """Entries appended to a shard manifest since offset (up to end); returns (entries, new offset)"""
+        path = os.path.join(self.root, category, shard_key, MANIFEST)
+        try:
+            if os.path.getsize(path) <= offset:
+                return [], offset
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read() if end is None else f.read(max(0, end - offset))
+        except OSError:
+            return [], offset
+
+        # Leave a partially written last line for the next scan
+        complete = data[:data.rfind(b'\n') + 1]
+        entries = []
+        for line in complete.splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries, offset + len(complete)
+
+    def scan_legacy(self, category, category_dir):
+        """Flat pre-sharding crops, rescanned only when the folder's mtime changes"""
+        mtime = os.stat(category_dir).st_mtime
+        if mtime == self.legacy_mtime[category]:
+            return 0
+        found = {}
+        with os.scandir(category_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    found[f"{category}/{entry.name}"] = entry.stat().st_mtime
+
+        with self.lock:
+            items = self.items[category]
+            kept = [item for item in items if '/' in item[1][len(category) + 1:] or item[1] in found]
+            known = {item[1] for item in kept}
+            self.items[category] = kept
+            added = 0
+            for path, saved in found.items():
+                if path not in known:
+                    self.add(category, (saved, path, {}))
+                    added += 1
+            self.legacy_mtime[category] = mtime
+            self.dirty = True
+        return added
+
+    def remove(self, category, path):
+        """Drop a crop named by a manifest tombstone"""
+        items = self.items[category]
+        for i in range(len(items) - 1, -1, -1):
+            if items[i][1] == path:
+                del items[i]
+                return
+
+    def apply(self, category, shard, entries):
+        """Add (or, for tombstones, remove) a shard's manifest entries; call with the lock held"""
+        added = 0
+        for entry in entries:
+            if 'file' not in entry:
+                continue
+            if entry.get('removed'):
+                self.remove(category, f"{category}/{shard}/{entry['file']}")
+                self.dirty = True
+                continue
+            meta = {key: entry[key] for key in ('bytes', 'camera', 'cluster', 'roll_no') if entry.get(key)}
+            self.add(category, (entry_time(entry, shard), f"{category}/{shard}/{entry['file']}", meta))
+            added += 1
+        return added
+
+    def scan_category(self, category, sweep=False):
+        category_dir = os.path.join(self.root, category)
+        if not os.path.isdir(category_dir):
+            return 0
+        shards = [f"{date}/{hour}" for date, hour in list_shards(category_dir)]
+        present = set(shards)
+        cursors = self.cursors[category]
+
+        added = self.scan_legacy(category, category_dir)
+
+        # Whole shards deleted by the janitor
+        removed = [shard for shard in cursors if shard not in present]
+        if removed:
+            prefixes = tuple(f"{category}/{shard}/" for shard in removed)
+            with self.lock:
+                self.items[category] = [item for item in self.items[category] if not item[1].startswith(prefixes)]
+                for shard in removed:
+                    del cursors[shard]
+                self.dirty = True
+
+        # New shards from the start, plus the newest known shards (all of them on a sweep)
+        known = [shard for shard in shards if shard in cursors]
+        for shard in [s for s in shards if s not in cursors] + (known if sweep else known[-OPEN_SHARDS:]):
+            entries, offset = self.read_new_lines(category, shard, cursors.get(shard, 0))
+            with self.lock:
+                added += self.apply(category, shard, entries)
+                if offset != cursors.get(shard):
+                    cursors[shard] = offset
+                    self.dirty = True
+        return added
+
+    def scan(self):
+        """One incremental pass over all categories; returns crops added"""
+        sweep = self.last_sweep is None or time.monotonic() - self.last_sweep >= self.sweep_interval
+        if sweep:
+            self.last_sweep = time.monotonic()
+        added = sum(self.scan_category(category, sweep) for category in self.categories)
+        with self.lock:
+            crops, self.added = self.added, []
+        if crops:
+            crops.sort(key=lambda crop: crop['time'])
+            with self.changed:
+                for crop in crops:
+                    self.sequence += 1
+                    crop['seq'] = self.sequence
+                    self.recent.append(crop)
+                self.changed.notify_all()
+            for callback in self.listeners:
+                try:
+                    callback(crops)
+                except Exception as e:
+                    log.error("Error in crop index listener: %s", e, extra={'event': 'crop_index_error'})
+        if self.state_path and self.dirty and time.monotonic() - self.last_saved >= self.save_interval:
+            self.save()
+        return added
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                log.error("Error indexing crops: %s", e, extra={'event': 'crop_index_error'})
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        """Scan once, then keep scanning on a daemon thread; returns self"""
+        self.scan()
+        self.thread = threading.Thread(target=self.run, name='crop-index', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.state_path and self.dirty:
+            self.save()
+
+    def wait_for_crops(self, after, timeout=15.0):
+        """
+        Crops announced after sequence number after, waiting up to timeout
+        for the next scan that adds some; returns (crops, latest sequence)
+        """
+        with self.changed:
+            if self.sequence <= after:
+                self.changed.wait(timeout)
+            return [crop for crop in self.recent if crop['seq'] > after], self.sequence
+
+    def page(self, category, limit=28, before=None, since=None):
+        """
+        Crops of a category, newest first ([{'path', 'time', ...metadata}])
+
+        before is a (time, path) cursor: only crops older than it are
+        returned. since is a unix time lower bound. Returns (crops, cursor
+        for the next page or None when there is no more).
+        """
+        results = []
+        with self.lock:
+            items = self.items[category]
+            i = len(items) if before is None else bisect.bisect_left(items, tuple(before), key=lambda i: i[:2])
+            i -= 1
+            while i >= 0 and len(results) < limit:
+                saved, path, meta = items[i]
+                if since is not None and saved < since:
+                    break
+                if os.path.exists(os.path.join(self.root, path)):
+                    results.append(dict(meta, path=path, time=saved))
+                else:
+                    del items[i]    # moved or deleted since it was indexed
+                    self.dirty = True
+                i -= 1
+            more = i >= 0 and (since is None or items[i][0] >= since)
+        cursor = (results[-1]['time'], results[-1]['path']) if results and more else None
+        return results, cursor
+
+    def latest(self, category, limit=28):
+        """Newest crops of a category, newest first"""
+        return self.page(category, limit)[0]
+
+    def count(self, category):
+        with self.lock:
+            return len(self.items[category])
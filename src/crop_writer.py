@@ -0,0 +1,142 @@
+"""Background writer for saved face crops"""
+import os
+import time
+import threading
+from collections import deque
+import cv2
+
+from diagnostics import get_logger
+
+log = get_logger('crop_writer')
+
+# Encoder parameters per output format
+ENCODE_PARAMS = {
+    'jpg': lambda quality: [cv2.IMWRITE_JPEG_QUALITY, quality],
+    'webp': lambda quality: [cv2.IMWRITE_WEBP_QUALITY, quality],
+    'png': lambda quality: [cv2.IMWRITE_PNG_COMPRESSION, 3],
+}
+
+
+class CropWriter:
+    """
+    Encodes and writes crops on a background thread
+
+    submit() only copies the crop into a bounded queue, so the frame loop
+    never waits on encoding or disk I/O. When the queue is full the oldest
+    pending crop is dropped (the newest sighting is the more useful one).
+    Counters (queue depth, drops, write latency) are available via stats().
+    """
+
+    def __init__(self, image_format='jpg', quality=90, max_queue=64):
+        if image_format not in ENCODE_PARAMS:
+            raise ValueError(f"Unsupported crop format '{image_format}'. Choose from: {', '.join(ENCODE_PARAMS)}")
+        self.image_format = image_format
+        self.extension = '.' + image_format
+        self.params = ENCODE_PARAMS[image_format](quality)
+        self.max_queue = max_queue
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = None
+
+        # Counters
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.bytes_written = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='crop-writer', daemon=True)
+            self.thread.start()
+        return self
+
+    def submit(self, path_base, image, on_written=None):
+        """
+        Queue image for writing to path_base + extension; returns the final path
+
+        on_written(path, size) is called from the writer thread once the
+        file is on disk; an error it raises is logged and counted as a
+        failure, and the writer carries on.
+        """
+        path = path_base + self.extension
+        item = (path, image.copy(), time.monotonic(), on_written)
+
+        with self.condition:
+            if len(self.queue) >= self.max_queue:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(item)
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify()
+
+        if self.thread is None:
+            self.start()
+        return path
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.stopped:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                path, image, queued_at, on_written = self.queue.popleft()
+
+            self.write(path, image, queued_at, on_written)
+
+    def write(self, path, image, queued_at, on_written):
+        try:
+            ok, encoded = cv2.imencode(self.extension, image, self.params)
+            if not ok:
+                raise ValueError(f"could not encode {path}")
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(encoded.tobytes())
+        except Exception as e:
+            self.failed += 1
+            log.error("Error writing crop %s: %s", path, e, extra={'event': 'crop_error', 'path': path})
+            return
+
+        latency = time.monotonic() - queued_at
+        self.written += 1
+        self.bytes_written += encoded.size
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if on_written is not None:
+            try:
+                on_written(path, encoded.size)
+            except Exception as e:
+                self.failed += 1
+                log.error("Error recording crop %s: %s", path, e, extra={'event': 'crop_record_error', 'path': path})
+
+    def stats(self):
+        with self.condition:
+            depth = len(self.queue)
+        return {
+            'queue_depth': depth,
+            'max_queue_depth': self.max_depth,
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'bytes_written': self.bytes_written,
+            'avg_write_latency_ms': 1000 * self.total_latency / self.written if self.written else 0.0,
+            'max_write_latency_ms': 1000 * self.max_latency,
+        }
+
+    def stop(self, timeout=10.0):
+        """Flush pending crops and stop the thread"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
@@ -0,0 +1,86 @@
+"""Identity-aware deduplication of saved face crops"""
+import time
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+
+
+class SaveDeduplicator:
+    """
+    Decides whether a sighting is worth saving
+
+    College students are keyed on roll_no. Outsiders have no identity, so
+    a new sighting is matched against the encodings of recently saved
+    outsiders (Euclidean distance, same metric as face_recognition).
+    Either way, a person is saved at most once per cooldown seconds.
+
+    Memory is bounded: entries older than the cooldown are evicted, and
+    at most max_entries identities / outsider encodings are remembered.
+    Thread-safe, so cameras can share one instance.
+    """
+
+    def __init__(self, cooldown=300.0, outsider_tolerance=0.5, max_entries=512):
+        self.cooldown = cooldown
+        self.outsider_tolerance = outsider_tolerance
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self.students = OrderedDict()   # roll_no -> last saved (oldest first)
+        self.outsiders = deque()        # (last saved, encoding), oldest first
+
+        # Counters
+        self.saved = 0
+        self.suppressed = 0
+
+    def evict(self, now):
+        while self.students:
+            saved_at = next(iter(self.students.values()))
+            if now - saved_at < self.cooldown and len(self.students) <= self.max_entries:
+                break
+            self.students.popitem(last=False)
+
+        while self.outsiders and (now - self.outsiders[0][0] >= self.cooldown
+                                  or len(self.outsiders) > self.max_entries):
+            self.outsiders.popleft()
+
+    def match_outsider(self, encoding):
+        """Index of the closest remembered outsider within tolerance, or None"""
+        if not self.outsiders:
+            return None
+        known = np.array([known_encoding for _, known_encoding in self.outsiders])
+        distances = np.linalg.norm(known - encoding, axis=1)
+        best = int(np.argmin(distances))
+        return best if distances[best] <= self.outsider_tolerance else None
+
+    def should_save(self, roll_no=None, encoding=None, now=None):
+        """True (and remembered) if this person hasn't been saved within the cooldown"""
+        now = time.monotonic() if now is None else now
+
+        with self.lock:
+            self.evict(now)
+
+            if roll_no is not None:
+                if roll_no in self.students:
+                    self.suppressed += 1
+                    return False
+                self.students[roll_no] = now
+            elif encoding is not None:
+                encoding = np.asarray(encoding, dtype=np.float64)
+                if self.match_outsider(encoding) is not None:
+                    self.suppressed += 1
+                    return False
+                self.outsiders.append((now, encoding))
+            # Nothing to identify the face by: always save
+
+            self.evict(now)
+            self.saved += 1
+            return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                'saved': self.saved,
+                'suppressed': self.suppressed,
+                'remembered_students': len(self.students),
+                'remembered_outsiders': len(self.outsiders),
+            }
@@ -0,0 +1,154 @@
+"""
+Structured, non-blocking logging for the recognizer
+
+Components log through get_logger(); nothing is written on the calling
+thread. LogPipeline puts records on a bounded queue and a listener thread
+writes them to the console (plain text) and to a JSON-lines file. Each
+event key is rate limited, so a detection error repeated every frame
+becomes a few lines plus a 'suppressed' count rather than a flood.
+
+    log.info("📸 Saved face: %s", path, extra={'event': 'face_saved', 'camera': 'cam0'})
+
+Keys passed in extra become fields of the JSON record.
+"""
+import os
+import sys
+import json
+import queue
+import logging
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+ROOT_LOGGER = 'messvision'
+
+# LogRecord attributes that are not user-supplied extras
+RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def get_logger(name):
+    """Logger for a component (e.g. 'recognizer', 'clips')"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, event, message + extras"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    At most burst records per event key every interval seconds
+
+    The key is the record's 'event' extra (or its logger + message
+    template). The first record let through after a suppressed stretch
+    carries suppressed=<count>.
+    """
+
+    def __init__(self, interval=10.0, burst=10):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.windows = {}       # key -> [window start, records passed, records suppressed]
+        self.suppressed = 0
+
+    def filter(self, record):
+        key = getattr(record, 'event', None) or (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                skipped = window[2] if window is not None else 0
+                self.windows[key] = [now, 1, 0]
+                if skipped:
+                    record.suppressed = skipped
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Routes the messvision loggers through a queue to a listener thread
+
+    Console output keeps the plain messages (or JSON with json_console);
+    json_path gets every record as a JSON line, rotated at max_file_bytes.
+    """
+
+    def __init__(self, level='INFO', json_path='data/logs/recognizer.jsonl', console=True, json_console=False,
+                 stream=None, max_queue=10000, rate_interval=10.0, rate_burst=10,
+                 max_file_bytes=10 * 1024 * 1024, backups=5):
+        handlers = []
+        if console:
+            console_handler = logging.StreamHandler(stream or sys.stdout)
+            console_handler.setFormatter(JsonFormatter() if json_console else logging.Formatter('%(message)s'))
+            handlers.append(console_handler)
+        if json_path:
+            directory = os.path.dirname(json_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_handler = RotatingFileHandler(json_path, maxBytes=max_file_bytes, backupCount=backups,
+                                               encoding='utf-8')
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        self.rate_limit = RateLimitFilter(rate_interval, rate_burst)
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=max_queue))
+        self.handler.addFilter(self.rate_limit)
+
+        self.logger = logging.getLogger(ROOT_LOGGER)
+        self.logger.setLevel(level)
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+
+        self.listener = QueueListener(self.handler.queue, *handlers)
+        self.listener.start()
+
+    def stats(self):
+        return {
+            'pending': self.handler.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'suppressed': self.rate_limit.suppressed,
+        }
+
+    def stop(self):
+        """Write queued records and detach from the loggers"""
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
@@ -5,9 +5,14 @@ import cv2
 import face_recognition
 import pickle
 import os
+from capture import LowLatencyCapture
+from profiles import get_profile, locate_faces, encode_faces
+from diagnostics import LogPipeline, get_logger
+
+log = get_logger('enroll')
 
 class EnrollmentGUI:
-    def __init__(self):
+    def __init__(self, profile='enroll'):
         self.window = tk.Tk()
         self.window.title("Mess Student Enrollment System")
         self.window.geometry("1000x750")
@@ -23,6 +28,9 @@ class EnrollmentGUI:
         self.college_db = 'college_students.pkl'
         self.mess_db = 'mess_students.pkl'
         
+        # Heavy jittering is fine here - one photo per student
+        self.profile = get_profile(profile)
+        
         # Create UI
         self.create_ui()
         
@@ -218,7 +226,7 @@ class EnrollmentGUI:
             self.stop_camera()
     
     def start_camera(self):
-        self.cap = cv2.VideoCapture(0)
+        self.cap = LowLatencyCapture(0)
         if self.cap.isOpened():
             self.camera_active = True
             self.camera_btn.config(text="⏹ Stop Camera", bg='#e74c3c')
@@ -226,6 +234,7 @@ class EnrollmentGUI:
             self.update_camera()
             self.status_label.config(text="Camera active - Click 'Take Photo' when ready", fg='#3498db')
         else:
+            log.error("Cannot access webcam", extra={'event': 'camera_error'})
             messagebox.showerror("Error", "Cannot access webcam!")
     
     def stop_camera(self):
@@ -279,8 +288,9 @@ class EnrollmentGUI:
             self.canvas.create_image(200, 150, image=photo)
             self.canvas.photo = photo
             
+            # The status line confirms the capture; no dialog to dismiss before typing
             self.status_label.config(text="✓ Photo captured! Fill details and enroll", fg='#27ae60')
-            messagebox.showinfo("Success", "Photo captured successfully!")
+            log.info("✓ Photo captured", extra={'event': 'photo_captured'})
     
     def upload_image(self):
         file_path = filedialog.askopenfilename(
@@ -326,13 +336,16 @@ class EnrollmentGUI:
             self.window.update()
             
             image = face_recognition.load_image_file(self.selected_image_path)
-            face_encodings = face_recognition.face_encodings(image)
+            face_locations = locate_faces(image, self.profile)
+            face_encodings = encode_faces(image, face_locations, self.profile)
             
             if len(face_encodings) == 0:
                 messagebox.showerror("Error", "No face detected! Try again.")
                 return
             
             if len(face_encodings) > 1:
+                log.warning("Multiple faces in %s, using first", self.selected_image_path,
+                            extra={'event': 'multiple_faces', 'faces': len(face_encodings)})
                 messagebox.showwarning("Warning", "Multiple faces detected. Using first.")
             
             # Load databases
@@ -388,6 +401,8 @@ class EnrollmentGUI:
             
             # Success
             mess_status = "MESS" if is_mess else "COLLEGE ONLY"
+            log.info("✓ Enrolled: %s (%s) - %s [%s]", name, roll_no, department, mess_status,
+                     extra={'event': 'student_enrolled', 'roll_no': roll_no, 'mess': is_mess})
             messagebox.showinfo(
                 "Success", 
                 f"✓ {name} enrolled!\n\nRoll: {roll_no}\nStatus: {mess_status}\n\nTotal: {len(college_students)} students"
@@ -398,6 +413,7 @@ class EnrollmentGUI:
             self.status_label.config(text=f"✓ {name} enrolled! Ready for next.", fg='#27ae60')
             
         except Exception as e:
+            log.exception("Enrollment failed for %s", roll_no, extra={'event': 'enroll_error', 'roll_no': roll_no})
             messagebox.showerror("Error", f"Failed:\n{str(e)}")
             self.status_label.config(text="Enrollment failed", fg='#e74c3c')
     
@@ -488,6 +504,7 @@ class EnrollmentGUI:
                 if os.path.exists(photo_path):
                     os.remove(photo_path)
                 
+                log.info("Deleted student %s", roll_no, extra={'event': 'student_deleted', 'roll_no': roll_no})
                 messagebox.showinfo("Success", f"Student {roll_no} deleted!")
                 view_window.destroy()
                 self.view_students()  # Refresh
@@ -528,6 +545,7 @@ class EnrollmentGUI:
                     for file in os.listdir('data/enrollment_photos'):
                         os.remove(os.path.join('data/enrollment_photos', file))
                 
+                log.warning("All enrollment data cleared", extra={'event': 'data_cleared'})
                 messagebox.showinfo("Success", "All data cleared!")
                 self.status_label.config(text="All data cleared. Ready to start fresh.", fg='#e74c3c')
     
@@ -585,5 +603,9 @@ class EnrollmentGUI:
         self.window.destroy()
 
 if __name__ == "__main__":
-    app = EnrollmentGUI()
-    app.run()
+    logs = LogPipeline(json_path='data/logs/enroll.jsonl')
+    try:
+        app = EnrollmentGUI()
+        app.run()
+    finally:
+        logs.stop()
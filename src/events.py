@@ -0,0 +1,200 @@
+"""Entry-event log: every recognition decision, batched into SQLite"""
+import os
+import time
+import queue
+import sqlite3
+import pathlib
+import threading
+
+from diagnostics import get_logger
+
+log = get_logger('events')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    camera TEXT,
+    roll_no TEXT,
+    category TEXT NOT NULL,
+    name TEXT,
+    distance REAL,
+    box_left INTEGER,
+    box_top INTEGER,
+    box_right INTEGER,
+    box_bottom INTEGER,
+    cluster TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_roll_no_time ON events (roll_no, time);
+CREATE INDEX IF NOT EXISTS idx_events_category_time ON events (category, time);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (time, id);
+"""
+
+COLUMNS = ('time', 'camera', 'roll_no', 'category', 'name', 'distance',
+           'box_left', 'box_top', 'box_right', 'box_bottom', 'cluster')
+
+INSERT = f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def connect(path):
+    """SQLite connection in WAL mode with the events schema"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def connect_readonly(path):
+    """
+    Read-only connection for reports and exports
+
+    Never creates the file, changes the journal mode or runs the schema;
+    a missing database raises sqlite3.OperationalError.
+    """
+    uri = pathlib.Path(os.path.abspath(path)).as_uri() + '?mode=ro'
+    return sqlite3.connect(uri, uri=True)
+
+
+def missing_table(error):
+    """True for the error raised when the writer hasn't created a table yet"""
+    return 'no such table' in str(error)
+
+
+def select_events(since=None, until=None, category=None, roll_no=None):
+    """SQL and parameters for the events matching the filters, oldest first"""
+    clauses, params = [], []
+    if category is not None:
+        clauses.append("category = ?")
+        params.append(category)
+    if roll_no is not None:
+        clauses.append("roll_no = ?")
+        params.append(roll_no)
+    if since is not None:
+        clauses.append("time >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("time < ?")
+        params.append(until)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT id, {', '.join(COLUMNS)} FROM events{where} ORDER BY time, id", params
+
+
+def iter_events(path, since=None, until=None, category=None, roll_no=None, batch_size=1000):
+    """
+    Yield events (dicts, oldest first) from the log in batches
+
+    Readers don't block the writer (WAL); filters use the indexes.
+    """
+    sql, params = select_events(since, until, category, roll_no)
+    connection = connect_readonly(path)
+    try:
+        try:
+            cursor = connection.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if missing_table(e):
+                return
+            raise
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(('id',) + COLUMNS, row))
+    finally:
+        connection.close()
+
+
+class EventLog:
+    """
+    Background writer for entry events
+
+    log() only puts a tuple on a bounded queue, so the frame loop pays
+    microseconds per face. A writer thread drains the queue and commits
+    up to batch_size events per transaction, at most flush_interval
+    seconds after the first of them was logged. If the queue fills up, new events are
+    dropped and counted rather than blocking recognition.
+    """
+
+    def __init__(self, path='data/events.db', batch_size=500, flush_interval=1.0, max_queue=20000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stopped = threading.Event()
+
+        # Counters
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_batch_ms = 0.0
+
+        self.thread = threading.Thread(target=self.run, name='event-log', daemon=True)
+        self.thread.start()
+
+    def log(self, camera, category, roll_no=None, name=None, distance=None, box=None, cluster=None, timestamp=None):
+        """Record one recognition decision (non-blocking)"""
+        left, top, right, bottom = box if box is not None else (None, None, None, None)
+        event = (timestamp or time.time(), camera, roll_no, category, name, distance,
+                 left, top, right, bottom, cluster)
+        try:
+            self.queue.put_nowait(event)
+            self.logged += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        connection = connect(self.path)
+        try:
+            while not (self.stopped.is_set() and self.queue.empty()):
+                try:
+                    batch = [self.queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                # Collect for up to flush_interval so quiet periods still commit in batches
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining <= 0 or self.stopped.is_set():
+                            batch.append(self.queue.get_nowait())
+                        else:
+                            batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                self.write(connection, batch)
+        finally:
+            connection.close()
+
+    def write(self, connection, batch):
+        started = time.perf_counter()
+        try:
+            with connection:
+                connection.executemany(INSERT, batch)
+        except sqlite3.Error as e:
+            log.error("Error writing %d events: %s", len(batch), e, extra={'event': 'event_log_error'})
+            return
+        self.written += len(batch)
+        self.batches += 1
+        self.max_batch_ms = max(self.max_batch_ms, (time.perf_counter() - started) * 1000)
+
+    def stats(self):
+        return {
+            'logged': self.logged,
+            'written': self.written,
+            'dropped': self.dropped,
+            'pending': self.queue.qsize(),
+            'batches': self.batches,
+            'avg_batch_size': self.written / self.batches if self.batches else 0.0,
+            'max_batch_ms': self.max_batch_ms,
+        }
+
+    def stop(self, timeout=10.0):
+        """Write everything queued and close the database"""
+        self.stopped.set()
+        self.thread.join(timeout)
@@ -0,0 +1,145 @@
+"""
+Streaming CSV / NDJSON exports of entry events and saved-crop metadata
+
+Rows are read in batches (events) or one hourly shard manifest at a time
+(crops) and written out in chunks, so a multi-million-row month needs no more memory
+than a day. The dashboard streams the same generators over HTTP.
+
+Usage: python src/export.py events --from 2025-03-01 --to 2025-03-31 -o march.csv
+       python src/export.py crops --from 2025-03-01 --format ndjson
+"""
+import io
+import os
+import sys
+import csv
+import json
+import argparse
+from datetime import date, datetime, timedelta
+
+from events import COLUMNS, iter_events
+from storage import list_shards, read_manifest
+
+FORMATS = ('csv', 'ndjson')
+EVENT_FIELDS = ('id', 'time', 'datetime') + COLUMNS[1:]
+CROP_FIELDS = ('category', 'path', 'time', 'datetime', 'bytes', 'camera', 'cluster', 'roll_no',
+               'box_left', 'box_top', 'box_right', 'box_bottom')
+CROP_CATEGORIES = ('outsiders', 'college_non_mess', 'reidentified')
+CHUNK_ROWS = 1000   # rows per written chunk
+
+
+def day_bounds(date_from, date_to=None):
+    """'YYYY-MM-DD' range (inclusive) -> (since, until) unix times"""
+    start = date.fromisoformat(date_from)
+    end = date.fromisoformat(date_to or date_from)
+    since = datetime.combine(start, datetime.min.time()).timestamp()
+    until = datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp()
+    return since, until
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def export_events(events_db, date_from, date_to=None, category=None, roll_no=None, batch_size=5000):
+    """Events of a date range, oldest first, read from SQLite batch_size rows at a time"""
+    since, until = day_bounds(date_from, date_to)
+    for event in iter_events(events_db, since=since, until=until, category=category,
+                             roll_no=roll_no, batch_size=batch_size):
+        event['datetime'] = iso(event['time'])
+        yield event
+
+
+def export_crops(root, date_from, date_to=None, categories=CROP_CATEGORIES):
+    """Manifest entries of the shards in a date range, read one shard at a time (moved crops left out)"""
+    date_to = date_to or date_from
+    for category in categories:
+        category_dir = os.path.join(root, category)
+        for day, hour in list_shards(category_dir):
+            if not date_from <= day <= date_to:
+                continue
+            for entry in read_manifest(os.path.join(category_dir, day, hour)):
+                box = entry.get('box') or (None, None, None, None)
+                yield {
+                    'category': category,
+                    'path': f"{category}/{day}/{hour}/{entry['file']}",
+                    'time': entry.get('time'),
+                    'datetime': iso(entry['time']) if entry.get('time') else entry.get('saved'),
+                    'bytes': entry.get('bytes'),
+                    'camera': entry.get('camera'),
+                    'cluster': entry.get('cluster'),
+                    'roll_no': entry.get('roll_no'),
+                    'box_left': box[0],
+                    'box_top': box[1],
+                    'box_right': box[2],
+                    'box_bottom': box[3],
+                }
+
+
+def stream_rows(rows, fields, fmt='csv', chunk_rows=CHUNK_ROWS):
+    """Encode rows as CSV (with header) or NDJSON, yielding text chunks of chunk_rows rows"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore', lineterminator='\n')
+    if fmt == 'csv':
+        writer.writeheader()
+
+    count = 0
+    for row in rows:
+        if fmt == 'csv':
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps({field: row.get(field) for field in fields}) + '\n')
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export entry events or saved-crop metadata for a date range")
+    parser.add_argument('kind', choices=['events', 'crops'])
+    parser.add_argument('--from', dest='date_from', required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', default=None, help="Last day, inclusive (default: --from)")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--category', default=None,
+                        help="Events: mess/college/outsider/...; crops: outsiders/college_non_mess/reidentified")
+    parser.add_argument('--roll-no', default=None, help="Events of one student")
+    parser.add_argument('--events-db', default='data/events.db')
+    parser.add_argument('--root', default='data/detected_faces')
+    parser.add_argument('-o', '--output', default='-', help="Output file ('-' for stdout)")
+    args = parser.parse_args()
+
+    if args.kind == 'events':
+        if not os.path.exists(args.events_db):
+            print(f"ERROR: Event log not found: {args.events_db}", file=sys.stderr)
+            sys.exit(1)
+        rows = export_events(args.events_db, args.date_from, args.date_to, args.category, args.roll_no)
+        fields = EVENT_FIELDS
+    else:
+        categories = (args.category,) if args.category else CROP_CATEGORIES
+        rows = export_crops(args.root, args.date_from, args.date_to, categories)
+        fields = CROP_FIELDS
+
+    exported = [0]
+
+    def counted(rows):
+        for row in rows:
+            exported[0] += 1
+            yield row
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        for chunk in stream_rows(counted(rows), fields, args.format):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"✓ Exported {exported[0]} {args.kind}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
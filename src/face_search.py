@@ -0,0 +1,204 @@
+"""
+Reverse face search over saved crops
+
+Every crop saved by appextended.py has its face encoding in the shard's
+embeddings.f32 sidecar, so finding "all crops of this face" is a
+vectorized distance check over in-memory matrices instead of
+re-running face detection on thousands of images.
+
+Usage: python src/face_search.py query.jpg [--tolerance 0.5] [--limit 50]
+"""
+import os
+import sys
+import argparse
+import threading
+import cv2
+import numpy as np
+
+from storage import EMBEDDINGS, ENCODING_SIZE, MANIFEST, list_shards, read_embeddings
+
+CATEGORIES = ('outsiders', 'college_non_mess', 'reidentified')
+
+
+def encode_image(image, profile_name='balanced'):
+    """Encoding of the largest face in a BGR image (None if no face)"""
+    from profiles import get_profile, locate_faces, encode_faces
+
+    profile = get_profile(profile_name)
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    locations = locate_faces(rgb, profile)
+    if not locations:
+        return None
+    largest = max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    found = encode_faces(rgb, [largest], profile)
+    return np.asarray(found[0], dtype=np.float32) if found else None
+
+
+class FaceIndex:
+    """
+    In-memory index of the sidecar encodings under root
+
+    refresh() only reads shards whose embeddings.f32 or manifest grew
+    since the last call. Crops appended to a shard are appended to the
+    index (an amortised, doubling matrix), so a refresh costs the new
+    crops rather than everything indexed; the index is only rebuilt when
+    a shard loses crops (a tombstone for a moved crop, or a shard
+    deleted by the retention janitor). It is safe to call from several
+    threads: refreshes are serialised, and searches use a read-only
+    (paths, entries, matrix, rows by path) snapshot that later appends
+    never change.
+    """
+
+    def __init__(self, root='data/detected_faces', categories=CATEGORIES):
+        self.root = root
+        self.categories = categories
+        self.shards = {}     # shard dir -> ((sidecar size, manifest size), entries, matrix)
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.paths = []
+        self.entries = []
+        self.rows = {}       # normpath -> row, for encoding_for
+        self.buffer = np.empty((0, ENCODING_SIZE), np.float32)
+        self.count = 0
+        self.publish()
+
+    def publish(self):
+        matrix = self.buffer[:self.count]
+        matrix.setflags(write=False)
+        self.snapshot = (self.paths, self.entries, matrix, self.rows)
+
+    def refresh(self):
+        """Load new or grown shards; returns the number of indexed crops"""
+        with self.lock:
+            return self.reload()
+
+    def reload(self):
+        rebuild = False
+        grown = []      # (shard dir, new entries, shard matrix)
+        seen = set()
+        for category in self.categories:
+            category_dir = os.path.join(self.root, category)
+            for date, hour in list_shards(category_dir):
+                shard_dir = os.path.join(category_dir, date, hour)
+                sidecar = os.path.join(shard_dir, EMBEDDINGS)
+                if not os.path.exists(sidecar):
+                    continue
+                seen.add(shard_dir)
+                manifest = os.path.join(shard_dir, MANIFEST)
+                size = (os.path.getsize(sidecar), os.path.getsize(manifest) if os.path.exists(manifest) else 0)
+                cached = self.shards.get(shard_dir)
+                if cached is not None and cached[0] == size:
+                    continue
+                entries, matrix = read_embeddings(shard_dir)
+                for entry in entries:
+                    entry['category'] = category
+                old = cached[1] if cached is not None else []
+                if [e['file'] for e in entries[:len(old)]] == [e['file'] for e in old]:
+                    grown.append((shard_dir, entries[len(old):], matrix))
+                else:
+                    rebuild = True
+                self.shards[shard_dir] = (size, entries, matrix)
+
+        # Shards removed by the retention janitor
+        for shard_dir in set(self.shards) - seen:
+            del self.shards[shard_dir]
+            rebuild = True
+
+        if rebuild:
+            self.clear()
+            grown = [(shard_dir, entries, matrix) for shard_dir, (_, entries, matrix) in sorted(self.shards.items())]
+        if grown:
+            for shard_dir, entries, matrix in grown:
+                self.append(shard_dir, entries, matrix)
+            self.publish()
+        return self.count
+
+    def append(self, shard_dir, entries, matrix):
+        if not entries:
+            return
+        start, end = self.count, self.count + len(entries)
+        if end > len(self.buffer):
+            # A new buffer: snapshots taken earlier keep viewing the old one
+            buffer = np.empty((max(end, 2 * len(self.buffer), 1024), ENCODING_SIZE), np.float32)
+            buffer[:start] = self.buffer[:start]
+            self.buffer = buffer
+        self.buffer[start:end] = matrix[[entry['row'] for entry in entries]]
+        for i, entry in enumerate(entries, start):
+            path = os.path.join(shard_dir, entry['file'])
+            self.paths.append(path)
+            self.entries.append(entry)
+            self.rows[os.path.normpath(path)] = i
+        self.count = end
+
+    def encoding_for(self, path):
+        """Stored encoding of a saved crop (None if it isn't indexed)"""
+        _, _, matrix, rows = self.snapshot
+        row = rows.get(os.path.normpath(path))
+        return matrix[row] if row is not None and row < len(matrix) else None
+
+    def search(self, encoding, tolerance=0.5, limit=50, category=None):
+        """
+        Saved crops within tolerance of encoding, closest first
+
+        Returns [{'path', 'distance', ...manifest metadata}]. Crops moved
+        or pruned since indexing are skipped.
+        """
+        paths, entries, matrix, _ = self.snapshot
+        if not len(matrix):
+            return []
+        query = np.asarray(encoding, dtype=np.float32)
+        distances = np.linalg.norm(matrix - query, axis=1)
+        candidates = np.flatnonzero(distances <= tolerance)
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+
+        results = []
+        for i in candidates:
+            entry = entries[i]
+            if category is not None and entry.get('category') != category:
+                continue
+            if not os.path.exists(paths[i]):
+                continue
+            result = dict(entry)
+            result['path'] = paths[i]
+            result['distance'] = round(float(distances[i]), 4)
+            results.append(result)
+            if len(results) >= limit:
+                break
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find saved crops of the face in an image")
+    parser.add_argument('image', help="Query image (photo or saved crop)")
+    parser.add_argument('--root', default='data/detected_faces')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--category', choices=CATEGORIES, default=None)
+    parser.add_argument('--profile', default='balanced')
+    args = parser.parse_args()
+
+    index = FaceIndex(args.root)
+    count = index.refresh()
+
+    encoding = index.encoding_for(args.image)
+    if encoding is None:
+        image = cv2.imread(args.image)
+        if image is None:
+            print(f"ERROR: Could not read image: {args.image}")
+            sys.exit(1)
+        encoding = encode_image(image, args.profile)
+        if encoding is None:
+            print(f"ERROR: No face found in {args.image}")
+            sys.exit(1)
+
+    results = index.search(encoding, args.tolerance, args.limit, args.category)
+    for result in results:
+        print(f"  {result['distance']:.3f}  {result['path']}  "
+              f"{result.get('camera') or ''} {result.get('cluster') or result.get('roll_no') or ''}")
+    print(f"✓ {len(results)} matches among {count} indexed crops")
+
+
+if __name__ == "__main__":
+    main()
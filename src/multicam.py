@@ -0,0 +1,352 @@
+"""Several cameras sharing one gallery and one detection/encoding worker pool"""
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import cv2
+
+from buffers import FrameBufferPool
+from overlay import OverlayRenderer
+from profiles import detect_and_encode, get_profile
+from diagnostics import get_logger
+
+log = get_logger('multicam')
+
+
+def open_results(results_path):
+    """Stream for headless JSON records: a file path, '-' (stdout) or an open stream; returns (stream, close)"""
+    if hasattr(results_path, 'write'):
+        return results_path, False
+    if results_path == '-':
+        return sys.stdout, False
+    return open(results_path, 'a', encoding='utf-8'), True
+
+
+def timed_detect_and_encode(rgb_image, profile):
+    """detect_and_encode plus the CPU seconds it took in this worker"""
+    started = time.thread_time()
+    face_locations, face_encodings = detect_and_encode(rgb_image, profile)
+    return face_locations, face_encodings, time.thread_time() - started
+
+
+class CameraState:
+    """
+    Per-camera recognition state
+
+    Everything that must not be shared between entrances lives here:
+    the overlay with its latest results, the size of
+    incoming frames relative to capture resolution, and the buffers used
+    to prepare this camera's frames.
+    """
+
+    def __init__(self, camera_id='cam0', input_scale=1.0):
+        self.camera_id = camera_id
+        self.input_scale = input_scale
+        self.overlay = OverlayRenderer()
+        self.buffer_pool = FrameBufferPool()
+        self.clips = None  # clips.ClipRecorder when pre-event clips are enabled
+
+
+class CameraFeed:
+    """
+    One camera: its source, capture thread, latest-frame slot and stats
+
+    Live sources overwrite the slot, so recognition always gets the
+    newest frame. For other sources (files read without --realtime,
+    image directories) the capture thread waits until the previous frame
+    has been dispatched, so every frame is recognised.
+    """
+
+    def __init__(self, camera_id, source, state, scheduler=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.state = state
+        self.scheduler = scheduler
+
+        self.lock = threading.Lock()
+        self.taken = threading.Condition(self.lock)
+        self.every_frame = not getattr(source, 'live', True)
+        self.latest = None        # (frame, evidence, capture time)
+        self.latest_seq = 0
+        self.dispatched_seq = 0
+        self.in_flight = False
+        self.running = True
+        self.finished = False
+
+        # Stats
+        self.frames_captured = 0
+        self.frames_recognised = 0
+        self.capture_fps = 0.0
+        self.recognition_fps = 0.0
+        self.latency_ms = 0.0
+        self.last_capture_time = None
+        self.last_result_time = None
+
+        self.thread = threading.Thread(target=self.capture_loop, name=f"capture-{camera_id}", daemon=True)
+
+    @staticmethod
+    def ema(previous, value):
+        return value if previous == 0 else 0.9 * previous + 0.1 * value
+
+    def capture_loop(self):
+        """Keep only the newest frame; the dispatcher takes it when a worker is free"""
+        while self.running:
+            loop_started = time.monotonic()
+            ret, frame = self.source.read()
+            if not ret:
+                break
+
+            now = time.monotonic()
+            evidence = self.source.last_evidence()
+            if self.state.clips is not None:
+                self.state.clips.push(frame)
+            with self.lock:
+                while self.every_frame and self.running and self.latest_seq != self.dispatched_seq:
+                    self.taken.wait(0.1)
+                self.latest = (frame, evidence, now)
+                self.latest_seq += 1
+                self.frames_captured += 1
+                if self.last_capture_time is not None and now > self.last_capture_time:
+                    self.capture_fps = self.ema(self.capture_fps, 1.0 / (now - self.last_capture_time))
+                self.last_capture_time = now
+
+            if self.scheduler is not None:
+                self.scheduler.count_frame()
+                self.scheduler.throttle(loop_started)
+
+        self.finished = True
+
+    def take(self):
+        """Claim the newest undispatched frame (copied), or None"""
+        with self.lock:
+            if self.in_flight or self.latest is None or self.latest_seq == self.dispatched_seq:
+                return None
+            frame, evidence, captured_at = self.latest
+            self.dispatched_seq = self.latest_seq
+            self.in_flight = True
+            self.taken.notify()
+        # Capture buffers can be reused by the source, so hand workers a copy
+        return frame.copy(), evidence, captured_at
+
+    def done(self):
+        """Source ended and its last frame has been recognised"""
+        with self.lock:
+            return self.finished and not self.in_flight and self.latest_seq == self.dispatched_seq
+
+    def record_result(self, captured_at):
+        now = time.monotonic()
+        with self.lock:
+            self.in_flight = False
+            self.frames_recognised += 1
+            self.latency_ms = self.ema(self.latency_ms, (now - captured_at) * 1000)
+            if self.last_result_time is not None and now > self.last_result_time:
+                self.recognition_fps = self.ema(self.recognition_fps, 1.0 / (now - self.last_result_time))
+            self.last_result_time = now
+
+    def stats(self):
+        with self.lock:
+            return {
+                'camera': self.camera_id,
+                'source': self.source.name,
+                'capture_fps': round(self.capture_fps, 1),
+                'recognition_fps': round(self.recognition_fps, 1),
+                'latency_ms': round(self.latency_ms, 1),
+                'frames_captured': self.frames_captured,
+                'frames_recognised': self.frames_recognised,
+            }
+
+
+class MultiCameraRecognizer:
+    """
+    Runs N cameras in one process
+
+    Each camera has its own capture thread and CameraState; all of them
+    share the system's gallery and one pool of detection/encoding
+    workers. The dispatcher serves cameras round-robin, at most one frame
+    in flight per camera, so a busy entrance cannot starve the others.
+
+    Detection/encoding runs in worker processes by default (dlib holds the
+    GIL), each loading the models once; classification against the
+    gallery and saving crops stay in this process.
+    """
+
+    def __init__(self, system, sources, workers=2, use_processes=True, scheduler=None):
+        self.system = system
+        self.max_workers = max(1, workers)  # pool size
+        self.workers = self.max_workers     # workers in use (scheduler may lower it)
+        self.use_processes = use_processes
+        self.scheduler = scheduler
+        self.feeds = []
+        for index, source in enumerate(sources):
+            camera_id = f"cam{index}"
+            reduction = getattr(source, 'reduction', None)
+            state = CameraState(camera_id, input_scale=1.0 / reduction if reduction else 1.0)
+            system.attach_clips(state)
+            self.feeds.append(CameraFeed(camera_id, source, state, scheduler))
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.next_feed = 0
+        self.running = False
+        self.on_result = None
+
+    def pick_next(self):
+        """Round-robin over cameras that have a fresh frame and nothing in flight"""
+        count = len(self.feeds)
+        for offset in range(count):
+            feed = self.feeds[(self.next_feed + offset) % count]
+            if self.scheduler is not None and not self.scheduler.should_detect(feed.camera_id):
+                continue
+            job = feed.take()
+            if job is not None:
+                self.next_feed = (self.next_feed + offset + 1) % count
+                if self.scheduler is not None:
+                    self.scheduler.mark_detected(feed.camera_id)
+                return feed, job
+        return None, None
+
+    def dispatch_loop(self, executor):
+        while self.running:
+            with self.condition:
+                while self.running and self.in_flight >= self.workers:
+                    self.condition.wait(0.1)
+                if not self.running:
+                    break
+
+            feed, job = self.pick_next()
+            if feed is None:
+                if all(f.done() for f in self.feeds):
+                    break
+                time.sleep(0.002)
+                continue
+
+            frame, evidence, captured_at = job
+            state = feed.state
+            scale = min(1.0, self.system.profile['scale'] / state.input_scale)
+            rgb_small_frame = state.buffer_pool.prepare_rgb(frame, scale)
+
+            with self.condition:
+                self.in_flight += 1
+            future = executor.submit(timed_detect_and_encode, rgb_small_frame, self.system.profile)
+            future.add_done_callback(
+                lambda f, feed=feed, frame=frame, evidence=evidence, captured_at=captured_at, scale=scale:
+                self.complete(f, feed, frame, evidence, captured_at, scale)
+            )
+
+        self.running = False
+
+    def complete(self, future, feed, frame, evidence, captured_at, scale):
+        """Classify a finished detection against the shared gallery and publish it"""
+        try:
+            face_locations, face_encodings, cpu_seconds = future.result()
+            if self.use_processes and self.scheduler is not None:
+                self.scheduler.add_worker_cpu(cpu_seconds)
+            face_data = self.system.classify_detections(
+                frame, face_locations, face_encodings, scale, evidence, feed.state
+            )
+            feed.state.overlay.update_results(self.system.face_labels(face_data))
+            latency_ms = (time.monotonic() - captured_at) * 1000
+            if self.on_result is not None:
+                record = self.system.result_record(feed.source.name, feed.frames_recognised + 1, face_data, latency_ms)
+                record['camera'] = feed.camera_id
+                self.on_result(record)
+        except Exception as e:
+            log.error("Error during face detection on %s: %s", feed.camera_id, e,
+                      extra={'event': 'detection_error', 'camera': feed.camera_id})
+        finally:
+            feed.record_result(captured_at)
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify()
+
+    def run(self, headless=False, results_path='-', duration=None, stats_interval=10.0):
+        """Run until 'q' (windowed), Ctrl+C, duration seconds, or all sources end"""
+        output = None
+        close_output = False
+        output_lock = threading.Lock()
+        if headless:
+            output, close_output = open_results(results_path)
+
+            def write_record(record):
+                with output_lock:
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+            self.on_result = write_record
+
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        executor = executor_class(max_workers=self.max_workers)
+
+        self.running = True
+        for feed in self.feeds:
+            feed.thread.start()
+        dispatcher = threading.Thread(target=self.dispatch_loop, args=(executor,), name='dispatcher', daemon=True)
+        dispatcher.start()
+
+        started = time.monotonic()
+        last_stats = started
+        try:
+            while self.running:
+                self.apply_schedule()
+                now = time.monotonic()
+                if duration is not None and now - started >= duration:
+                    break
+
+                if headless:
+                    time.sleep(0.05)
+                else:
+                    for feed in self.feeds:
+                        with feed.lock:
+                            latest = feed.latest
+                        if latest is None:
+                            continue
+                        stats = feed.stats()
+                        banner = f"{feed.camera_id} | {stats['capture_fps']:.0f} fps | {stats['latency_ms']:.0f} ms | Press 'q' to quit"
+                        cv2.imshow(f"Mess Recognition - {feed.camera_id}", feed.state.overlay.render(latest[0], banner))
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+
+                if stats_interval and now - last_stats >= stats_interval:
+                    self.print_stats()
+                    last_stats = now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.running = False
+            for feed in self.feeds:
+                feed.running = False
+            dispatcher.join(5.0)
+            executor.shutdown(wait=True)
+            for feed in self.feeds:
+                feed.thread.join(5.0)
+                feed.source.release()
+                if feed.state.clips is not None:
+                    feed.state.clips.stop()
+            if self.scheduler is not None:
+                self.scheduler.stop()
+            if not headless:
+                cv2.destroyAllWindows()
+            if close_output:
+                output.close()
+
+        self.print_stats()
+        return [feed.stats() for feed in self.feeds]
+
+    def apply_schedule(self):
+        """Apply scheduler mode changes to the shared profile and active worker count"""
+        if self.scheduler is None:
+            return
+        settings = self.scheduler.update()
+        if settings is not None:
+            self.system.profile = get_profile(settings['profile'])
+            with self.condition:
+                self.workers = max(1, min(settings['workers'], self.max_workers))
+                self.condition.notify_all()
+
+    def print_stats(self):
+        for feed in self.feeds:
+            stats = feed.stats()
+            print(f"[{stats['camera']}] {stats['source']}: capture {stats['capture_fps']:.1f} fps, "
+                  f"recognition {stats['recognition_fps']:.1f} fps, latency {stats['latency_ms']:.0f} ms, "
+                  f"{stats['frames_recognised']}/{stats['frames_captured']} frames recognised",
+                  file=sys.stderr)
@@ -0,0 +1,125 @@
+"""Overlay rendering with cached label sprites"""
+import time
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+from buffers import FrameBufferPool
+
+
+def blit(frame, sprite, x, y, mask=None):
+    """Copy sprite into frame at (x, y), clipped to the frame, optionally through a mask"""
+    sprite_height, sprite_width = sprite.shape[:2]
+    frame_height, frame_width = frame.shape[:2]
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite_width, frame_width), min(y + sprite_height, frame_height)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    roi = frame[y0:y1, x0:x1]
+    source = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+    if mask is None:
+        roi[...] = source
+    else:
+        np.copyto(roi, source, where=mask[y0 - y:y1 - y, x0 - x:x1 - x, None])
+
+
+class OverlayRenderer:
+    """
+    Draws recognition results onto display frames
+
+    Label strips (coloured background + Hershey text) are rendered once
+    per (label, colour) and afterwards only copied into the frame, since
+    putText is by far the most expensive part of drawing an overlay. The
+    stats banner is cached the same way and re-rendered only when its
+    text changes.
+
+    The renderer also holds the latest recognition results, so the display
+    loop can redraw every captured frame while recognition updates the
+    results at its own, slower rate.
+    """
+
+    LABEL_HEIGHT = 30
+    TEXT_COLOR = (255, 255, 255)
+
+    def __init__(self, max_sprites=512, max_result_age=2.0):
+        self.max_sprites = max_sprites
+        self.max_result_age = max_result_age  # seconds before stale boxes are hidden
+        self.sprites = OrderedDict()
+        self.banner = (None, None, None, 0)  # (text, sprite, mask, baseline y)
+        self.buffer_pool = FrameBufferPool()
+
+        self.results_lock = threading.Lock()
+        self.results = []
+        self.results_time = 0.0
+
+    def label_sprite(self, text, color, font_scale):
+        """Pre-rendered label strip for (text, color), cached LRU"""
+        key = (text, color, font_scale)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
+
+        (text_width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_DUPLEX, font_scale, 1)
+        sprite = np.empty((self.LABEL_HEIGHT, text_width + 12, 3), dtype=np.uint8)
+        sprite[...] = color
+        cv2.putText(sprite, text, (6, 20), cv2.FONT_HERSHEY_DUPLEX, font_scale, self.TEXT_COLOR, 1)
+
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def draw_face(self, frame, box, color, label_top, label_bottom):
+        """Draw one face box with its name strip above and status strip below"""
+        left, top, right, bottom = box
+        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+
+        # Plain fills are cheap; only the text itself comes from the cache
+        cv2.rectangle(frame, (left, top - self.LABEL_HEIGHT), (right, top), color, cv2.FILLED)
+        cv2.rectangle(frame, (left, bottom), (right, bottom + self.LABEL_HEIGHT), color, cv2.FILLED)
+
+        top_sprite = self.label_sprite(label_top, color, 0.6)
+        blit(frame, top_sprite, left, top - self.LABEL_HEIGHT)
+
+        bottom_sprite = self.label_sprite(label_bottom, color, 0.5)
+        blit(frame, bottom_sprite, left, bottom)
+
+    def draw_banner(self, frame, text):
+        """Draw the stats banner, re-rendering it only when the text changes"""
+        cached_text, sprite, mask, origin_y = self.banner
+        if cached_text != text:
+            (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+            origin_y = text_height + 2
+            sprite = np.zeros((origin_y + baseline + 2, text_width + 4, 3), dtype=np.uint8)
+            cv2.putText(sprite, text, (2, origin_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.TEXT_COLOR, 2)
+            mask = sprite[:, :, 0] > 0
+            self.banner = (text, sprite, mask, origin_y)
+
+        # Text baseline at (10, 30), as the banner was always drawn
+        blit(frame, sprite, 8, 30 - origin_y, mask)
+
+    def update_results(self, labels):
+        """Publish the latest recognition results as (box, color, label_top, label_bottom)"""
+        with self.results_lock:
+            self.results = labels
+            self.results_time = time.monotonic()
+
+    def latest_results(self):
+        """Latest results, or nothing once they are older than max_result_age"""
+        with self.results_lock:
+            if time.monotonic() - self.results_time > self.max_result_age:
+                return []
+            return self.results
+
+    def render(self, frame, banner_text=None):
+        """Copy frame into a display buffer and draw the latest results on it"""
+        display_frame = self.buffer_pool.display_copy(frame)
+        for box, color, label_top, label_bottom in self.latest_results():
+            self.draw_face(display_frame, box, color, label_top, label_bottom)
+        if banner_text:
+            self.draw_banner(display_frame, banner_text)
+        return display_frame
@@ -0,0 +1,105 @@
+"""Named speed/accuracy profiles for face detection and encoding"""
+import face_recognition
+
+# Each profile bundles the knobs passed to face_recognition:
+#   scale      - resize factor applied to the frame before detection
+#   upsample   - number_of_times_to_upsample for face_locations
+#   detector   - face_locations model ('hog' or 'cnn')
+#   num_jitters - re-samples averaged by face_encodings (slower, more stable)
+#   landmarks  - landmark model for face_encodings ('small' = 5 pt, 'large' = 68 pt)
+PROFILES = {
+    # Cheapest settings for the gate loop at peak load
+    'rush': {
+        'scale': 0.25,
+        'upsample': 1,
+        'detector': 'hog',
+        'num_jitters': 1,
+        'landmarks': 'small',
+    },
+    # Previous recognizer behaviour (half-size frame, library defaults)
+    'balanced': {
+        'scale': 0.5,
+        'upsample': 1,
+        'detector': 'hog',
+        'num_jitters': 1,
+        'landmarks': 'small',
+    },
+    # Full-size frame, finds smaller/farther faces
+    'accurate': {
+        'scale': 1.0,
+        'upsample': 1,
+        'detector': 'hog',
+        'num_jitters': 2,
+        'landmarks': 'large',
+    },
+    # Single still photo, latency does not matter
+    'enroll': {
+        'scale': 1.0,
+        'upsample': 1,
+        'detector': 'hog',
+        'num_jitters': 50,
+        'landmarks': 'large',
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+
+def get_profile(profile):
+    """
+    Resolve a profile name (or a dict of overrides) to a full profile dict
+
+    A dict may override any subset of keys; missing keys fall back to
+    the 'balanced' profile, or to the profile named by its 'base' key.
+    """
+    if profile is None:
+        profile = DEFAULT_PROFILE
+
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(
+                f"Unknown profile '{profile}'. Choose from: {', '.join(PROFILES)}"
+            )
+        resolved = dict(PROFILES[profile])
+        resolved['name'] = profile
+        return resolved
+
+    overrides = dict(profile)
+    base = get_profile(overrides.pop('base', DEFAULT_PROFILE))
+    unknown = set(overrides) - set(base)
+    if unknown:
+        raise ValueError(f"Unknown profile keys: {', '.join(sorted(unknown))}")
+    base.update(overrides)
+    base['name'] = profile.get('name', 'custom')
+    return base
+
+
+def locate_faces(rgb_image, profile):
+    """Run face_locations with the profile's detector settings"""
+    return face_recognition.face_locations(
+        rgb_image,
+        number_of_times_to_upsample=profile['upsample'],
+        model=profile['detector']
+    )
+
+
+def encode_faces(rgb_image, face_locations, profile):
+    """Run face_encodings with the profile's jitter/landmark settings"""
+    return face_recognition.face_encodings(
+        rgb_image,
+        face_locations,
+        num_jitters=profile['num_jitters'],
+        model=profile['landmarks']
+    )
+
+
+def detect_and_encode(rgb_image, profile):
+    """
+    Locate and encode all faces in an RGB image
+
+    Top-level so it can also run in a worker process.
+    Returns (face_locations, face_encodings).
+    """
+    face_locations = locate_faces(rgb_image, profile)
+    face_encodings = encode_faces(rgb_image, face_locations, profile)
+    return face_locations, face_encodings
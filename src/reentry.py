@@ -0,0 +1,98 @@
+"""Per-meal admission tracking: flags students entering twice in one meal"""
+import os
+import threading
+from datetime import datetime
+
+from events import iter_events
+from scheduler import MEAL_WINDOWS, meal_window_at, parse_clock
+
+
+class MealAdmissions:
+    """
+    Roll numbers already admitted in the current meal window
+
+    admit() is a dict lookup, so re-entries are flagged on the frame
+    they happen without touching storage. A student who stays in view is
+    one entry; being seen again after more than reentry_gap seconds out
+    of view counts as another entry. The state is cleared when the meal
+    window changes, and rebuild() replays the current window from the
+    event log after a restart.
+    """
+
+    def __init__(self, windows=None, before_minutes=15, after_minutes=10, reentry_gap=120.0):
+        self.windows = {
+            name: (parse_clock(start), parse_clock(end))
+            for name, (start, end) in (windows or MEAL_WINDOWS).items()
+        }
+        self.before_minutes = before_minutes
+        self.after_minutes = after_minutes
+        self.reentry_gap = reentry_gap
+
+        self.lock = threading.Lock()
+        self.window = None          # (date, name) being tracked
+        self.admitted = {}          # roll_no -> [entries, last seen (unix time)]
+        self.reentries = 0
+
+    def window_key(self, now):
+        name = meal_window_at(now, self.windows, self.before_minutes, self.after_minutes)
+        return (now.date(), name) if name else None
+
+    def meal_at(self, timestamp):
+        """Meal window name for a unix time, or None"""
+        key = self.window_key(datetime.fromtimestamp(timestamp))
+        return key[1] if key else None
+
+    def window_start(self, now):
+        """Unix time at which the window containing now opened (None outside windows)"""
+        key = self.window_key(now)
+        if key is None:
+            return None
+        start, _ = self.windows[key[1]]
+        opened = now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        return opened + (start - self.before_minutes) * 60
+
+    def admit(self, roll_no, timestamp):
+        """
+        Record a sighting of a mess student at unix time timestamp
+
+        Returns (entry number in this meal, True if this sighting started
+        that entry); entry is 1 for the first entry and 0 outside meal
+        windows.
+        """
+        key = self.window_key(datetime.fromtimestamp(timestamp))
+        with self.lock:
+            if key != self.window:
+                self.window = key
+                self.admitted = {}
+            if key is None:
+                return 0, False
+
+            record = self.admitted.get(roll_no)
+            if record is None:
+                self.admitted[roll_no] = [1, timestamp]
+                return 1, True
+            new_entry = timestamp - record[1] > self.reentry_gap
+            if new_entry:
+                record[0] += 1
+                self.reentries += 1
+            record[1] = timestamp
+            return record[0], new_entry
+
+    def entries(self, roll_no):
+        with self.lock:
+            record = self.admitted.get(roll_no)
+            return record[0] if record else 0
+
+    def rebuild(self, events_db, now=None):
+        """Replay the current window's mess sightings from the event log; returns events read"""
+        now = now or datetime.now()
+        since = self.window_start(now)
+        if since is None or not events_db or not os.path.exists(events_db):
+            return 0
+
+        count = 0
+        for event in iter_events(events_db, since=since, category='mess'):
+            if event['roll_no']:
+                self.admit(event['roll_no'], event['time'])
+                count += 1
+        return count
@@ -0,0 +1,280 @@
+"""
+Retroactive re-identification of saved outsider crops
+
+Students who enroll late were saved as outsiders until then. This job
+matches stored outsider crops against gallery entries added (or
+re-enrolled) since each crop was last checked, and moves matches to
+data/detected_faces/reidentified/<date>/<hour>/<roll_no>_<file>.
+
+Crop encodings come from the shard's embeddings.f32 sidecar written at
+save time; crops without one (saved before sidecars existed) are encoded
+once in a process pool. Encodings are cached per shard in embeddings.npz together with the gallery version each crop was
+checked against, so later runs only do vectorized distance checks
+against the new entries.
+
+Usage: python src/reidentify.py [--workers N] [--tolerance 0.5] [--dry-run]
+"""
+import os
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+from storage import (ENCODING_SIZE, IMAGE_EXTENSIONS, append_entry, list_shards, read_embeddings, read_manifest,
+                     record_removal)
+
+CACHE = 'embeddings.npz'
+PADDING = 0.4  # save_detected_face pads crops by 40% of the face size
+CHUNK = 4096   # crops per distance-matrix block
+TOLERANCE = 0.5  # same as the live recognizer: a match moves the crop
+
+
+def update_gallery_versions(college_db, state_path, save=True):
+    """
+    Version the gallery: entries new or changed since the last run get
+    version + 1. Returns (version, roll_nos, encodings, entry versions).
+    With save=False (dry runs) the new versions are not written to state_path.
+    """
+    with open(college_db, 'rb') as f:
+        students = pickle.load(f)
+
+    state = {'version': 0, 'entries': {}}
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+    next_version = state['version'] + 1
+    changed = False
+    for roll_no, student in students.items():
+        digest = hashlib.sha1(np.asarray(student['encoding'], dtype=np.float64).tobytes()).hexdigest()
+        entry = state['entries'].get(roll_no)
+        if entry is None or entry['hash'] != digest:
+            state['entries'][roll_no] = {'version': next_version, 'hash': digest}
+            changed = True
+
+    if changed:
+        state['version'] = next_version
+    if changed and save:
+        directory = os.path.dirname(state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    roll_nos = [roll_no for roll_no in students if roll_no in state['entries']]
+    encodings = np.array([students[r]['encoding'] for r in roll_nos], dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    versions = np.array([state['entries'][r]['version'] for r in roll_nos], dtype=np.int32)
+    return state['version'], roll_nos, encodings, versions
+
+
+def shard_files(shard_dir):
+    return sorted(f for f in os.listdir(shard_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def load_cache(shard_dir):
+    """file -> (encoding, checked version) for a shard"""
+    path = os.path.join(shard_dir, CACHE)
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as data:
+        return {
+            str(name): (encoding, int(checked))
+            for name, encoding, checked in zip(data['files'], data['encodings'], data['checked'])
+        }
+
+
+def save_cache(shard_dir, cache):
+    files = sorted(cache)
+    temp_path = os.path.join(shard_dir, 'embeddings.part.npz')
+    np.savez(
+        temp_path,
+        files=np.array(files, dtype=str),
+        encodings=np.array([cache[f][0] for f in files], dtype=np.float32).reshape(-1, ENCODING_SIZE),
+        checked=np.array([cache[f][1] for f in files], dtype=np.int32),
+    )
+    os.replace(temp_path, os.path.join(shard_dir, CACHE))
+
+
+def encode_crops(shard_dir, files, profile_name='balanced'):
+    """
+    Process-pool worker: encodings for crops (NaN rows where no face)
+
+    The face is searched for in the crop; if the detector misses it, the
+    box save_detected_face padded around is assumed.
+    """
+    from profiles import get_profile, locate_faces, encode_faces
+
+    profile = get_profile(profile_name)
+    encodings = np.full((len(files), ENCODING_SIZE), np.nan, dtype=np.float32)
+    for i, name in enumerate(files):
+        image = cv2.imread(os.path.join(shard_dir, name))
+        if image is None:
+            continue
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        locations = locate_faces(rgb, profile)
+        if not locations:
+            height, width = rgb.shape[:2]
+            pad_y = int(height * PADDING / (1 + 2 * PADDING))
+            pad_x = int(width * PADDING / (1 + 2 * PADDING))
+            locations = [(pad_y, width - pad_x, height - pad_y, pad_x)]
+        found = encode_faces(rgb, locations[:1], profile)
+        if found:
+            encodings[i] = found[0]
+    return shard_dir, files, encodings
+
+
+def match_shard(cache, gallery_encodings, gallery_versions, version, tolerance):
+    """
+    Compare crops not yet checked against the current gallery version
+
+    Only gallery entries newer than a crop's checked version are used.
+    Returns [(file, gallery index, distance)] and marks crops checked.
+    """
+    matches = []
+    pending = [name for name, (_, checked) in cache.items() if checked < version]
+    by_checked = {}
+    for name in pending:
+        by_checked.setdefault(cache[name][1], []).append(name)
+
+    for checked, names in by_checked.items():
+        candidates = np.flatnonzero(gallery_versions > checked)
+        if len(candidates):
+            crops = np.array([cache[name][0] for name in names], dtype=np.float32)
+            valid = ~np.isnan(crops).any(axis=1)
+            crops[~valid] = 0
+            gallery = gallery_encodings[candidates]
+            gallery_norms = (gallery ** 2).sum(axis=1)
+
+            # |a - b|^2 = |a|^2 + |b|^2 - 2ab, in row chunks to bound memory
+            for start in range(0, len(names), CHUNK):
+                chunk = crops[start:start + CHUNK]
+                squared = (chunk ** 2).sum(axis=1)[:, None] + gallery_norms[None, :] - 2 * chunk @ gallery.T
+                best = np.argmin(squared, axis=1)
+                best_distances = np.sqrt(np.maximum(squared[np.arange(len(chunk)), best], 0))
+                for row in np.flatnonzero((best_distances <= tolerance) & valid[start:start + CHUNK]):
+                    matches.append((names[start + row], int(candidates[best[row]]), float(best_distances[row])))
+        for name in names:
+            cache[name] = (cache[name][0], version)
+    return matches
+
+
+def move_crop(root, shard_dir, name, roll_no, encoding=None, source=None):
+    """
+    Move a re-identified crop to reidentified/<date>/<hour>/ (same shard times)
+
+    The new manifest entry keeps the crop's original metadata (source,
+    its outsider manifest entry) with the matched roll_no, and the
+    encoding goes to the target shard's sidecar, so exports and face
+    search still find the crop. The outsider shard gets a tombstone, so
+    they stop listing it as an outsider.
+    """
+    relative = os.path.relpath(shard_dir, os.path.join(root, 'outsiders'))
+    target_dir = os.path.join(root, 'reidentified', relative) if relative != '.' else os.path.join(root, 'reidentified')
+    os.makedirs(target_dir, exist_ok=True)
+    target = os.path.join(target_dir, f"{roll_no}_{name}")
+    os.replace(os.path.join(shard_dir, name), target)
+
+    entry = {key: value for key, value in (source or {}).items() if key not in ('file', 'bytes', 'saved', 'row')}
+    entry.update({'file': os.path.basename(target), 'bytes': os.path.getsize(target),
+                  'saved': datetime.now().isoformat(timespec='seconds'), 'roll_no': roll_no,
+                  'from': os.path.join(relative, name)})
+    if encoding is not None and np.isnan(encoding).any():
+        encoding = None
+    append_entry(target_dir, entry, encoding)
+    if relative != '.':
+        record_removal(shard_dir, name, to=os.path.relpath(target, root).replace(os.sep, '/'))
+    return target
+
+
+def reidentify(root='data/detected_faces', college_db='college_students.pkl',
+               state_path='data/gallery_versions.json', log_path='data/reidentified.jsonl',
+               tolerance=TOLERANCE, workers=None, dry_run=False, encoder=encode_crops):
+    """Run one incremental pass; returns a summary dict"""
+    version, roll_nos, gallery_encodings, gallery_versions = update_gallery_versions(college_db, state_path,
+                                                                                    save=not dry_run)
+    outsiders_dir = os.path.join(root, 'outsiders')
+    shard_dirs = [os.path.join(outsiders_dir, date, hour) for date, hour in list_shards(outsiders_dir)]
+    if os.path.isdir(outsiders_dir) and shard_files(outsiders_dir):
+        shard_dirs.insert(0, outsiders_dir)  # crops saved before sharding
+
+    # Encode crops that have neither a cached nor a sidecar encoding
+    caches = {}
+    jobs = []
+    for shard_dir in shard_dirs:
+        cache = load_cache(shard_dir)
+        files = shard_files(shard_dir)
+        cache = {name: cache[name] for name in files if name in cache}
+        entries, matrix = read_embeddings(shard_dir)
+        for entry in entries:
+            if entry['file'] not in cache:
+                cache[entry['file']] = (matrix[entry['row']], 0)
+        cache = {name: cache[name] for name in files if name in cache}
+        caches[shard_dir] = cache
+        missing = [name for name in files if name not in cache]
+        if missing:
+            jobs.append((shard_dir, missing))
+
+    encoded = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(encoder, shard_dir, missing) for shard_dir, missing in jobs]
+            for future in futures:
+                shard_dir, files, encodings = future.result()
+                for name, encoding in zip(files, encodings):
+                    caches[shard_dir][name] = (encoding, 0)
+                encoded += len(files)
+
+    # Vectorized matching against entries newer than each crop's check
+    summary = {'version': version, 'shards': len(shard_dirs), 'encoded': encoded, 'checked': 0, 'matched': 0}
+    log = None if dry_run else open(log_path, 'a', encoding='utf-8')
+    try:
+        for shard_dir, cache in caches.items():
+            summary['checked'] += sum(1 for _, checked in cache.values() if checked < version)
+            matches = match_shard(cache, gallery_encodings, gallery_versions, version, tolerance)
+            sources = {entry['file']: entry for entry in read_manifest(shard_dir)} if matches and not dry_run else {}
+            for name, index, distance in matches:
+                summary['matched'] += 1
+                roll_no = roll_nos[index]
+                if dry_run:
+                    print(f"  {os.path.join(shard_dir, name)} -> {roll_no} ({distance:.3f})")
+                    continue
+                target = move_crop(root, shard_dir, name, roll_no, cache[name][0], sources.get(name))
+                del cache[name]
+                log.write(json.dumps({'from': os.path.join(shard_dir, name), 'to': target,
+                                      'roll_no': roll_no, 'distance': round(distance, 4),
+                                      'gallery_version': version}) + "\n")
+            if not dry_run and cache:
+                save_cache(shard_dir, cache)
+    finally:
+        if log is not None:
+            log.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-match saved outsider crops against newly enrolled students")
+    parser.add_argument('--root', default='data/detected_faces')
+    parser.add_argument('--college-db', default='college_students.pkl')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--workers', type=int, default=None, help="Encoding processes (default: CPU count)")
+    parser.add_argument('--dry-run', action='store_true', help="Report matches without moving crops")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.college_db):
+        print(f"ERROR: Gallery not found: {args.college_db}")
+        sys.exit(1)
+
+    summary = reidentify(args.root, args.college_db, tolerance=args.tolerance,
+                         workers=args.workers, dry_run=args.dry_run)
+    print(f"✓ Gallery version {summary['version']}: {summary['shards']} shards, "
+          f"{summary['encoded']} crops encoded, {summary['checked']} checked, "
+          f"{summary['matched']} re-identified")
+
+
+if __name__ == "__main__":
+    main()
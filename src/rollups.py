@@ -0,0 +1,137 @@
+"""Incremental per-meal analytics: counters updated as people arrive"""
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from events import connect, connect_readonly, missing_table
+from diagnostics import get_logger
+
+log = get_logger('rollups')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    date TEXT NOT NULL,
+    meal TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    camera TEXT NOT NULL,
+    category TEXT NOT NULL,
+    department TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, meal, hour, camera, category, department)
+) WITHOUT ROWID;
+"""
+
+KEY_COLUMNS = ('date', 'meal', 'hour', 'camera', 'category', 'department')
+
+UPSERT = (
+    f"INSERT INTO rollups ({', '.join(KEY_COLUMNS)}, count) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET count = count + excluded.count"
+)
+
+
+def connect_rollups(path):
+    connection = connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def query_rollups(path, date_from, date_to=None, group_by=('date', 'meal', 'category'), **filters):
+    """
+    Summed counts for dates date_from..date_to ('YYYY-MM-DD', inclusive)
+
+    group_by and filters (e.g. meal='lunch', category='outsider') take
+    rollup key columns. Date ranges use the primary key, so a semester is
+    a few thousand rows at most.
+    """
+    for column in list(group_by) + list(filters):
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"Unknown rollup column '{column}'. Choose from: {', '.join(KEY_COLUMNS)}")
+
+    clauses = ["date >= ?", "date <= ?"]
+    params = [date_from, date_to or date_from]
+    for column, value in filters.items():
+        clauses.append(f"{column} = ?")
+        params.append(value)
+
+    columns = ', '.join(group_by)
+    select = f"{columns}, " if group_by else ""
+    group = f" GROUP BY {columns} ORDER BY {columns}" if group_by else ""
+    sql = f"SELECT {select}SUM(count) FROM rollups WHERE {' AND '.join(clauses)}{group}"
+
+    connection = connect_readonly(path)
+    try:
+        return [
+            dict(zip(tuple(group_by) + ('count',), row))
+            for row in connection.execute(sql, params)
+            if row[-1] is not None
+        ]
+    except sqlite3.OperationalError as e:
+        if missing_table(e):
+            return []   # no arrivals rolled up yet
+        raise
+    finally:
+        connection.close()
+
+
+class MealRollups:
+    """
+    Pre-aggregated arrival counts per (date, meal, hour, camera, category, department)
+
+    add() increments an in-memory counter; a background thread folds the
+    pending increments into the rollups table every flush_interval seconds
+    with one upsert transaction. Categories: 'mess' (first entry in a
+    meal, i.e. headcount), 'reentry', 'college' (non-mess attempts) and
+    'outsider'.
+    """
+
+    def __init__(self, path='data/events.db', flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.stop_event = threading.Event()
+        self.flushed = 0
+
+        self.thread = threading.Thread(target=self.run, name='rollups', daemon=True)
+        self.thread.start()
+
+    def add(self, timestamp, meal, camera, category, department=None):
+        when = datetime.fromtimestamp(timestamp)
+        key = (when.date().isoformat(), meal or 'off_hours', when.hour, camera, category, department or '')
+        with self.lock:
+            self.pending[key] += 1
+
+    def flush(self, connection):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+        if not pending:
+            return
+        try:
+            with connection:
+                connection.executemany(UPSERT, [key + (count,) for key, count in pending.items()])
+        except Exception:
+            # Keep the counts for the next attempt
+            with self.lock:
+                for key, count in pending.items():
+                    self.pending[key] += count
+            raise
+        self.flushed += sum(pending.values())
+
+    def run(self):
+        connection = connect_rollups(self.path)
+        try:
+            while not self.stop_event.wait(self.flush_interval):
+                try:
+                    self.flush(connection)
+                except Exception as e:
+                    log.error("Error flushing rollups: %s", e, extra={'event': 'rollups_error'})
+            self.flush(connection)
+        finally:
+            connection.close()
+
+    def stop(self, timeout=10.0):
+        """Flush pending counts and stop"""
+        self.stop_event.set()
+        self.thread.join(timeout)
@@ -0,0 +1,236 @@
+"""Meal-schedule-aware throughput scheduling"""
+import os
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+
+from diagnostics import get_logger
+
+log = get_logger('scheduler')
+
+# Mess timings (24h clock); override with a JSON schedule file
+MEAL_WINDOWS = {
+    'breakfast': ('07:30', '09:30'),
+    'lunch': ('12:00', '14:30'),
+    'snacks': ('16:30', '18:00'),
+    'dinner': ('19:30', '22:00'),
+}
+
+# Settings applied in each mode:
+#   capture_fps     - frames read per second (loop is throttled to this)
+#   detect_interval - minimum seconds between recognitions of a camera
+#   workers         - detection/encoding workers in use (multi-camera)
+#   profile         - detection/encoding profile (see profiles.PROFILES)
+#
+# Meal mode ramps up throughput: every frame of every camera is recognised,
+# so it uses the cheapest per-frame profile ('rush') to keep up with the
+# queue. Watch mode recognises one frame a second and can afford the more
+# thorough 'balanced' profile for the occasional visitor.
+MODES = {
+    'meal': {
+        'capture_fps': 30,
+        'detect_interval': 0.0,
+        'workers': 3,
+        'profile': 'rush',
+    },
+    'watch': {
+        'capture_fps': 5,
+        'detect_interval': 1.0,
+        'workers': 1,
+        'profile': 'balanced',
+    },
+}
+
+
+def parse_clock(value):
+    """'HH:MM' -> minutes since midnight"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def meal_window_at(now, windows, before=0, after=0):
+    """
+    Name of the window containing datetime now, or None
+
+    windows maps name -> (start, end) in minutes since midnight; the
+    window is widened by before/after minutes.
+    """
+    minute = now.hour * 60 + now.minute
+    for name, (start, end) in windows.items():
+        if start - before <= minute < end + after:
+            return name
+    return None
+
+
+def load_schedule(path):
+    """Read windows/modes/ramp settings from a JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return {
+        'windows': {name: tuple(times) for name, times in config.get('windows', MEAL_WINDOWS).items()},
+        'modes': {**MODES, **config.get('modes', {})},
+        'ramp_minutes': config.get('ramp_minutes', 15),
+        'linger_minutes': config.get('linger_minutes', 10),
+    }
+
+
+class MealScheduler:
+    """
+    Chooses capture rate, detection cadence, worker count and profile
+    from the meal timetable
+
+    'meal' settings apply from ramp_minutes before a window opens until
+    linger_minutes after it closes; 'watch' (low power) applies the rest
+    of the day. override() forces a mode, optionally for a while.
+
+    CPU time is accounted to the current window (or to 'watch') and
+    appended to cpu_log whenever the window changes, so scheduled running
+    can be compared against always-on.
+    """
+
+    def __init__(self, windows=None, modes=None, ramp_minutes=15, linger_minutes=10,
+                 cpu_log='data/scheduler_cpu.csv'):
+        self.windows = {
+            name: (parse_clock(start), parse_clock(end))
+            for name, (start, end) in (windows or MEAL_WINDOWS).items()
+        }
+        self.modes = modes or MODES
+        self.ramp_minutes = ramp_minutes
+        self.linger_minutes = linger_minutes
+        self.cpu_log = cpu_log
+
+        self.override_mode = None
+        self.override_until = None
+
+        self.current = None         # (date, label, mode)
+        self.current_started = None
+        self.cpu_started = None
+        self.worker_cpu = 0.0       # CPU seconds reported by worker processes
+        self.frames = 0
+        self.last_check = 0.0
+        self.last_detection = {}
+        self.totals = {}            # label -> [wall, cpu, frames]
+
+    def window_at(self, now):
+        """Name of the meal window (including ramp/linger) containing now, or None"""
+        return meal_window_at(now, self.windows, self.ramp_minutes, self.linger_minutes)
+
+    def override(self, mode, minutes=None):
+        """Force 'meal' or 'watch' (for minutes, or until cleared); None returns to the timetable"""
+        if mode is not None and mode not in self.modes:
+            raise ValueError(f"Unknown mode '{mode}'. Choose from: {', '.join(self.modes)}")
+        self.override_mode = mode
+        self.override_until = datetime.now() + timedelta(minutes=minutes) if mode and minutes else None
+        self.last_check = 0.0  # apply on the next update()
+
+    def state_at(self, now):
+        """(label, mode) for a datetime, honouring any manual override"""
+        if self.override_mode and self.override_until and now >= self.override_until:
+            self.override_mode = None
+            self.override_until = None
+
+        window = self.window_at(now)
+        if self.override_mode:
+            return (window or 'manual', self.override_mode)
+        return (window or 'watch', 'meal' if window else 'watch')
+
+    def update(self, now=None):
+        """
+        Re-evaluate the schedule (at most once a second)
+
+        Returns the settings dict when the mode changed, otherwise None.
+        """
+        monotonic_now = time.monotonic()
+        if now is None and monotonic_now - self.last_check < 1.0:
+            return None
+        self.last_check = monotonic_now
+
+        now = now or datetime.now()
+        label, mode = self.state_at(now)
+        state = (now.date().isoformat(), label, mode)
+        if state == self.current:
+            return None
+
+        previous_mode = self.current[2] if self.current else None
+        self.close_period()
+        self.current = state
+        self.current_started = monotonic_now
+        self.cpu_started = time.process_time()
+        self.worker_cpu = 0.0
+        self.frames = 0
+
+        log.info("⏱ Scheduler: %s -> %s mode %s", label, mode, self.describe(mode),
+                 extra={'event': 'schedule_mode', 'window': label, 'mode': mode})
+        return self.settings() if mode != previous_mode else None
+
+    def settings(self):
+        mode = self.current[2] if self.current else 'watch'
+        return dict(self.modes[mode], mode=mode)
+
+    def describe(self, mode):
+        settings = self.modes[mode]
+        return (f"({settings['capture_fps']} fps, detect every {settings['detect_interval']}s, "
+                f"{settings['workers']} workers, profile {settings['profile']})")
+
+    def add_worker_cpu(self, seconds):
+        """CPU time spent in worker processes (not included in process_time())"""
+        self.worker_cpu += seconds
+
+    def count_frame(self):
+        self.frames += 1
+
+    def should_detect(self, key='cam0'):
+        """True if the camera is due for recognition under the current cadence"""
+        interval = self.settings()['detect_interval']
+        return time.monotonic() - self.last_detection.get(key, 0.0) >= interval
+
+    def mark_detected(self, key='cam0'):
+        self.last_detection[key] = time.monotonic()
+
+    def throttle(self, loop_started):
+        """Sleep so the capture loop runs at no more than the mode's capture_fps"""
+        fps = self.settings()['capture_fps']
+        if fps:
+            remaining = 1.0 / fps - (time.monotonic() - loop_started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def close_period(self):
+        """Account the finished period and append it to the CPU log"""
+        if self.current is None:
+            return
+
+        date, label, mode = self.current
+        wall = time.monotonic() - self.current_started
+        cpu = time.process_time() - self.cpu_started + self.worker_cpu
+
+        totals = self.totals.setdefault(label, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += self.frames
+
+        if self.cpu_log:
+            directory = os.path.dirname(self.cpu_log)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            new_file = not os.path.exists(self.cpu_log)
+            with open(self.cpu_log, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(['date', 'window', 'mode', 'wall_seconds', 'cpu_seconds', 'frames'])
+                writer.writerow([date, label, mode, f"{wall:.1f}", f"{cpu:.1f}", self.frames])
+
+        utilisation = 100 * cpu / wall if wall > 0 else 0.0
+        log.info("⏱ Scheduler: %s (%s) used %.1f s CPU over %.1f min (%.0f%%)", label, mode, cpu, wall / 60,
+                 utilisation, extra={'event': 'schedule_cpu', 'window': label, 'mode': mode,
+                                     'cpu_seconds': round(cpu, 1), 'wall_seconds': round(wall, 1)})
+
+    def stop(self):
+        """Close the running period; returns per-window totals"""
+        self.close_period()
+        self.current = None
+        return {
+            label: {'wall_seconds': wall, 'cpu_seconds': cpu, 'frames': frames}
+            for label, (wall, cpu, frames) in self.totals.items()
+        }
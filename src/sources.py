@@ -0,0 +1,238 @@
+"""Pluggable frame sources: webcam, video file, image directory, network stream"""
+import os
+import abc
+import time
+import cv2
+
+from capture import LowLatencyCapture, DualResolutionCapture
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+STREAM_PREFIXES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+
+class FrameSource(abc.ABC):
+    """
+    Common interface for everything the recognizer can read from
+
+    read() returns (ret, frame) like cv2.VideoCapture; last_evidence()
+    returns a capture.EvidenceFrame when frames are reduced copies of a
+    higher-resolution original, otherwise None. live is False for
+    sources whose frames should all be recognised (files read as fast as
+    the consumer goes) rather than skipped when recognition falls behind.
+    """
+
+    name = 'source'
+    live = True
+
+    def isOpened(self):
+        return True
+
+    @abc.abstractmethod
+    def read(self):
+        """(ret, frame) for the next frame; ret is False once the source has ended"""
+
+    def last_evidence(self):
+        return None
+
+    def stats(self):
+        return {'frames_delivered': getattr(self, 'frames_delivered', 0)}
+
+    def release(self):
+        pass
+
+
+class WebcamSource(FrameSource):
+    """Local camera through the low-latency (optionally dual-resolution) capture"""
+
+    def __init__(self, index=0, width=1280, height=720, reduction=None):
+        self.name = f"webcam:{index}"
+        self.reduction = reduction
+        if reduction:
+            self.capture = DualResolutionCapture(index, width=width, height=height, reduction=reduction)
+        else:
+            self.capture = LowLatencyCapture(index, width=width, height=height)
+
+    @property
+    def fps(self):
+        return self.capture.fps
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        return self.capture.read()
+
+    def last_evidence(self):
+        return self.capture.last_evidence() if self.reduction else None
+
+    def stats(self):
+        return self.capture.stats()
+
+    def release(self):
+        self.capture.release()
+
+
+class VideoFileSource(FrameSource):
+    """
+    Recorded footage
+
+    By default every frame is returned in order (deterministic, as fast as
+    the consumer reads). With realtime=True the file is paced at its own
+    frame rate and frames the consumer was too slow for are skipped, the
+    way a live camera or network stream behaves.
+    """
+
+    def __init__(self, path, realtime=False, loop=False):
+        self.name = f"file:{os.path.basename(path)}"
+        self.path = path
+        self.realtime = realtime
+        self.live = realtime
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        self.file_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.position = 0
+        self.start_time = None
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.fps = 0.0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read_next(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.position > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.position = 0
+            self.start_time = time.monotonic()
+            ret, frame = self.cap.read()
+        if ret:
+            self.position += 1
+        return ret, frame
+
+    def read(self):
+        if not self.realtime:
+            ret, frame = self.read_next()
+        else:
+            if self.start_time is None:
+                self.start_time = time.monotonic()
+
+            # Which frame would a live stream be showing right now?
+            due = int((time.monotonic() - self.start_time) * self.file_fps) + 1
+            if due <= self.position:
+                time.sleep((self.position + 1 - due) / self.file_fps)
+                due = self.position + 1
+
+            ret, frame = False, None
+            while self.position < due:
+                previous = self.position
+                ret, frame = self.read_next()
+                if not ret or self.position <= previous:
+                    break  # end of file, or looped back to the start
+                if self.position < due:
+                    self.frames_dropped += 1
+
+        if ret:
+            self.frames_delivered += 1
+            self.fps = self.file_fps
+        return ret, frame
+
+    def stats(self):
+        return {
+            'frames_delivered': self.frames_delivered,
+            'frames_dropped': self.frames_dropped,
+            'fps': self.file_fps,
+        }
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Directory of still images, read in filename order"""
+
+    live = False
+
+    def __init__(self, path, loop=False):
+        self.name = f"images:{os.path.basename(os.path.normpath(path))}"
+        self.path = path
+        self.loop = loop
+        self.files = sorted(
+            f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS)
+        ) if os.path.isdir(path) else []
+        self.position = 0
+        self.frames_delivered = 0
+        self.fps = 0.0
+        self.current_file = None
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def read(self):
+        while True:
+            if self.position >= len(self.files):
+                if not self.loop or not self.files:
+                    return False, None
+                self.position = 0
+
+            self.current_file = self.files[self.position]
+            self.position += 1
+            frame = cv2.imread(os.path.join(self.path, self.current_file))
+            if frame is not None:
+                self.frames_delivered += 1
+                return True, frame
+
+
+class StreamSource(FrameSource):
+    """
+    Network camera (RTSP/HTTP/...) through OpenCV/FFmpeg
+
+    FFmpeg queues decoded frames just like a webcam driver, so the same
+    grab()-until-fresh capture is used to avoid lagging behind live.
+    A local video file can stand in for the URL (stand_in=path); it is
+    then played back in real time with frame skipping, like a live feed.
+    """
+
+    def __init__(self, url, stand_in=None):
+        self.name = f"stream:{url}"
+        self.url = url
+        if stand_in:
+            self.capture = VideoFileSource(stand_in, realtime=True, loop=True)
+        else:
+            self.capture = LowLatencyCapture(url, width=None, height=None, fps=None, fourcc=None)
+
+    @property
+    def fps(self):
+        return self.capture.fps
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        return self.capture.read()
+
+    def stats(self):
+        return self.capture.stats()
+
+    def release(self):
+        self.capture.release()
+
+
+def open_source(spec, reduction=None, stand_in=None, realtime=False):
+    """
+    Build a FrameSource from a command-line style spec
+
+    - integer or digit string -> webcam index
+    - URL (rtsp://, http://, ...) -> network stream (stand_in: local file to play instead)
+    - directory -> images in filename order
+    - anything else -> video file
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return WebcamSource(int(spec), reduction=reduction)
+    if spec.lower().startswith(STREAM_PREFIXES):
+        return StreamSource(spec, stand_in=stand_in)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec)
+    return VideoFileSource(spec, realtime=realtime)
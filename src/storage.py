@@ -0,0 +1,281 @@
+"""Date/hour-sharded storage for detected face crops"""
+import os
+import json
+import shutil
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+
+from diagnostics import get_logger
+
+log = get_logger('storage')
+
+MANIFEST = 'manifest.jsonl'
+EMBEDDINGS = 'embeddings.f32'   # float32 rows, one per crop; manifest 'row' points into it
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+ENCODING_SIZE = 128
+
+
+def list_shards(category_dir):
+    """(date, hour) shards of a category directory, oldest first"""
+    shards = []
+    if not os.path.isdir(category_dir):
+        return shards
+    for date in sorted(os.listdir(category_dir)):
+        date_dir = os.path.join(category_dir, date)
+        if len(date) != 10 or not os.path.isdir(date_dir):
+            continue  # clusters.json, pre-sharding flat crops, ...
+        for hour in sorted(os.listdir(date_dir)):
+            if len(hour) == 2 and hour.isdigit():
+                shards.append((date, hour))
+    return shards
+
+
+def read_manifest(shard_dir):
+    """
+    Manifest entries of a shard; falls back to the directory listing
+
+    Crops with a tombstone (see record_removal) are left out.
+    """
+    manifest_path = os.path.join(shard_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        entries = []
+        removed = set()
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # partially written last line
+                if entry.get('removed'):
+                    removed.add(entry['file'])
+                else:
+                    entries.append(entry)
+        return [entry for entry in entries if entry['file'] not in removed] if removed else entries
+
+    entries = []
+    for entry in os.scandir(shard_dir):
+        if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            stat = entry.stat()
+            entries.append({
+                'file': entry.name,
+                'bytes': stat.st_size,
+                'saved': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds'),
+            })
+    return sorted(entries, key=lambda e: e['saved'])
+
+
+def record_removal(shard_dir, name, **metadata):
+    """
+    Append a tombstone for a crop moved or deleted from its shard
+
+    Manifests are append-only, so the crop's entry (and its sidecar row)
+    stay; readers drop entries that have a later {'file', 'removed'} line.
+    """
+    entry = {'file': name, 'removed': datetime.now().isoformat(timespec='seconds')}
+    entry.update(metadata)
+    with open(os.path.join(shard_dir, MANIFEST), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def next_row(shard_dir):
+    """Sidecar row for the next encoding: one past the last row any manifest entry points to"""
+    row = 0
+    manifest_path = os.path.join(shard_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('row') is not None:
+                    row = max(row, entry['row'] + 1)
+    return row
+
+
+def append_entry(shard_dir, entry, encoding=None, row=None):
+    """
+    Append a manifest entry, with the crop's encoding as sidecar row 'row'
+
+    The row (next_row() unless given) is written at its own offset and
+    the sidecar cut after it, so a torn earlier write never shifts the
+    rows that follow.
+    """
+    if encoding is not None:
+        entry['row'] = next_row(shard_dir) if row is None else row
+        embeddings_path = os.path.join(shard_dir, EMBEDDINGS)
+        with open(embeddings_path, 'r+b' if os.path.exists(embeddings_path) else 'wb') as f:
+            f.seek(entry['row'] * ENCODING_SIZE * 4)
+            f.write(np.asarray(encoding, dtype=np.float32).tobytes())
+            f.truncate()
+    with open(os.path.join(shard_dir, MANIFEST), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def read_embeddings(shard_dir):
+    """(manifest entries that have an encoding, float32 matrix indexed by entry['row'])"""
+    path = os.path.join(shard_dir, EMBEDDINGS)
+    if not os.path.exists(path):
+        return [], np.empty((0, ENCODING_SIZE), np.float32)
+    matrix = np.fromfile(path, dtype=np.float32)
+    matrix = matrix[:len(matrix) - len(matrix) % ENCODING_SIZE].reshape(-1, ENCODING_SIZE)
+    entries = [e for e in read_manifest(shard_dir) if e.get('row') is not None and e['row'] < len(matrix)]
+    return entries, matrix
+
+
+def recent_crops(category_dir, limit=28):
+    """Paths of the newest crops, newest first, reading only as many shards as needed"""
+    crops = []
+    for date, hour in reversed(list_shards(category_dir)):
+        shard_dir = os.path.join(category_dir, date, hour)
+        for entry in reversed(read_manifest(shard_dir)):
+            path = os.path.join(shard_dir, entry['file'])
+            if os.path.exists(path):
+                crops.append(path)
+                if len(crops) >= limit:
+                    return crops
+    return crops
+
+
+class ShardedCropStore:
+    """
+    Places crops in <root>/<category>/<YYYY-MM-DD>/<HH>/ and keeps them in bounds
+
+    Each shard has a manifest.jsonl (file, bytes, saved, plus any metadata
+    such as box/category/time) appended as crops are written, so listing
+    recent crops or sizing a shard never needs a scan of everything ever
+    saved. The crop's face encoding goes to the shard's embeddings.f32
+    sidecar (row number in the manifest entry). A background janitor deletes whole
+    shards older than max_age_days, then the oldest shards of a category
+    while it is over max_bytes. Shard sizes are cached until the shard's
+    manifest changes (a late crop, or a tombstone from another process).
+    """
+
+    def __init__(self, root='data/detected_faces', max_age_days=90, max_bytes=None,
+                 janitor_interval=600.0):
+        self.root = root
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes  # per category, None for no cap
+        self.janitor_interval = janitor_interval
+
+        self.lock = threading.Lock()
+        self.shard_bytes = {}       # shard dir -> (manifest size, bytes)
+        self.next_rows = {}         # shard dir -> next sidecar row
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # Counters
+        self.shards_removed = 0
+        self.bytes_removed = 0
+
+    def path_for(self, category, name, when=None):
+        """Path (without extension) for a new crop in the current shard"""
+        when = when or datetime.now()
+        shard_dir = os.path.join(self.root, category, when.strftime('%Y-%m-%d'), when.strftime('%H'))
+        return os.path.join(shard_dir, name)
+
+    def record(self, path, size, encoding=None, **metadata):
+        """Append a written crop to its shard manifest (CropWriter on_written callback)"""
+        shard_dir = os.path.dirname(path)
+        entry = {
+            'file': os.path.basename(path),
+            'bytes': int(size),
+            'saved': datetime.now().isoformat(timespec='seconds'),
+        }
+        entry.update(metadata)
+        with self.lock:
+            row = None
+            if encoding is not None:
+                row = self.next_rows.get(shard_dir)
+                if row is None:
+                    row = next_row(shard_dir)
+                self.next_rows[shard_dir] = row + 1
+            append_entry(shard_dir, entry, encoding, row)
+
+    def size_of(self, shard_dir):
+        manifest_path = os.path.join(shard_dir, MANIFEST)
+        manifest_size = os.path.getsize(manifest_path) if os.path.exists(manifest_path) else None
+        cached = self.shard_bytes.get(shard_dir)
+        if cached is not None and manifest_size is not None and cached[0] == manifest_size:
+            return cached[1]
+        size = sum(entry['bytes'] for entry in read_manifest(shard_dir))
+        if manifest_size is not None:
+            self.shard_bytes[shard_dir] = (manifest_size, size)
+        return size
+
+    def remove_shard(self, category_dir, date, hour, size):
+        shard_dir = os.path.join(category_dir, date, hour)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        self.shard_bytes.pop(shard_dir, None)
+        self.next_rows.pop(shard_dir, None)
+        self.shards_removed += 1
+        self.bytes_removed += size
+
+        date_dir = os.path.join(category_dir, date)
+        if os.path.isdir(date_dir) and not os.listdir(date_dir):
+            os.rmdir(date_dir)
+
+    def prune_category(self, category, now=None):
+        """Apply the age and size limits to one category; returns shards removed"""
+        now = now or datetime.now()
+        category_dir = os.path.join(self.root, category)
+        current = os.path.join(category_dir, now.strftime('%Y-%m-%d'), now.strftime('%H'))
+        cutoff = now - timedelta(days=self.max_age_days) if self.max_age_days else None
+
+        removed = 0
+        shards = []
+        for date, hour in list_shards(category_dir):
+            shard_dir = os.path.join(category_dir, date, hour)
+            size = self.size_of(shard_dir)
+            shard_end = datetime.strptime(f"{date} {hour}", '%Y-%m-%d %H') + timedelta(hours=1)
+            if cutoff is not None and shard_end <= cutoff:
+                with self.lock:
+                    self.remove_shard(category_dir, date, hour, size)
+                removed += 1
+            else:
+                shards.append((date, hour, shard_dir, size))
+
+        if self.max_bytes:
+            total = sum(size for _, _, _, size in shards)
+            # Oldest first, never the shard currently being written
+            for date, hour, shard_dir, size in shards:
+                if total <= self.max_bytes or shard_dir == current:
+                    break
+                with self.lock:
+                    self.remove_shard(category_dir, date, hour, size)
+                total -= size
+                removed += 1
+        return removed
+
+    def prune(self, now=None):
+        """One janitor pass over every category"""
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        for category in sorted(os.listdir(self.root)):
+            if os.path.isdir(os.path.join(self.root, category)):
+                removed += self.prune_category(category, now)
+        if removed:
+            log.info("🧹 Removed %d old crop shards (%.1f MB so far)", removed, self.bytes_removed / 1e6,
+                     extra={'event': 'crops_pruned', 'shards': removed, 'bytes_removed': self.bytes_removed})
+        return removed
+
+    def janitor_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.prune()
+            except Exception as e:
+                log.error("Error pruning crops: %s", e, extra={'event': 'prune_error'})
+            self.stop_event.wait(self.janitor_interval)
+
+    def start_janitor(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.janitor_loop, name='crop-janitor', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
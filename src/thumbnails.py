@@ -0,0 +1,203 @@
+"""Size-bounded, content-addressed thumbnails of saved crops for the dashboard"""
+import os
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from diagnostics import get_logger
+
+log = get_logger('thumbnails')
+
+SOURCES = 'sources.jsonl'  # {"name", "path"} per crop a thumbnail was made from
+
+
+class ThumbnailCache:
+    """
+    Thumbnails at most size px on their longer side, named by content hash
+
+    The name is a hash of the crop's bytes and the thumbnail settings, so
+    a thumbnail URL never changes meaning and can be cached forever.
+    prefetch() renders new crops on a small thread pool as the crop
+    index reports them. lookup() never reads or renders on the calling
+    thread: a crop without a thumbnail yet is queued for the pool. The
+    path -> name map keeps the max_names most recently used crops.
+    Each thumbnail's source crops are appended to sources.jsonl, so
+    prune() can delete thumbnails once their crops are gone.
+    """
+
+    def __init__(self, root, cache_dir, size=360, quality=80, workers=2, prefetch_limit=64, max_names=10000):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.size = size
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.settings = f"{size}:{quality}".encode()
+        self.prefetch_limit = prefetch_limit
+        self.max_names = max_names
+
+        self.lock = threading.Lock()
+        self.names = OrderedDict()  # crop path -> (mtime_ns, size, thumbnail name), least recently used first
+        self.pending = set()        # crop paths queued for rendering
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+
+        # Counters
+        self.generated = 0
+        self.failed = 0
+
+    def file_for(self, name):
+        return os.path.join(self.cache_dir, name[:2], name)
+
+    def known_name(self, path, stat):
+        """Name already rendered for this version of the crop, or None"""
+        with self.lock:
+            known = self.names.get(path)
+            if known is None or known[:2] != (stat.st_mtime_ns, stat.st_size):
+                return None
+            self.names.move_to_end(path)
+            return known[2]
+
+    def lookup(self, path):
+        """Thumbnail name if one is ready; otherwise None, and the crop is queued for rendering"""
+        try:
+            stat = os.stat(os.path.join(self.root, path))
+        except OSError:
+            return None
+        name = self.known_name(path, stat)
+        if name is None:
+            with self.lock:
+                queued = path in self.pending
+                self.pending.add(path)
+            if not queued:
+                self.executor.submit(self.safe_name_for, path)
+        return name
+
+    def name_for(self, path):
+        """Thumbnail file name for a crop (relative to root), rendering it if needed; None if unreadable"""
+        source = os.path.join(self.root, path)
+        try:
+            stat = os.stat(source)
+            name = self.known_name(path, stat)
+            if name is not None:
+                return name
+            with open(source, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None     # moved or pruned since it was listed
+        name = hashlib.sha1(data + self.settings).hexdigest()[:20] + '.jpg'
+        if not os.path.exists(self.file_for(name)) and not self.render(data, name):
+            return None
+        with self.lock:
+            known = self.names.get(path)
+            if known is None or known[2] != name:
+                with open(os.path.join(self.cache_dir, SOURCES), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'name': name, 'path': path}) + "\n")
+            self.names[path] = (stat.st_mtime_ns, stat.st_size, name)
+            self.names.move_to_end(path)
+            while len(self.names) > self.max_names:
+                self.names.popitem(last=False)
+        return name
+
+    def render(self, data, name):
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self.failed += 1
+            return False
+        height, width = image.shape[:2]
+        scale = self.size / max(height, width)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', image, self.params)
+        if not ok:
+            self.failed += 1
+            return False
+
+        target = self.file_for(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{threading.get_ident()}.part"
+        with open(temp_path, 'wb') as f:
+            f.write(encoded.tobytes())
+        os.replace(temp_path, target)
+        self.generated += 1
+        return True
+
+    def prefetch(self, crops):
+        """Render thumbnails for newly indexed crops (CropIndex listener); only the newest few"""
+        for crop in crops[-self.prefetch_limit:]:
+            self.executor.submit(self.safe_name_for, crop['path'])
+
+    def safe_name_for(self, path):
+        try:
+            return self.name_for(path)
+        except Exception as e:
+            log.error("Error rendering thumbnail for %s: %s", path, e, extra={'event': 'thumbnail_error', 'path': path})
+        finally:
+            with self.lock:
+                self.pending.discard(path)
+
+    def read_sources(self, offset=0):
+        """(name -> source crop paths recorded from offset on, end offset)"""
+        sources = {}
+        path = os.path.join(self.cache_dir, SOURCES)
+        if not os.path.exists(path):
+            return sources, offset
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # still being written
+                offset += len(line)
+                try:
+                    source = json.loads(line)
+                except ValueError:
+                    continue
+                sources.setdefault(source['name'], set()).add(source['path'])
+        return sources, offset
+
+    def prune(self, max_age_days=90):
+        """
+        Delete thumbnails whose source crops are all gone; returns files removed
+
+        Thumbnails without a recorded source (rendered before sources.jsonl
+        existed) are deleted after max_age_days, the crop retention default.
+        sources.jsonl is compacted to the thumbnails kept, and the pruned
+        names are dropped from the path -> name map.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        sources, offset = self.read_sources()
+        live = {name: paths for name, paths in sources.items()
+                if any(os.path.exists(os.path.join(self.root, path)) for path in paths)}
+        cutoff = time.time() - max_age_days * 86400
+        removed = set()
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name in live:
+                    continue
+                if entry.name in sources or entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed.add(entry.name)
+
+        with self.lock:
+            # Sources recorded while pruning are kept as they are
+            recent, _ = self.read_sources(offset)
+            for name, paths in recent.items():
+                live.setdefault(name, set()).update(paths)
+            temp_path = os.path.join(self.cache_dir, SOURCES + '.part')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for name, paths in live.items():
+                    for path in sorted(paths):
+                        f.write(json.dumps({'name': name, 'path': path}) + "\n")
+            os.replace(temp_path, os.path.join(self.cache_dir, SOURCES))
+            for path in [path for path, known in self.names.items() if known[2] in removed]:
+                del self.names[path]
+        return len(removed)
+
+    def stop(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,67 @@
+"""Background recognition workers"""
+import threading
+
+from diagnostics import get_logger
+
+log = get_logger('workers')
+
+
+class LatestFrameWorker:
+    """
+    Runs a handler on the newest frame in a background thread
+
+    The capture/display loop offer()s every frame; a frame is only taken
+    (and copied, since capture buffers get reused) when the worker is idle,
+    so recognition runs as fast as it can without building a backlog and
+    the display loop never waits for it.
+    """
+
+    def __init__(self, handler, name='recognition'):
+        self.handler = handler
+        self.name = name
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending = None
+        self.busy = False
+        self.stopped = False
+        self.processed = 0
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def offer(self, frame, *args):
+        """Hand over frame if the worker is idle; returns True if it was taken"""
+        with self.lock:
+            if self.busy or self.pending is not None:
+                return False
+            self.pending = (frame.copy(),) + args
+            self.busy = True
+        self.wakeup.set()
+        return True
+
+    def run(self):
+        while not self.stopped:
+            if not self.wakeup.wait(0.1):
+                continue
+            self.wakeup.clear()
+
+            with self.lock:
+                item, self.pending = self.pending, None
+            if item is None:
+                continue
+
+            try:
+                self.handler(*item)
+                self.processed += 1
+            except Exception as e:
+                log.error("Error in %s worker: %s", self.name, e, extra={'event': 'worker_error', 'worker': self.name})
+            finally:
+                with self.lock:
+                    self.busy = False
+
+    def stop(self, timeout=5.0):
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join(timeout)
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import argparse
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from profiles import PROFILES, get_profile, locate_faces, encode_faces
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def load_frames(path, max_frames):
+    """Load BGR frames from a video file or a directory of images"""
+    frames = []
+
+    if os.path.isdir(path):
+        for file in sorted(os.listdir(path)):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(path, file))
+                if frame is not None:
+                    frames.append(frame)
+            if len(frames) >= max_frames:
+                break
+    else:
+        capture = cv2.VideoCapture(path)
+        while len(frames) < max_frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame)
+        capture.release()
+
+    return frames
+
+
+def benchmark_profile(name, frames):
+    """Time detection and encoding for one profile over all frames"""
+    profile = get_profile(name)
+    scale = profile['scale']
+    detect_time = 0.0
+    encode_time = 0.0
+    faces = 0
+
+    for frame in frames:
+        if scale != 1.0:
+            frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        start = time.perf_counter()
+        face_locations = locate_faces(rgb_frame, profile)
+        detect_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        encode_faces(rgb_frame, face_locations, profile)
+        encode_time += time.perf_counter() - start
+
+        faces += len(face_locations)
+
+    return {
+        'frames': len(frames),
+        'faces': faces,
+        'detect_ms_per_frame': 1000 * detect_time / len(frames),
+        'encode_ms_per_face': 1000 * encode_time / faces if faces else 0.0,
+        'total_ms_per_face': 1000 * (detect_time + encode_time) / faces if faces else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-face latency of each recognition profile")
+    parser.add_argument('source', help="Recorded video file or directory of frames")
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES),
+                        help="Profiles to benchmark (default: all)")
+    parser.add_argument('--max-frames', type=int, default=100)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.max_frames)
+    if not frames:
+        print(f"✗ No frames loaded from {args.source}")
+        return
+
+    print("=" * 70)
+    print(f"PROFILE BENCHMARK - {len(frames)} frames from {args.source}")
+    print("=" * 70)
+    print(f"{'profile':10s} {'faces':>6s} {'detect ms/frame':>16s} {'encode ms/face':>15s} {'total ms/face':>14s}")
+
+    for name in args.profiles:
+        result = benchmark_profile(name, frames)
+        print(
+            f"{name:10s} {result['faces']:6d} {result['detect_ms_per_frame']:16.1f} "
+            f"{result['encode_ms_per_face']:15.1f} {result['total_ms_per_face']:14.1f}"
+        )
+
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import tracemalloc
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from buffers import FrameBufferPool
+
+FRAMES = 100
+# A single 1280x720 BGR frame is ~2.7 MB; steady state should stay far below one frame
+ALLOWED_BYTES = 64 * 1024
+
+
+def make_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(720, 1280, 3), dtype=np.uint8)
+
+
+def test_prepare_rgb_matches_reference():
+    pool = FrameBufferPool()
+    frame = make_frame()
+
+    expected = cv2.cvtColor(cv2.resize(frame, (640, 360)), cv2.COLOR_BGR2RGB)
+    result = pool.prepare_rgb(frame, 0.5)
+
+    assert result.shape == (360, 640, 3)
+    assert result.flags['C_CONTIGUOUS']
+    assert np.array_equal(result, expected)
+
+
+def test_display_copy_leaves_capture_frame_untouched():
+    pool = FrameBufferPool()
+    frame = make_frame()
+    original = frame.copy()
+
+    display = pool.display_copy(frame)
+    cv2.rectangle(display, (10, 10), (200, 200), (0, 0, 255), cv2.FILLED)
+
+    assert np.array_equal(frame, original)
+
+
+def test_steady_state_allocations_near_zero():
+    pool = FrameBufferPool()
+    frames = [make_frame(seed) for seed in range(3)]
+
+    # Warm up: first frame allocates the pooled buffers
+    for frame in frames:
+        pool.prepare_rgb(frame, 0.5)
+        pool.display_copy(frame)
+    allocations_after_warmup = pool.allocations
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        for i in range(FRAMES):
+            frame = frames[i % len(frames)]
+            pool.prepare_rgb(frame, 0.5)
+            pool.display_copy(frame)
+
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    print(f"  Peak growth over {FRAMES} frames: {peak - baseline} bytes")
+    print(f"  Retained growth: {current - baseline} bytes")
+
+    assert pool.allocations == allocations_after_warmup
+    assert peak - baseline < ALLOWED_BYTES
+    assert current - baseline < ALLOWED_BYTES
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("FRAME BUFFER POOL TEST")
+    print("=" * 50)
+
+    test_prepare_rgb_matches_reference()
+    print("✓ Pooled resize/RGB conversion matches cv2 reference")
+
+    test_display_copy_leaves_capture_frame_untouched()
+    print("✓ Overlay drawing leaves the capture frame untouched")
+
+    test_steady_state_allocations_near_zero()
+    print("✓ Steady-state allocations per frame near zero")
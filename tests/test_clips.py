@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from clips import ClipRecorder, ClipWriter
+
+
+class CollectingWriter:
+    def __init__(self):
+        self.clips = []
+
+    def submit(self, path, frames):
+        self.clips.append((path, frames))
+        return True
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+def test_ring_is_bounded_by_age_and_bytes():
+    recorder = ClipRecorder('cam0', CollectingWriter(), pre_seconds=2.0)
+    now = time.time()
+    for i in range(50):
+        recorder.encode(frame(i), now - 5 + i * 0.1)
+    stats = recorder.stats()
+    assert stats['ring_frames'] == 21      # the last two seconds at 10 fps
+    recorder.stop()
+
+    small = ClipRecorder('cam0', CollectingWriter(), pre_seconds=60.0, max_bytes=2000)
+    for i in range(50):
+        small.encode(frame(i), now + i * 0.1)
+    assert small.stats()['ring_bytes'] <= 2000
+    small.stop()
+
+
+def test_trigger_writes_pre_and_post_roll():
+    writer = CollectingWriter()
+    recorder = ClipRecorder('cam0', writer, pre_seconds=1.0, post_seconds=0.5)
+    now = time.time()
+    for i in range(10):
+        recorder.encode(frame(i), now - 1 + i * 0.1)
+
+    path = recorder.trigger('O00001')
+    assert 'cam0_O00001_' in path
+    assert len(os.path.basename(path)) == len('cam0_O00001_HHMMSSmmm.avi')
+    for i in range(6):
+        recorder.encode(frame(100 + i), now + 0.1 + i * 0.1)
+    recorder.stop()
+
+    assert len(writer.clips) == 1
+    _, frames = writer.clips[0]
+    assert len(frames) == 16        # 10 pre-roll + post-roll up to the first frame past 0.5 s
+    assert frames[-1][0] >= now + 0.5
+
+
+def test_clip_writer_produces_video():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = ClipWriter()
+        frames = [(i * 0.1, cv2.imencode('.jpg', frame(i * 20))[1].tobytes()) for i in range(5)]
+        path = os.path.join(directory, 'clip.avi')
+        writer.submit(path, frames)
+        writer.stop()
+
+        capture = cv2.VideoCapture(path)
+        assert capture.get(cv2.CAP_PROP_FRAME_COUNT) == 5
+        capture.release()
+
+
+def test_clips_with_the_same_name_are_kept():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = ClipWriter()
+        path = os.path.join(directory, 'cam0_O00001_120000000.avi')
+        for value in (20, 200):
+            writer.submit(path, [(i * 0.1, cv2.imencode('.jpg', frame(value))[1].tobytes()) for i in range(3)])
+        writer.stop()
+        assert sorted(os.listdir(directory)) == ['cam0_O00001_120000000.avi', 'cam0_O00001_120000000_2.avi']
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("CLIP RECORDER TEST")
+    print("=" * 50)
+
+    test_ring_is_bounded_by_age_and_bytes()
+    print("✓ Bounded ring")
+
+    test_trigger_writes_pre_and_post_roll()
+    print("✓ Pre-roll + post-roll")
+
+    test_clip_writer_produces_video()
+    print("✓ Clip file written")
+
+    test_clips_with_the_same_name_are_kept()
+    print("✓ Clips with the same name kept")
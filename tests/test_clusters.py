@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from clusters import OutsiderClusters
+
+
+def person(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+def test_sightings_of_same_person_share_a_cluster():
+    clusters = OutsiderClusters(path=None)
+    first = clusters.assign(person(1))
+    again = clusters.assign(person(1) + 0.005)
+    other = clusters.assign(person(2))
+
+    assert first == again
+    assert other != first
+    assert clusters.info(first)['count'] == 2
+
+
+def test_merge_keeps_older_id_and_aliases_newer():
+    clusters = OutsiderClusters(path=None, tolerance=0.2, merge_tolerance=0.4)
+    a = clusters.assign(person(1))
+    b = clusters.assign(person(1) + 0.02)   # 0.23 away: a second cluster
+    assert a != b
+    clusters.add_crop(b, 'outsider_b.jpg')
+
+    assert clusters.merge() == 1
+    assert clusters.resolve(b) == a
+    info = clusters.info(b)
+    assert info['count'] == 2
+    assert info['crops'][-1]['path'] == 'outsider_b.jpg'
+
+
+def test_memory_bounded_and_ids_persist():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'clusters.json')
+        clusters = OutsiderClusters(path=path, max_clusters=5)
+        ids = [clusters.assign(person(i)) for i in range(8)]
+        assert len(clusters.summary()) == 5
+        clusters.maintain(force=True)
+
+        reloaded = OutsiderClusters(path=path, max_clusters=5)
+        assert reloaded.assign(person(7)) == ids[7]
+        assert reloaded.assign(person(100)) not in ids
+
+
+def test_ids_compare_as_numbers_and_aliases_are_capped():
+    clusters = OutsiderClusters(path=None, tolerance=0.2, merge_tolerance=0.4, max_aliases=2)
+    clusters.next_id = 99999
+    older = clusters.assign(person(1))          # O99999
+    newer = clusters.assign(person(1) + 0.02)   # O100000 sorts before it as a string
+    assert clusters.merge() == 1
+    assert clusters.resolve(newer) == older
+
+    for seed in (2, 3):
+        clusters.assign(person(seed))
+        clusters.assign(person(seed) + 0.02)
+        clusters.merge()
+    assert len(clusters.aliases) == 2
+    assert newer not in clusters.aliases        # oldest alias dropped first
+
+
+def test_background_maintenance_saves_the_index():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'clusters.json')
+        clusters = OutsiderClusters(path=path, maintain_interval=0.05).start()
+        clusters.assign(person(1))
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        clusters.stop()
+        assert os.path.exists(path)
+        assert not clusters.thread.is_alive()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("OUTSIDER CLUSTER TEST")
+    print("=" * 50)
+
+    test_sightings_of_same_person_share_a_cluster()
+    print("✓ Same person, same cluster")
+
+    test_merge_keeps_older_id_and_aliases_newer()
+    print("✓ Merge with alias")
+
+    test_memory_bounded_and_ids_persist()
+    print("✓ Bounded memory and persistent ids")
+
+    test_ids_compare_as_numbers_and_aliases_are_capped()
+    print("✓ Numeric id order and bounded aliases")
+
+    test_background_maintenance_saves_the_index()
+    print("✓ Background merge and save")
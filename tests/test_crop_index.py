@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from crop_index import CropIndex
+from storage import ShardedCropStore, record_removal
+
+
+def save(store, category, name, when):
+    path = store.path_for(category, name, when) + '.jpg'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 10)
+    store.record(path, 10, time=when.timestamp(), camera='cam0')
+    return path
+
+
+def names(crops):
+    return [os.path.basename(crop['path']) for crop in crops]
+
+
+def test_index_follows_manifests_incrementally():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        for i in range(3):
+            save(store, 'outsiders', f"crop_{i}", start + timedelta(minutes=i))
+
+        index = CropIndex(root)
+        assert index.scan() == 3
+        assert names(index.latest('outsiders', 2)) == ['crop_2.jpg', 'crop_1.jpg']
+        assert index.latest('outsiders', 1)[0]['camera'] == 'cam0'
+
+        # Only appended lines are read on the next pass
+        save(store, 'outsiders', 'crop_3', start + timedelta(hours=1))
+        assert index.scan() == 1
+        assert index.scan() == 0
+        assert names(index.latest('outsiders', 1)) == ['crop_3.jpg']
+
+
+def test_removed_crops_and_shards_leave_the_index():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        old = save(store, 'outsiders', 'old', start)
+        moved = save(store, 'outsiders', 'moved', start + timedelta(hours=1))
+        save(store, 'outsiders', 'kept', start + timedelta(hours=1, minutes=1))
+
+        index = CropIndex(root)
+        index.scan()
+        shutil.rmtree(os.path.dirname(old))
+        os.remove(moved)
+        index.scan()
+
+        assert names(index.latest('outsiders')) == ['kept.jpg']
+        assert index.count('outsiders') == 1
+
+
+def test_cursor_and_index_survive_a_restart():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        save(store, 'college_non_mess', 'first', start)
+        state_path = os.path.join(root, 'index.json')
+
+        index = CropIndex(root, state_path=state_path)
+        index.scan()
+        index.stop()
+
+        save(store, 'college_non_mess', 'second', start + timedelta(minutes=5))
+        restarted = CropIndex(root, state_path=state_path)
+        assert restarted.scan() == 1
+        assert names(restarted.latest('college_non_mess')) == ['second.jpg', 'first.jpg']
+
+
+def test_flat_crops_from_before_sharding_are_indexed():
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'outsiders'))
+        with open(os.path.join(root, 'outsiders', 'outsider_legacy.jpg'), 'wb') as f:
+            f.write(b'\0')
+
+        index = CropIndex(root)
+        assert index.scan() == 1
+        assert index.scan() == 0
+        assert index.latest('outsiders')[0]['path'] == 'outsiders/outsider_legacy.jpg'
+
+
+def test_waiting_viewers_get_new_crops():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        save(store, 'outsiders', 'before', start)
+        index = CropIndex(root)
+        index.scan()
+        after = index.sequence
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(index.wait_for_crops(after, timeout=5.0)))
+        waiter.start()
+        save(store, 'outsiders', 'new', start + timedelta(minutes=1))
+        index.scan()
+        waiter.join()
+
+        crops, sequence = results[0]
+        assert [os.path.basename(c['path']) for c in crops] == ['new.jpg']
+        assert crops[0]['category'] == 'outsiders'
+        assert sequence == after + 1
+        assert index.wait_for_crops(sequence, timeout=0.01) == ([], sequence)
+
+
+def test_pages_follow_the_cursor():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        for i in range(5):
+            save(store, 'outsiders', f"crop_{i}", start + timedelta(minutes=30 * i))
+        index = CropIndex(root)
+        index.scan()
+
+        first, cursor = index.page('outsiders', limit=2)
+        second, cursor = index.page('outsiders', limit=2, before=cursor)
+        last, cursor = index.page('outsiders', limit=2, before=cursor)
+        assert names(first) + names(second) + names(last) == [f"crop_{i}.jpg" for i in (4, 3, 2, 1, 0)]
+        assert cursor is None
+
+        recent, cursor = index.page('outsiders', limit=10, since=(start + timedelta(minutes=60)).timestamp())
+        assert names(recent) == ['crop_4.jpg', 'crop_3.jpg', 'crop_2.jpg']
+        assert cursor is None
+
+
+
+def test_tombstones_remove_crops_from_closed_shards():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        moved = save(store, 'outsiders', 'moved', start)
+        for hour in (1, 2, 3):
+            save(store, 'outsiders', f"later_{hour}", start + timedelta(hours=hour))
+
+        index = CropIndex(root, sweep_interval=3600)
+        index.scan()
+        record_removal(os.path.dirname(moved), 'moved.jpg', to='reidentified/x.jpg')
+        index.scan()
+        assert index.count('outsiders') == 4      # closed shard: read on the next sweep
+
+        index.last_sweep -= 3600
+        index.scan()
+        assert index.count('outsiders') == 3
+        assert 'moved.jpg' not in names(index.latest('outsiders'))
+
+
+def test_only_cursors_are_persisted():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        for i in range(3):
+            save(store, 'outsiders', f"crop_{i}", start + timedelta(hours=i))
+        record_removal(os.path.dirname(store.path_for('outsiders', 'crop_0', start)), 'crop_0.jpg')
+        with open(os.path.join(root, 'outsiders', 'outsider_legacy.jpg'), 'wb') as f:
+            f.write(b'\0')
+        state_path = os.path.join(root, 'index.json')
+
+        index = CropIndex(root, state_path=state_path)
+        index.scan()
+        index.stop()
+        with open(state_path) as f:
+            state = json.load(f)
+        assert list(state['categories']['outsiders']) == ['cursors']
+
+        restarted = CropIndex(root, state_path=state_path)
+        assert restarted.scan() == 1     # only the legacy folder is listed again
+        assert names(restarted.latest('outsiders')) == ['outsider_legacy.jpg', 'crop_2.jpg', 'crop_1.jpg']
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("CROP INDEX TEST")
+    print("=" * 50)
+    test_index_follows_manifests_incrementally()
+    print("✓ Incremental manifest cursors")
+    test_removed_crops_and_shards_leave_the_index()
+    print("✓ Removed crops and shards dropped")
+    test_cursor_and_index_survive_a_restart()
+    print("✓ Persisted cursor and index")
+    test_flat_crops_from_before_sharding_are_indexed()
+    print("✓ Pre-sharding crops indexed")
+    test_waiting_viewers_get_new_crops()
+    print("✓ Live viewers woken by new crops")
+    test_pages_follow_the_cursor()
+    print("✓ Cursor pagination")
+    test_tombstones_remove_crops_from_closed_shards()
+    print("✓ Tombstones in closed shards")
+    test_only_cursors_are_persisted()
+    print("✓ Index rebuilt from persisted cursors")
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from crop_writer import CropWriter
+
+
+def crop(value):
+    return np.full((40, 32, 3), value, np.uint8)
+
+
+def test_crops_are_written_in_background():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = CropWriter('png')
+        path = writer.submit(os.path.join(directory, 'outsiders', 'outsider_1'), crop(10))
+        writer.stop()
+
+        assert path.endswith('outsider_1.png')
+        assert os.path.getsize(path) > 0
+        stats = writer.stats()
+        assert stats['written'] == 1 and stats['dropped'] == 0 and stats['queue_depth'] == 0
+
+
+def test_full_queue_drops_oldest():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = CropWriter('jpg', max_queue=2)
+        release = threading.Event()
+        original_write = writer.write
+
+        def slow_write(*args):
+            release.wait(5)
+            original_write(*args)
+        writer.write = slow_write
+
+        paths = [writer.submit(os.path.join(directory, f"crop_{i}"), crop(i)) for i in range(5)]
+        release.set()
+        writer.stop()
+
+        stats = writer.stats()
+        assert stats['submitted'] == 5
+        assert stats['written'] + stats['dropped'] == 5
+        assert stats['dropped'] >= 2
+        # The newest crop always survives
+        assert os.path.exists(paths[-1])
+
+
+def test_failing_callback_does_not_stop_the_writer():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = CropWriter('png')
+
+        def full_disk(path, size):
+            raise OSError(28, "No space left on device")
+
+        writer.submit(os.path.join(directory, 'crop_0'), crop(0), on_written=full_disk)
+        later = [writer.submit(os.path.join(directory, f"crop_{i}"), crop(i)) for i in range(1, 4)]
+        writer.stop()
+
+        assert all(os.path.exists(path) for path in later)
+        stats = writer.stats()
+        assert stats['written'] == 4 and stats['failed'] == 1
+        assert not writer.thread.is_alive()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("CROP WRITER TEST")
+    print("=" * 50)
+
+    test_crops_are_written_in_background()
+    print("✓ Background write")
+
+    test_full_queue_drops_oldest()
+    print("✓ Drop-oldest when queue is full")
+
+    test_failing_callback_does_not_stop_the_writer()
+    print("✓ Writer survives a failing callback")
@@ -0,0 +1,60 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from dedup import SaveDeduplicator
+
+
+def encoding(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+def test_student_saved_once_per_cooldown():
+    dedup = SaveDeduplicator(cooldown=60)
+
+    assert dedup.should_save('21CS001', now=0)
+    assert not dedup.should_save('21CS001', now=30)
+    assert dedup.should_save('21CS002', now=30)
+    assert dedup.should_save('21CS001', now=61)
+
+
+def test_outsider_matched_by_encoding():
+    dedup = SaveDeduplicator(cooldown=60, outsider_tolerance=0.5)
+    person = encoding(1)
+
+    assert dedup.should_save(encoding=person, now=0)
+    assert not dedup.should_save(encoding=person + 0.01, now=5)
+    assert dedup.should_save(encoding=encoding(2), now=5)
+    assert dedup.stats()['suppressed'] == 1
+
+
+def test_memory_is_bounded():
+    dedup = SaveDeduplicator(cooldown=1000, max_entries=10)
+    for i in range(50):
+        dedup.should_save(f"roll{i}", now=i)
+        dedup.should_save(encoding=encoding(i), now=i)
+
+    stats = dedup.stats()
+    assert stats['remembered_students'] == 10
+    assert stats['remembered_outsiders'] == 10
+
+    # Old entries also expire with time
+    dedup.should_save('roll_new', now=5000)
+    assert dedup.stats()['remembered_students'] == 1
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("SAVE DEDUP TEST")
+    print("=" * 50)
+
+    test_student_saved_once_per_cooldown()
+    print("✓ Student cooldown by roll number")
+
+    test_outsider_matched_by_encoding()
+    print("✓ Outsider matched by encoding")
+
+    test_memory_is_bounded()
+    print("✓ Bounded memory")
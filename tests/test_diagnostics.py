@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from diagnostics import LogPipeline, get_logger
+
+
+def test_records_are_written_as_json_lines():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'log.jsonl')
+        logs = LogPipeline(json_path=path, console=False)
+        get_logger('test').info("Saved %s face", 'outsider',
+                                extra={'event': 'face_saved', 'camera': 'cam0', 'box': [1, 2, 3, 4]})
+        logs.stop()
+
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 1
+        assert records[0]['message'] == "Saved outsider face"
+        assert records[0]['event'] == 'face_saved'
+        assert records[0]['camera'] == 'cam0'
+        assert records[0]['box'] == [1, 2, 3, 4]
+        assert records[0]['logger'] == 'messvision.test'
+
+
+def test_repeated_events_are_rate_limited():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'log.jsonl')
+        logs = LogPipeline(json_path=path, console=False, rate_interval=60.0, rate_burst=3)
+        log = get_logger('test')
+        for i in range(50):
+            log.error("Error during face detection: %d", i, extra={'event': 'detection_error'})
+        log.info("other", extra={'event': 'face_saved'})
+        logs.stop()
+
+        with open(path, encoding='utf-8') as f:
+            events = [json.loads(line)['event'] for line in f]
+        assert events == ['detection_error'] * 3 + ['face_saved']
+        assert logs.stats()['suppressed'] == 47
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("DIAGNOSTICS TEST")
+    print("=" * 50)
+    test_records_are_written_as_json_lines()
+    print("✓ JSON lines output")
+    test_repeated_events_are_rate_limited()
+    print("✓ Per-event rate limiting")
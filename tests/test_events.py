@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from events import EventLog, iter_events
+from rollups import query_rollups
+
+
+def test_events_are_batched_into_sqlite():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.db')
+        log = EventLog(path, batch_size=100, flush_interval=0.05)
+        for i in range(250):
+            log.log('cam0', 'mess', roll_no=f"21CS{i % 5:03d}", name='Student', distance=0.4,
+                    box=(1, 2, 3, 4), timestamp=1000.0 + i)
+        log.log('cam1', 'outsider', distance=0.8, cluster='O00001', timestamp=2000.0)
+        log.stop()
+
+        stats = log.stats()
+        assert stats['written'] == 251 and stats['dropped'] == 0
+        assert stats['batches'] < 251
+
+        connection = sqlite3.connect(path)
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        indexes = {row[1] for row in connection.execute("PRAGMA index_list(events)")}
+        assert {'idx_events_roll_no_time', 'idx_events_category_time'} <= indexes
+        connection.close()
+
+
+def test_iter_events_filters():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.db')
+        log = EventLog(path, flush_interval=0.05)
+        now = time.time()
+        log.log('cam0', 'mess', roll_no='21CS001', timestamp=now - 60)
+        log.log('cam0', 'mess', roll_no='21CS001', timestamp=now)
+        log.log('cam0', 'outsider', box=(10, 20, 30, 40), timestamp=now)
+        log.stop()
+
+        assert len(list(iter_events(path, roll_no='21CS001'))) == 2
+        recent = list(iter_events(path, since=now - 1))
+        assert len(recent) == 2
+        outsiders = list(iter_events(path, category='outsider', batch_size=1))
+        assert outsiders[0]['box_right'] == 30 and outsiders[0]['roll_no'] is None
+
+
+def test_readers_never_write():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.db')
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, time REAL, camera TEXT, roll_no TEXT, "
+                           "category TEXT, name TEXT, distance REAL, box_left INTEGER, box_top INTEGER, "
+                           "box_right INTEGER, box_bottom INTEGER, cluster TEXT)")
+        connection.execute("INSERT INTO events (time, category) VALUES (1000.0, 'mess')")
+        connection.commit()
+        connection.close()
+
+        assert len(list(iter_events(path))) == 1
+        assert query_rollups(path, '2025-03-03') == []
+
+        connection = sqlite3.connect(path)
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master")}
+        assert tables == {'events'}
+        connection.close()
+
+        missing = os.path.join(directory, 'reports', 'missing.db')
+        try:
+            list(iter_events(missing))
+        except sqlite3.OperationalError:
+            pass
+        assert not os.path.exists(os.path.dirname(missing))
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("EVENT LOG TEST")
+    print("=" * 50)
+
+    test_events_are_batched_into_sqlite()
+    print("✓ Batched WAL writes with indexes")
+
+    test_iter_events_filters()
+    print("✓ Filtered reads")
+
+    test_readers_never_write()
+    print("✓ Read-only reports")
@@ -0,0 +1,72 @@
+import os
+import sys
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from events import EventLog, connect, select_events
+from export import CROP_FIELDS, EVENT_FIELDS, export_crops, export_events, stream_rows
+from storage import ShardedCropStore
+
+
+def test_events_export_streams_the_date_range_as_csv():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.db')
+        log = EventLog(path, flush_interval=0.05)
+        for day in (1, 2, 3):
+            for i in range(5):
+                log.log('cam0', 'mess', roll_no=f"R{i}", name=f"Student {i}",
+                        timestamp=datetime(2025, 3, day, 12, i).timestamp())
+        log.stop()
+
+        chunks = list(stream_rows(export_events(path, '2025-03-02', '2025-03-03', batch_size=3),
+                                  EVENT_FIELDS, 'csv', chunk_rows=4))
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        assert len(chunks) == 3      # 10 rows written in chunks of 4
+        assert len(rows) == 10
+        assert rows[0]['datetime'] == '2025-03-02T12:00:00'
+        assert rows[-1]['roll_no'] == 'R4'
+
+
+def test_date_range_export_uses_the_time_index():
+    with tempfile.TemporaryDirectory() as directory:
+        connection = connect(os.path.join(directory, 'events.db'))
+        sql, params = select_events(since=0.0, until=86400.0)
+        plan = ' '.join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        connection.close()
+        assert 'idx_events_time' in plan
+        assert 'SCAN' not in plan
+        assert 'TEMP B-TREE' not in plan
+
+
+def test_crops_export_reads_manifests_as_ndjson():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        for day in (1, 2):
+            when = datetime(2025, 3, day, 9)
+            path = store.path_for('outsiders', f"outsider_{day}", when) + '.jpg'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            store.record(path, 10, time=when.timestamp(), camera='cam1', cluster='O00001', box=[1, 2, 3, 4])
+
+        text = ''.join(stream_rows(export_crops(root, '2025-03-02'), CROP_FIELDS, 'ndjson'))
+        rows = [json.loads(line) for line in text.splitlines()]
+        assert len(rows) == 1
+        assert rows[0]['path'] == 'outsiders/2025-03-02/09/outsider_2.jpg'
+        assert rows[0]['box_right'] == 3
+        assert rows[0]['cluster'] == 'O00001'
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("EXPORT TEST")
+    print("=" * 50)
+    test_events_export_streams_the_date_range_as_csv()
+    print("✓ Batched CSV event export")
+    test_date_range_export_uses_the_time_index()
+    print("✓ Date-range export uses the time index")
+    test_crops_export_reads_manifests_as_ndjson()
+    print("✓ NDJSON crop metadata export")
@@ -0,0 +1,128 @@
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from face_search import FaceIndex
+from storage import ShardedCropStore, read_embeddings, record_removal
+
+
+def save(store, category, name, when, encoding, **metadata):
+    path = store.path_for(category, name, when) + '.jpg'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 10)
+    store.record(path, 10, encoding=encoding, **metadata)
+    return path
+
+
+def face(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128).astype(np.float32)
+
+
+def test_record_appends_sidecar_rows():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        when = datetime(2025, 3, 1, 12)
+        save(store, 'outsiders', 'a', when, face(1), camera='cam0', box=[1, 2, 3, 4])
+        save(store, 'outsiders', 'b', when, face(2), camera='cam1')
+
+        entries, matrix = read_embeddings(os.path.dirname(store.path_for('outsiders', 'a', when)))
+        assert [e['row'] for e in entries] == [0, 1]
+        assert entries[0]['box'] == [1, 2, 3, 4]
+        assert np.allclose(matrix[1], face(2))
+
+
+def test_search_finds_same_face_across_shards():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        person = face(1)
+        for i in range(3):
+            save(store, 'outsiders', f"seen_{i}", start + timedelta(hours=i), person + 0.01 * i)
+        save(store, 'college_non_mess', 'other', start, face(2))
+
+        index = FaceIndex(root)
+        assert index.refresh() == 4
+        results = index.search(person, tolerance=0.3)
+        assert [os.path.basename(r['path']) for r in results] == ['seen_0.jpg', 'seen_1.jpg', 'seen_2.jpg']
+        assert results[0]['category'] == 'outsiders'
+
+        # New crops are picked up incrementally; moved crops are skipped
+        save(store, 'outsiders', 'seen_3', start + timedelta(hours=5), person)
+        os.remove(results[0]['path'])
+        assert index.refresh() == 5
+        names = [os.path.basename(r['path']) for r in index.search(person, tolerance=0.3)]
+        assert names == ['seen_3.jpg', 'seen_1.jpg', 'seen_2.jpg']
+
+
+def test_concurrent_refresh_and_search():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        person = face(1)
+        index = FaceIndex(root)
+        errors = []
+
+        def search_loop():
+            try:
+                for _ in range(200):
+                    for result in index.search(person, tolerance=0.3):
+                        assert os.path.basename(result['path']).startswith('seen_')
+            except Exception as e:
+                errors.append(e)
+
+        searchers = [threading.Thread(target=search_loop) for _ in range(3)]
+        for thread in searchers:
+            thread.start()
+        for i in range(20):
+            save(store, 'outsiders', f"seen_{i}", start + timedelta(hours=i), person)
+            index.refresh()
+        for thread in searchers:
+            thread.join()
+
+        assert not errors
+        paths, entries, matrix, _ = index.snapshot
+        assert len(paths) == len(entries) == len(matrix) == 20
+
+
+def test_refresh_appends_only_new_crops():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        when = datetime(2025, 3, 1, 8)
+        first = save(store, 'outsiders', 'a', when, face(1))
+        save(store, 'college_non_mess', 'b', when, face(2))
+        index = FaceIndex(root)
+        assert index.refresh() == 2
+        before = index.snapshot
+
+        latest = save(store, 'outsiders', 'c', when, face(3))
+        assert index.refresh() == 3
+        paths, entries, matrix, _ = index.snapshot
+        assert paths is before[0] and len(paths) == len(matrix) == 3   # appended, not rebuilt
+        assert len(before[2]) == 2                                        # old snapshot unchanged
+        assert np.allclose(index.encoding_for(latest), face(3))
+        assert np.allclose(index.encoding_for(os.path.join(os.path.dirname(first), '.', 'a.jpg')), face(1))
+
+        # A tombstone rebuilds the index without the moved crop
+        record_removal(os.path.dirname(first), 'a.jpg')
+        assert index.refresh() == 2
+        assert index.encoding_for(first) is None
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("FACE SEARCH TEST")
+    print("=" * 50)
+    test_record_appends_sidecar_rows()
+    print("✓ Sidecar rows recorded")
+    test_search_finds_same_face_across_shards()
+    print("✓ Reverse search across shards")
+    test_concurrent_refresh_and_search()
+    print("✓ Concurrent refresh and search")
+    test_refresh_appends_only_new_crops()
+    print("✓ Incremental refresh")
@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+import pytest
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'appextended.py')
+
+
+def test_headless_stdout_carries_only_json_records():
+    pytest.importorskip('face_recognition')
+    with tempfile.TemporaryDirectory() as directory:
+        frames = os.path.join(directory, 'frames')
+        os.makedirs(frames)
+        for i in range(3):
+            cv2.imwrite(os.path.join(frames, f"{i:03d}.png"), np.full((120, 160, 3), i * 40, np.uint8))
+
+        # --mode meal also starts the scheduler, which reports its mode switches
+        result = subprocess.run(
+            [sys.executable, APP, '--source', frames, '--headless', '--results', '-', '--max-frames', '3',
+             '--mode', 'meal', '--events-db', '', '--log-file', ''],
+            cwd=directory, capture_output=True, text=True, timeout=120
+        )
+        assert result.returncode == 0, result.stderr
+
+        lines = result.stdout.splitlines()
+        records = [json.loads(line) for line in lines]
+        assert len(records) == 3
+        assert all('faces' in record for record in records)
+        assert 'Headless run finished' in result.stderr
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("HEADLESS OUTPUT TEST")
+    print("=" * 50)
+    test_headless_stdout_carries_only_json_records()
+    print("✓ stdout is pure JSON lines")
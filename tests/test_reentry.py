@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from events import EventLog
+from reentry import MealAdmissions
+
+
+def at(hour, minute, second=0):
+    return datetime(2025, 3, 3, hour, minute, second).timestamp()
+
+
+def test_second_entry_in_same_meal_is_flagged():
+    admissions = MealAdmissions(reentry_gap=120)
+
+    assert admissions.admit('21CS001', at(12, 30)) == (1, True)
+    assert admissions.admit('21CS001', at(12, 30, 5)) == (1, False)   # still in view
+    assert admissions.admit('21CS001', at(12, 45)) == (2, True)       # came back
+    assert admissions.admit('21CS002', at(12, 45)) == (1, True)
+
+
+def test_state_resets_between_meals():
+    admissions = MealAdmissions()
+    admissions.admit('21CS001', at(12, 30))
+
+    assert admissions.admit('21CS001', at(15, 0)) == (0, False)        # between meals
+    assert admissions.admit('21CS001', at(19, 45)) == (1, True)        # dinner
+
+
+def test_rebuild_from_event_log():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.db')
+        log = EventLog(path, flush_interval=0.05)
+        log.log('cam0', 'mess', roll_no='21CS001', timestamp=at(8, 0))   # breakfast
+        log.log('cam0', 'mess', roll_no='21CS001', timestamp=at(12, 10))
+        log.log('cam0', 'outsider', timestamp=at(12, 11))
+        log.stop()
+
+        admissions = MealAdmissions()
+        assert admissions.rebuild(path, now=datetime(2025, 3, 3, 12, 40)) == 1
+        assert admissions.admit('21CS001', at(12, 40)) == (2, True)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("RE-ENTRY TEST")
+    print("=" * 50)
+
+    test_second_entry_in_same_meal_is_flagged()
+    print("✓ Second entry flagged")
+
+    test_state_resets_between_meals()
+    print("✓ Reset between meals")
+
+    test_rebuild_from_event_log()
+    print("✓ Rebuilt from event log")
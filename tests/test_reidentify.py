@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import pickle
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from export import export_crops
+from face_search import FaceIndex
+from reidentify import load_cache, reidentify, save_cache, update_gallery_versions
+from storage import MANIFEST, read_manifest
+
+
+def person(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+def write_gallery(path, students):
+    with open(path, 'wb') as f:
+        pickle.dump({roll_no: {'name': roll_no, 'department': 'IT', 'roll_no': roll_no, 'encoding': encoding}
+                     for roll_no, encoding in students.items()}, f)
+
+
+def write_shard(shard_dir, crops):
+    """Crops with their encodings already cached (so no face_recognition is needed)"""
+    os.makedirs(shard_dir, exist_ok=True)
+    cache = {}
+    for name, encoding in crops.items():
+        open(os.path.join(shard_dir, name), 'wb').close()
+        cache[name] = (encoding.astype(np.float32), 0)
+    save_cache(shard_dir, cache)
+
+
+def test_gallery_versions_track_new_and_changed_entries():
+    with tempfile.TemporaryDirectory() as directory:
+        gallery = os.path.join(directory, 'college.pkl')
+        state = os.path.join(directory, 'versions.json')
+
+        write_gallery(gallery, {'A': person(1)})
+        assert update_gallery_versions(gallery, state)[0] == 1
+        assert update_gallery_versions(gallery, state)[0] == 1   # unchanged
+
+        write_gallery(gallery, {'A': person(1), 'B': person(2)})
+        version, roll_nos, _, versions = update_gallery_versions(gallery, state)
+        assert version == 2
+        assert dict(zip(roll_nos, versions.tolist())) == {'A': 1, 'B': 2}
+
+
+def test_late_enrollment_moves_matching_crops_incrementally():
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, 'detected_faces')
+        shard = os.path.join(root, 'outsiders', '2025-03-03', '12')
+        write_shard(shard, {
+            'outsider_O00001_a.jpg': person(5) + 0.01,
+            'outsider_O00002_b.jpg': person(9),
+        })
+        gallery = os.path.join(directory, 'college.pkl')
+        kwargs = dict(root=root, college_db=gallery,
+                      state_path=os.path.join(directory, 'versions.json'),
+                      log_path=os.path.join(directory, 'reidentified.jsonl'))
+
+        write_gallery(gallery, {'A': person(1)})
+        summary = reidentify(**kwargs)
+        assert summary['checked'] == 2 and summary['matched'] == 0
+
+        # Nothing new in the gallery: nothing to re-check
+        assert reidentify(**kwargs)['checked'] == 0
+
+        # Student 'LATE' enrolls: only the new entry is compared
+        write_gallery(gallery, {'A': person(1), 'LATE': person(5)})
+        summary = reidentify(**kwargs)
+        assert summary['checked'] == 2 and summary['matched'] == 1
+
+        moved = os.path.join(root, 'reidentified', '2025-03-03', '12', 'LATE_outsider_O00001_a.jpg')
+        assert os.path.exists(moved)
+        assert not os.path.exists(os.path.join(shard, 'outsider_O00001_a.jpg'))
+        assert list(load_cache(shard)) == ['outsider_O00002_b.jpg']
+        with open(kwargs['log_path']) as f:
+            assert json.loads(f.readline())['roll_no'] == 'LATE'
+
+
+
+def test_moved_crops_get_a_tombstone_and_dry_runs_write_nothing():
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, 'detected_faces')
+        shard = os.path.join(root, 'outsiders', '2025-03-03', '12')
+        write_shard(shard, {'outsider_O00001_a.jpg': person(5), 'outsider_O00002_b.jpg': person(9)})
+        with open(os.path.join(shard, MANIFEST), 'w') as f:
+            for name in ('outsider_O00001_a.jpg', 'outsider_O00002_b.jpg'):
+                f.write(json.dumps({'file': name, 'bytes': 0, 'saved': '2025-03-03T12:00:00'}) + "\n")
+        gallery = os.path.join(directory, 'college.pkl')
+        write_gallery(gallery, {'LATE': person(5)})
+        kwargs = dict(root=root, college_db=gallery,
+                      state_path=os.path.join(directory, 'versions.json'),
+                      log_path=os.path.join(directory, 'reidentified.jsonl'))
+
+        assert reidentify(dry_run=True, **kwargs)['matched'] == 1
+        assert not os.path.exists(kwargs['state_path'])
+        assert not os.path.exists(kwargs['log_path'])
+
+        assert reidentify(**kwargs)['matched'] == 1
+        assert [entry['file'] for entry in read_manifest(shard)] == ['outsider_O00002_b.jpg']
+        exported = [row['path'] for row in export_crops(root, '2025-03-03')]
+        assert exported == ['outsiders/2025-03-03/12/outsider_O00002_b.jpg',
+                            'reidentified/2025-03-03/12/LATE_outsider_O00001_a.jpg']
+
+
+def test_moved_crops_keep_their_metadata_and_encoding():
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, 'detected_faces')
+        shard = os.path.join(root, 'outsiders', '2025-03-03', '12')
+        write_shard(shard, {'outsider_O00001_a.jpg': person(5)})
+        with open(os.path.join(shard, MANIFEST), 'w') as f:
+            f.write(json.dumps({'file': 'outsider_O00001_a.jpg', 'bytes': 0, 'saved': '2025-03-03T12:00:00',
+                                'camera': 'cam1', 'time': 1741003200.0, 'box': [1, 2, 3, 4],
+                                'cluster': 'O00001', 'roll_no': None}) + "\n")
+        gallery = os.path.join(directory, 'college.pkl')
+        write_gallery(gallery, {'LATE': person(5)})
+        reidentify(root=root, college_db=gallery, state_path=os.path.join(directory, 'versions.json'),
+                   log_path=os.path.join(directory, 'reidentified.jsonl'))
+
+        [row] = [row for row in export_crops(root, '2025-03-03') if row['category'] == 'reidentified']
+        assert row['roll_no'] == 'LATE'
+        assert (row['camera'], row['time'], row['box_right']) == ('cam1', 1741003200.0, 3)
+
+        index = FaceIndex(root)
+        assert index.refresh() == 1
+        [found] = index.search(person(5))
+        assert found['category'] == 'reidentified' and found['roll_no'] == 'LATE'
+
+
+def test_moves_use_the_recognizer_tolerance():
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, 'detected_faces')
+        shard = os.path.join(root, 'outsiders', '2025-03-03', '12')
+        near = person(5).copy()
+        near[0] += 0.55    # distance 0.55: a match at 0.6, not for the recognizer (0.5)
+        write_shard(shard, {'outsider_O00001_a.jpg': near})
+        gallery = os.path.join(directory, 'college.pkl')
+        write_gallery(gallery, {'LATE': person(5)})
+        summary = reidentify(root=root, college_db=gallery, state_path=os.path.join(directory, 'versions.json'),
+                             log_path=os.path.join(directory, 'reidentified.jsonl'))
+        assert summary['matched'] == 0
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("RE-IDENTIFICATION TEST")
+    print("=" * 50)
+
+    test_gallery_versions_track_new_and_changed_entries()
+    print("✓ Gallery versions")
+
+    test_late_enrollment_moves_matching_crops_incrementally()
+    print("✓ Incremental re-identification")
+
+    test_moved_crops_get_a_tombstone_and_dry_runs_write_nothing()
+    print("✓ Tombstones for moved crops, read-only dry runs")
+
+    test_moved_crops_keep_their_metadata_and_encoding()
+    print("✓ Moved crops keep metadata and encoding")
+
+    test_moves_use_the_recognizer_tolerance()
+    print("✓ Recognizer tolerance for moves")
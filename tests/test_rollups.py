@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from rollups import MealRollups, query_rollups
+
+
+def at(day, hour, minute=0):
+    return datetime(2025, 3, day, hour, minute).timestamp()
+
+
+def test_counts_are_aggregated_incrementally():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.db')
+        rollups = MealRollups(path, flush_interval=0.05)
+        for minute in range(3):
+            rollups.add(at(3, 12, minute), 'lunch', 'cam0', 'mess', 'IT')
+        rollups.add(at(3, 12, 5), 'lunch', 'cam1', 'mess', 'ECE')
+        rollups.add(at(3, 13), 'lunch', 'cam0', 'outsider')
+        rollups.stop()
+
+        # A second run adds to the same rows
+        rollups = MealRollups(path, flush_interval=0.05)
+        rollups.add(at(4, 8), 'breakfast', 'cam0', 'college', 'IT')
+        rollups.add(at(4, 12), 'lunch', 'cam0', 'mess', 'IT')
+        rollups.stop()
+
+        by_meal = query_rollups(path, '2025-03-03', group_by=('meal', 'category'))
+        assert by_meal == [
+            {'meal': 'lunch', 'category': 'mess', 'count': 4},
+            {'meal': 'lunch', 'category': 'outsider', 'count': 1},
+        ]
+
+        by_department = query_rollups(path, '2025-03-01', '2025-03-31', group_by=('department',), category='mess')
+        assert by_department == [{'department': 'ECE', 'count': 1}, {'department': 'IT', 'count': 4}]
+
+        by_hour = query_rollups(path, '2025-03-03', group_by=('hour',))
+        assert by_hour == [{'hour': 12, 'count': 4}, {'hour': 13, 'count': 1}]
+
+
+def test_unknown_columns_are_rejected():
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            query_rollups(os.path.join(directory, 'events.db'), '2025-03-03', group_by=('name',))
+        except ValueError:
+            return
+        assert False, "expected ValueError"
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("ROLLUP TEST")
+    print("=" * 50)
+
+    test_counts_are_aggregated_incrementally()
+    print("✓ Incremental per-meal counters")
+
+    test_unknown_columns_are_rejected()
+    print("✓ Column validation")
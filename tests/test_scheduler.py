@@ -0,0 +1,69 @@
+import os
+import sys
+import csv
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scheduler import MealScheduler
+
+
+def make_scheduler(cpu_log=None):
+    return MealScheduler(
+        windows={'lunch': ('12:00', '14:30')},
+        ramp_minutes=15,
+        linger_minutes=10,
+        cpu_log=cpu_log
+    )
+
+
+def test_meal_mode_ramps_up_before_window_and_down_after():
+    scheduler = make_scheduler()
+
+    assert scheduler.state_at(datetime(2026, 1, 5, 11, 40)) == ('watch', 'watch')
+    assert scheduler.state_at(datetime(2026, 1, 5, 11, 45)) == ('lunch', 'meal')
+    assert scheduler.state_at(datetime(2026, 1, 5, 14, 35)) == ('lunch', 'meal')
+    assert scheduler.state_at(datetime(2026, 1, 5, 14, 40)) == ('watch', 'watch')
+
+
+def test_manual_override_and_return_to_timetable():
+    scheduler = make_scheduler()
+
+    scheduler.override('meal')
+    assert scheduler.state_at(datetime(2026, 1, 5, 3, 0)) == ('manual', 'meal')
+
+    scheduler.override(None)
+    assert scheduler.state_at(datetime(2026, 1, 5, 3, 0)) == ('watch', 'watch')
+
+
+def test_update_reports_mode_changes_and_logs_cpu_per_window():
+    with tempfile.TemporaryDirectory() as directory:
+        cpu_log = os.path.join(directory, 'cpu.csv')
+        scheduler = make_scheduler(cpu_log)
+
+        assert scheduler.update(datetime(2026, 1, 5, 11, 0))['mode'] == 'watch'
+        assert scheduler.update(datetime(2026, 1, 5, 11, 30)) is None
+        assert scheduler.update(datetime(2026, 1, 5, 12, 0))['profile'] == 'rush'
+        totals = scheduler.stop()
+
+        with open(cpu_log, newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        assert [row['window'] for row in rows] == ['watch', 'lunch']
+        assert set(totals) == {'watch', 'lunch'}
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("MEAL SCHEDULER TEST")
+    print("=" * 50)
+
+    test_meal_mode_ramps_up_before_window_and_down_after()
+    print("✓ Meal mode ramps up/down around windows")
+
+    test_manual_override_and_return_to_timetable()
+    print("✓ Manual override")
+
+    test_update_reports_mode_changes_and_logs_cpu_per_window()
+    print("✓ CPU time logged per window")
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+from unittest import mock
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sources import open_source, ImageDirectorySource, VideoFileSource, StreamSource, WebcamSource
+
+
+def write_images(directory, count):
+    for i in range(count):
+        cv2.imwrite(os.path.join(directory, f"{i:03d}.png"), np.full((48, 64, 3), i * 10, np.uint8))
+
+
+def write_video(path, count):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+    for i in range(count):
+        writer.write(np.full((48, 64, 3), i * 10, np.uint8))
+    writer.release()
+
+
+def read_all(source):
+    frames = []
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            return frames
+        frames.append(frame)
+
+
+def test_image_directory_in_filename_order():
+    with tempfile.TemporaryDirectory() as directory:
+        write_images(directory, 3)
+        source = open_source(directory)
+
+        assert isinstance(source, ImageDirectorySource)
+        frames = read_all(source)
+        assert [int(frame[0, 0, 0]) for frame in frames] == [0, 10, 20]
+        assert source.last_evidence() is None
+
+
+def test_video_file_returns_every_frame():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'gate.avi')
+        write_video(path, 10)
+        source = open_source(path)
+
+        assert isinstance(source, VideoFileSource)
+        assert len(read_all(source)) == 10
+        source.release()
+
+
+def test_realtime_loop_wraps_at_end_of_file():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'gate.avi')
+        write_video(path, 10)
+        source = VideoFileSource(path, realtime=True, loop=True)
+        assert source.read()[0]
+        time.sleep(0.5)     # the live position is now past the end of the 10-frame file
+
+        results = []
+        reader = threading.Thread(target=lambda: results.append(source.read()), daemon=True)
+        reader.start()
+        reader.join(5.0)
+        assert not reader.is_alive()
+        assert results[0][0] and source.position <= 10
+        source.release()
+
+
+def test_stream_url_with_local_stand_in():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'gate.avi')
+        write_video(path, 10)
+        source = open_source('rtsp://gate-1/stream', stand_in=path)
+
+        assert isinstance(source, StreamSource)
+        ret, frame = source.read()
+        assert ret and frame.shape == (48, 64, 3)
+        source.release()
+
+
+def test_digit_spec_is_webcam():
+    # Checks the parsed device index without opening a real camera
+    with mock.patch('cv2.VideoCapture') as video_capture:
+        video_capture.return_value.isOpened.return_value = False
+        source = open_source('7')
+        source.release()
+
+    assert isinstance(source, WebcamSource)
+    video_capture.assert_called_once_with(7)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("FRAME SOURCE TEST")
+    print("=" * 50)
+
+    test_image_directory_in_filename_order()
+    print("✓ Image directory source")
+
+    test_video_file_returns_every_frame()
+    print("✓ Video file source")
+
+    test_realtime_loop_wraps_at_end_of_file()
+    print("✓ Real-time looped playback")
+
+    test_stream_url_with_local_stand_in()
+    print("✓ Stream URL with local stand-in")
+
+    test_digit_spec_is_webcam()
+    print("✓ Webcam index spec")
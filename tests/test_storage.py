@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from storage import EMBEDDINGS, ShardedCropStore, list_shards, read_embeddings, recent_crops, record_removal
+
+
+def save(store, category, name, when, size=100):
+    path = store.path_for(category, name, when) + '.jpg'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    store.record(path, size)
+    return path
+
+
+def test_crops_are_sharded_by_date_and_hour():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        path = save(store, 'outsiders', 'outsider_1', datetime(2025, 3, 1, 12, 30))
+
+        assert path == os.path.join(root, 'outsiders', '2025-03-01', '12', 'outsider_1.jpg')
+        assert list_shards(os.path.join(root, 'outsiders')) == [('2025-03-01', '12')]
+
+
+def test_recent_crops_newest_first():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        start = datetime(2025, 3, 1, 8)
+        for i in range(6):
+            save(store, 'outsiders', f"outsider_{i}", start + timedelta(hours=i))
+
+        names = [os.path.basename(p) for p in recent_crops(os.path.join(root, 'outsiders'), limit=3)]
+        assert names == ['outsider_5.jpg', 'outsider_4.jpg', 'outsider_3.jpg']
+
+
+def test_janitor_applies_age_and_size_limits():
+    with tempfile.TemporaryDirectory() as root:
+        now = datetime(2025, 3, 10, 12)
+        store = ShardedCropStore(root, max_age_days=7, max_bytes=250)
+        save(store, 'outsiders', 'too_old', now - timedelta(days=8))
+        for hours in (3, 2, 1, 0):
+            save(store, 'outsiders', f"recent_{hours}", now - timedelta(hours=hours))
+
+        removed = store.prune(now)
+
+        remaining = [os.path.basename(p) for p in recent_crops(os.path.join(root, 'outsiders'), limit=10)]
+        assert removed == 3
+        assert remaining == ['recent_0.jpg', 'recent_1.jpg']
+        assert store.bytes_removed == 300
+
+
+def test_shard_sizes_follow_late_crops_and_tombstones():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        when = datetime(2025, 3, 1, 8)
+        path = save(store, 'outsiders', 'a', when)
+        shard_dir = os.path.dirname(path)
+        assert store.size_of(shard_dir) == 100
+
+        save(store, 'outsiders', 'late', when, size=50)    # written after the hour rolled over
+        assert store.size_of(shard_dir) == 150
+        record_removal(shard_dir, 'a.jpg')
+        assert store.size_of(shard_dir) == 50
+
+
+def test_sidecar_rows_survive_a_torn_write():
+    with tempfile.TemporaryDirectory() as root:
+        store = ShardedCropStore(root)
+        when = datetime(2025, 3, 1, 8)
+        path = store.path_for('outsiders', 'a', when) + '.jpg'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shard_dir = os.path.dirname(path)
+        store.record(path, 10, encoding=np.full(128, 1.0))
+        with open(os.path.join(shard_dir, EMBEDDINGS), 'ab') as f:
+            f.write(b'\0' * 100)                           # crash mid-row, no manifest line
+
+        fresh = ShardedCropStore(root)                      # e.g. after a restart
+        fresh.record(os.path.join(shard_dir, 'b.jpg'), 10, encoding=np.full(128, 2.0))
+        fresh.record(os.path.join(shard_dir, 'c.jpg'), 10, encoding=np.full(128, 3.0))
+        entries, matrix = read_embeddings(shard_dir)
+        assert [(e['file'], e['row']) for e in entries] == [('a.jpg', 0), ('b.jpg', 1), ('c.jpg', 2)]
+        assert [float(matrix[e['row']][0]) for e in entries] == [1.0, 2.0, 3.0]
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("SHARDED STORAGE TEST")
+    print("=" * 50)
+
+    test_crops_are_sharded_by_date_and_hour()
+    print("✓ Date/hour shards")
+
+    test_recent_crops_newest_first()
+    print("✓ Recent crops newest first")
+
+    test_janitor_applies_age_and_size_limits()
+    print("✓ Retention by age and size")
+
+    test_shard_sizes_follow_late_crops_and_tombstones()
+    print("✓ Shard sizes follow late crops and tombstones")
+
+    test_sidecar_rows_survive_a_torn_write()
+    print("✓ Sidecar rows survive a torn write")
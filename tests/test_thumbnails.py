@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from thumbnails import ThumbnailCache
+
+
+def write_crop(root, path, value, size=(600, 400)):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    cv2.imwrite(full, np.full(size + (3,), value, np.uint8))
+
+
+def test_thumbnails_are_bounded_and_content_addressed():
+    with tempfile.TemporaryDirectory() as root:
+        cache = ThumbnailCache(root, os.path.join(root, 'thumbs'), size=120)
+        write_crop(root, 'outsiders/a.jpg', 50)
+        write_crop(root, 'outsiders/b.jpg', 50)
+        write_crop(root, 'outsiders/c.jpg', 200)
+
+        name = cache.name_for('outsiders/a.jpg')
+        thumbnail = cv2.imread(cache.file_for(name))
+        assert max(thumbnail.shape[:2]) == 120
+        assert cache.name_for('outsiders/b.jpg') == name        # same content, same URL
+        assert cache.name_for('outsiders/c.jpg') != name
+        assert cache.generated == 2
+        assert cache.name_for('outsiders/missing.jpg') is None
+        cache.stop()
+
+
+def test_changed_crop_gets_a_new_name():
+    with tempfile.TemporaryDirectory() as root:
+        cache = ThumbnailCache(root, os.path.join(root, 'thumbs'))
+        write_crop(root, 'outsiders/a.jpg', 50)
+        first = cache.name_for('outsiders/a.jpg')
+        write_crop(root, 'outsiders/a.jpg', 60, size=(500, 400))
+        assert cache.name_for('outsiders/a.jpg') != first
+        cache.stop()
+
+
+def test_prefetch_renders_in_the_background():
+    with tempfile.TemporaryDirectory() as root:
+        cache = ThumbnailCache(root, os.path.join(root, 'thumbs'), prefetch_limit=2)
+        for i in range(4):
+            write_crop(root, f"outsiders/{i}.jpg", 40 * i)
+        cache.prefetch([{'path': f"outsiders/{i}.jpg"} for i in range(4)])
+        cache.stop()
+        assert cache.generated == 2
+        assert sorted(cache.names) == ['outsiders/2.jpg', 'outsiders/3.jpg']
+
+
+def test_lookup_renders_in_the_background_and_names_are_bounded():
+    with tempfile.TemporaryDirectory() as root:
+        cache = ThumbnailCache(root, os.path.join(root, 'thumbs'), max_names=2)
+        for i in range(3):
+            write_crop(root, f"outsiders/{i}.jpg", 40 * i)
+
+        assert cache.lookup('outsiders/0.jpg') is None      # queued, not rendered on this thread
+        deadline = time.monotonic() + 5
+        while cache.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert 'outsiders/0.jpg' in cache.names
+        for i in range(3):
+            cache.name_for(f"outsiders/{i}.jpg")
+        assert list(cache.names) == ['outsiders/1.jpg', 'outsiders/2.jpg']
+        assert cache.lookup('outsiders/2.jpg') is not None
+
+        os.remove(os.path.join(root, 'outsiders', '1.jpg'))
+        assert cache.name_for('outsiders/1.jpg') is None
+        assert cache.lookup('outsiders/1.jpg') is None
+        cache.stop()
+
+
+def test_prune_removes_thumbnails_of_deleted_crops():
+    with tempfile.TemporaryDirectory() as root:
+        cache = ThumbnailCache(root, os.path.join(root, 'thumbs'))
+        write_crop(root, 'outsiders/a.jpg', 50)
+        write_crop(root, 'outsiders/b.jpg', 50)     # same content as a.jpg
+        write_crop(root, 'outsiders/c.jpg', 200)
+        shared = cache.name_for('outsiders/a.jpg')
+        assert cache.name_for('outsiders/b.jpg') == shared
+        alone = cache.name_for('outsiders/c.jpg')
+
+        os.remove(os.path.join(root, 'outsiders', 'a.jpg'))
+        os.remove(os.path.join(root, 'outsiders', 'c.jpg'))
+        assert cache.prune() == 1
+        assert os.path.exists(cache.file_for(shared))     # b.jpg still uses it
+        assert not os.path.exists(cache.file_for(alone))
+        assert 'outsiders/c.jpg' not in cache.names
+        assert cache.lookup('outsiders/b.jpg') == shared
+
+        os.remove(os.path.join(root, 'outsiders', 'b.jpg'))
+        assert cache.prune() == 1 and cache.prune() == 0
+        cache.stop()
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("THUMBNAIL TEST")
+    print("=" * 50)
+    test_thumbnails_are_bounded_and_content_addressed()
+    print("✓ Bounded, content-addressed thumbnails")
+    test_changed_crop_gets_a_new_name()
+    print("✓ Changed crops get new names")
+    test_prefetch_renders_in_the_background()
+    print("✓ Background prefetch")
+    test_lookup_renders_in_the_background_and_names_are_bounded()
+    print("✓ Background lookup and bounded name map")
+    test_prune_removes_thumbnails_of_deleted_crops()
+    print("✓ Thumbnails of deleted crops pruned")